@@ -1,5 +1,12 @@
 """
 ASGI config for bms_project.
+
+ASGI profile: the read-only catalog and seat-map views are async. Under ASGI
+each request's sync work runs in a thread of its own, so persistent
+connections would pile up one per thread; reconnect per request instead
+(put PgBouncer in front for pooling) unless DB_CONN_MAX_AGE is set.
+
+    uvicorn bms_project.asgi:application --workers 4
 """
 
 import os
@@ -7,5 +14,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bms_project.settings')
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
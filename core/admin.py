@@ -2,7 +2,7 @@
 Admin configuration for core app
 """
 from django.contrib import admin
-from .models import Cinema, Screen, Seat, Movie, Show, Booking, SeatLock, UserProfile
+from .models import Cinema, Screen, Seat, Movie, Show, Booking, SeatLock, UserProfile, DailySalesRollup, TicketScan
 
 
 @admin.register(Cinema)
@@ -35,17 +35,33 @@ class MovieAdmin(admin.ModelAdmin):
 
 @admin.register(Show)
 class ShowAdmin(admin.ModelAdmin):
-    list_display = ['movie', 'screen', 'date', 'start_time', 'price']
+    list_display = ['movie', 'screen', 'date', 'start_time', 'price', 'seats_booked', 'seats_capacity']
     list_filter = ['date', 'screen__cinema']
     search_fields = ['movie__title', 'screen__name']
+    readonly_fields = ['seats_capacity', 'seats_booked', 'seats_held']
 
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
-    list_display = ['booking_id', 'user', 'show', 'total_amount', 'status', 'created_at']
+    list_display = ['ticket_code', 'booking_id', 'user', 'show', 'total_amount', 'status', 'created_at']
     list_filter = ['status', 'created_at']
-    search_fields = ['booking_id', 'user__username']
-    readonly_fields = ['booking_id']
+    search_fields = ['=ticket_code', 'booking_id', 'user__username']
+    readonly_fields = ['booking_id', 'ticket_code']
+
+
+@admin.register(TicketScan)
+class TicketScanAdmin(admin.ModelAdmin):
+    list_display = ['booking', 'gate', 'result', 'scanned_by', 'scanned_at', 'synced_at']
+    list_filter = ['result', 'gate']
+    search_fields = ['=booking__ticket_code']
+    raw_id_fields = ['booking']
+
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    list_display = ['day', 'movie', 'cinema', 'bookings', 'tickets', 'revenue']
+    list_filter = ['day', 'cinema']
+    search_fields = ['movie__title', 'cinema__name']
 
 
 @admin.register(SeatLock)
@@ -62,11 +78,7 @@ class SeatLockAdmin(admin.ModelAdmin):
         
     @admin.action(description='Release selected expired locks')
     def release_expired_locks_action(self, request, queryset):
-        from django.utils import timezone
-        now = timezone.now()
-        expired_locks = queryset.filter(expires_at__lte=now)
-        count = expired_locks.count()
-        expired_locks.delete()
+        count = SeatLock.release_expired_locks(queryset)
         self.message_user(request, f'Released {count} expired seat locks.')
 
 @admin.register(UserProfile)
@@ -81,11 +93,15 @@ class UserProfileAdmin(admin.ModelAdmin):
         return 'Approved' if obj.is_role_approved else 'Pending approval'
 
     def approve_selected_roles(self, request, queryset):
+        user_ids = list(queryset.values_list('user_id', flat=True))
         updated = queryset.update(is_role_approved=True)
+        UserProfile.invalidate_role_cache(user_ids)
         self.message_user(request, f'Approved {updated} profile(s).')
     approve_selected_roles.short_description = 'Approve selected roles'
 
     def mark_selected_pending(self, request, queryset):
+        user_ids = list(queryset.values_list('user_id', flat=True))
         updated = queryset.update(is_role_approved=False)
+        UserProfile.invalidate_role_cache(user_ids)
         self.message_user(request, f'Marked {updated} profile(s) as pending.')
     mark_selected_pending.short_description = 'Mark selected roles as pending'
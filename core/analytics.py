@@ -0,0 +1,164 @@
+"""
+Occupancy analytics for scheduling: fill rates by weekday x start time x screen.
+
+Show capacity and sold seats are read from the per-show counters in a single
+query and aggregated with NumPy, so a year of shows is processed in one pass
+without touching seat or booking rows.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import CharField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import Screen
+
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+PERCENTILES = (50, 90)
+
+
+def load_show_arrays(shows):
+    """Load (weekday, minute of day, screen id, capacity, booked) as int arrays.
+
+    Weekdays are 0=Monday..6=Sunday. Shows without a known capacity are
+    skipped since they have no meaningful fill rate. Date and start time are
+    fetched as ISO text and decoded in NumPy, which avoids building a Python
+    date/time object per row.
+    """
+    rows = list(
+        shows.filter(seats_capacity__gt=0).order_by()
+        .annotate(date_text=Cast('date', CharField()), time_text=Cast('start_time', CharField()))
+        .values_list('date_text', 'time_text', 'screen_id', 'seats_capacity', 'seats_booked')
+    )
+    if not rows:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, empty, empty
+
+    dates, times, screen_id, capacity, booked = zip(*rows)
+    # 1970-01-01 was a Thursday (weekday 3)
+    weekday = (np.array(dates, dtype='datetime64[D]').astype(np.int64) + 3) % 7
+    # 'HH:MM[:SS]' -> minutes, reading the digits straight from the bytes
+    digits = np.array(times, dtype='S5').view(np.uint8).reshape(-1, 5).astype(np.int64) - ord('0')
+    minute = (digits[:, 0] * 10 + digits[:, 1]) * 60 + digits[:, 3] * 10 + digits[:, 4]
+    return (
+        weekday,
+        minute,
+        np.array(screen_id, dtype=np.int64),
+        np.array(capacity, dtype=np.int64),
+        np.array(booked, dtype=np.int64),
+    )
+
+
+def _grouped_percentiles(groups, values, n_groups, percentiles=PERCENTILES):
+    """Percentiles of ``values`` within each group, vectorized.
+
+    Uses the same linear interpolation as ``np.percentile``. Returns an
+    (n_groups, len(percentiles)) array; empty groups are NaN.
+    """
+    order = np.lexsort((values, groups))
+    sorted_values = values[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    result = np.full((n_groups, len(percentiles)), np.nan)
+    has_data = counts > 0
+    starts, counts = starts[has_data], counts[has_data]
+    for i, pct in enumerate(percentiles):
+        position = pct / 100.0 * (counts - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, counts - 1)
+        fraction = position - lower
+        result[has_data, i] = (
+            sorted_values[starts + lower] * (1 - fraction) + sorted_values[starts + upper] * fraction
+        )
+    return result
+
+
+def occupancy_report(shows):
+    """Occupancy matrices and percentiles for the given Show queryset.
+
+    Returns a dict with:
+      - ``slots``: start times (HH:MM) forming the matrix columns
+      - ``weekday_slot``: 7 x slots fill rate (sold / capacity), NaN where no shows
+      - ``screens``: screen ids forming the first axis of ``screen_matrix``
+      - ``screen_matrix``: screens x 7 x slots fill rate
+      - ``screen_percentiles``: screens x len(PERCENTILES) per-show occupancy
+      - ``overall``: mean fill rate and per-show percentiles across all shows
+    """
+    weekday, minute, screen_id, capacity, booked = load_show_arrays(shows)
+    if not len(capacity):
+        return None
+
+    slots, slot_idx = np.unique(minute, return_inverse=True)
+    screens, screen_idx = np.unique(screen_id, return_inverse=True)
+    n_slots, n_screens = len(slots), len(screens)
+    booked = np.minimum(booked, capacity)
+
+    def fill_rate(index, size):
+        sold = np.bincount(index, weights=booked, minlength=size)
+        seats = np.bincount(index, weights=capacity, minlength=size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(seats > 0, sold / seats, np.nan)
+
+    weekday_slot = fill_rate(weekday * n_slots + slot_idx, 7 * n_slots).reshape(7, n_slots)
+    screen_matrix = fill_rate(
+        (screen_idx * 7 + weekday) * n_slots + slot_idx, n_screens * 7 * n_slots
+    ).reshape(n_screens, 7, n_slots)
+
+    per_show = booked / capacity
+    return {
+        'slots': [f'{m // 60:02d}:{m % 60:02d}' for m in slots.tolist()],
+        'weekday_slot': weekday_slot,
+        'screens': screens.tolist(),
+        'screen_matrix': screen_matrix,
+        'screen_percentiles': _grouped_percentiles(screen_idx, per_show, n_screens),
+        'overall': {
+            'shows': int(len(capacity)),
+            'fill_rate': float(booked.sum() / capacity.sum()),
+            'percentiles': dict(zip(PERCENTILES, np.percentile(per_show, PERCENTILES).tolist())),
+        },
+    }
+
+
+def dashboard_heatmap(shows, days=90, top_screens=10):
+    """Template-ready occupancy summary for the last ``days`` days of shows."""
+    today = timezone.localdate()
+    report = occupancy_report(shows.filter(date__gt=today - timedelta(days=days), date__lte=today))
+    if report is None:
+        return None
+
+    def pct(value):
+        return None if np.isnan(value) else round(float(value) * 100)
+
+    rows = [
+        {'weekday': WEEKDAYS[day], 'cells': [pct(v) for v in report['weekday_slot'][day]]}
+        for day in range(7)
+    ]
+
+    # Per-screen mean fill rate across all weekday/slot cells that had shows
+    screen_means = np.nanmean(report['screen_matrix'].reshape(len(report['screens']), -1), axis=1)
+    ranked = np.argsort(-screen_means)[:top_screens]
+    screen_ids = [report['screens'][i] for i in ranked.tolist()]
+    names = {s.id: str(s) for s in Screen.objects.filter(id__in=screen_ids).select_related('cinema')}
+    screens = [
+        {
+            'name': names.get(report['screens'][i], report['screens'][i]),
+            'fill_rate': pct(screen_means[i]),
+            'p50': pct(report['screen_percentiles'][i][0]),
+            'p90': pct(report['screen_percentiles'][i][1]),
+        }
+        for i in ranked.tolist()
+    ]
+
+    overall = report['overall']
+    return {
+        'days': days,
+        'slots': report['slots'],
+        'rows': rows,
+        'screens': screens,
+        'shows': overall['shows'],
+        'fill_rate': pct(overall['fill_rate']),
+        'p50': pct(overall['percentiles'][50]),
+        'p90': pct(overall['percentiles'][90]),
+    }
@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from .bootstrap import create_default_superuser_after_migrate
+        from .metrics import install_query_counter
+        from .querylog import install_query_log
+        post_migrate.connect(create_default_superuser_after_migrate, sender=self)
+        for install in (install_query_counter, install_query_log):
+            connection_created.connect(install)
+            for connection in connections.all(initialized_only=True):
+                install(connection=connection)
@@ -0,0 +1,29 @@
+"""
+One-off environment setup that must not run at import time.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+
+def ensure_default_superuser(stdout=None, using='default'):
+    """Create the ADMIN_USERNAME superuser if configured and missing.
+
+    Idempotent: an existing user is left untouched (including its password).
+    Returns True when a user was created.
+    """
+    username, password = settings.ADMIN_USERNAME, settings.ADMIN_PASSWORD
+    if not username or not password:
+        return False
+    User = get_user_model()
+    if User.objects.using(using).filter(username=username).exists():
+        return False
+    User.objects.db_manager(using).create_superuser(username=username, email=settings.ADMIN_EMAIL, password=password)
+    if stdout:
+        stdout.write(f'Created superuser {username}\n')
+    return True
+
+
+def create_default_superuser_after_migrate(sender, using, verbosity=1, **kwargs):
+    """post_migrate hook: runs once per `migrate`, after the auth tables exist."""
+    import sys
+    ensure_default_superuser(stdout=sys.stdout if verbosity else None, using=using)
@@ -0,0 +1,153 @@
+"""
+Namespaced application cache on top of Django's cache framework.
+
+Keys live in a namespace (``catalog``, ``shows``, ``dashboards``, ...) whose
+version number is part of every key. Bumping the version, which the model
+signals in models.py do, invalidates the whole namespace at once without
+tracking individual keys; old entries simply age out.
+
+``get_or_compute`` adds stampede protection: on a miss only one caller
+recomputes the value while concurrent callers wait briefly for it. Per
+namespace hit/miss counters are kept in-process (see ``cache_stats``).
+``aget_or_compute`` is the same for async views.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+
+
+CATALOG = 'catalog'
+SHOWS = 'shows'
+DASHBOARDS = 'dashboards'
+
+DEFAULT_TIMEOUT = 300
+LOCK_TIMEOUT = 30  # seconds a recompute may hold the lock
+LOCK_WAIT = 2.0  # seconds other callers wait for it before computing themselves
+LOCK_POLL = 0.05
+
+_MISSING = object()
+_stats = defaultdict(Counter)
+_stats_lock = threading.Lock()
+
+
+def _version_key(namespace):
+    return f'ns-version:{namespace}'
+
+
+def namespace_version(namespace):
+    # Seeded from the clock so an evicted counter never revives old entries
+    return cache.get_or_set(_version_key(namespace), lambda: int(time.time()), None)
+
+
+def bump_namespace(*namespaces):
+    """Invalidate every key in the given namespaces."""
+    for namespace in namespaces:
+        try:
+            cache.incr(_version_key(namespace))
+        except ValueError:
+            cache.set(_version_key(namespace), int(time.time()), None)
+
+
+def make_key(namespace, parts):
+    """Cache key for ``parts`` (any reprable values) in the current namespace version."""
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'{namespace}:{namespace_version(namespace)}:{digest}'
+
+
+async def anamespace_version(namespace):
+    return await cache.aget_or_set(_version_key(namespace), lambda: int(time.time()), None)
+
+
+async def amake_key(namespace, parts):
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'{namespace}:{await anamespace_version(namespace)}:{digest}'
+
+
+def _count(namespace, event):
+    with _stats_lock:
+        _stats[namespace][event] += 1
+
+
+def get_or_compute(namespace, parts, compute, timeout=DEFAULT_TIMEOUT):
+    """Cached ``compute()`` for ``parts`` in ``namespace``.
+
+    On a miss, callers race for a short-lived lock key (cache.add is atomic
+    on every backend); the winner computes and stores the value, the others
+    poll for it for up to LOCK_WAIT seconds before computing it themselves.
+    """
+    key = make_key(namespace, parts)
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        _count(namespace, 'hits')
+        return value
+
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL)
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                _count(namespace, 'waits')
+                return value
+        lock_key = None
+
+    _count(namespace, 'misses')
+    try:
+        value = compute()
+        cache.set(key, value, timeout)
+    finally:
+        if lock_key:
+            cache.delete(lock_key)
+    return value
+
+
+async def aget_or_compute(namespace, parts, compute, timeout=DEFAULT_TIMEOUT):
+    """Async get_or_compute; ``compute`` is a coroutine function."""
+    key = await amake_key(namespace, parts)
+    value = await cache.aget(key, _MISSING)
+    if value is not _MISSING:
+        _count(namespace, 'hits')
+        return value
+
+    lock_key = f'{key}:lock'
+    if not await cache.aadd(lock_key, 1, LOCK_TIMEOUT):
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL)
+            value = await cache.aget(key, _MISSING)
+            if value is not _MISSING:
+                _count(namespace, 'waits')
+                return value
+        lock_key = None
+
+    _count(namespace, 'misses')
+    try:
+        value = await compute()
+        await cache.aset(key, value, timeout)
+    finally:
+        if lock_key:
+            await cache.adelete(lock_key)
+    return value
+
+
+def cache_stats():
+    """{namespace: {'hits', 'misses', 'waits', 'hit_rate'}} for this process."""
+    with _stats_lock:
+        snapshot = {namespace: dict(counts) for namespace, counts in _stats.items()}
+    for counts in snapshot.values():
+        for event in ('hits', 'misses', 'waits'):
+            counts.setdefault(event, 0)
+        served = counts['hits'] + counts['waits']
+        total = served + counts['misses']
+        counts['hit_rate'] = round(served / total, 4) if total else None
+    return snapshot
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
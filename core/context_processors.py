@@ -0,0 +1,19 @@
+"""
+Template context processors for core app
+"""
+from .models import UserProfile
+
+
+def user_role(request):
+    """Expose the (cached) role of the logged-in user as ``user_role``.
+
+    Values are callables, which templates resolve only when they are used, so
+    partials that never show the navigation do not touch the session.
+    """
+    user = getattr(request, 'user', None)
+    if user is None:
+        return {}
+    return {
+        'user_role': lambda: UserProfile.role_state(user)[0],
+        'user_role_approved': lambda: UserProfile.role_state(user)[1],
+    }
@@ -0,0 +1,274 @@
+"""
+Booking confirmation and reminder emails.
+
+The QR image is rendered by core.qr, which loads qrcode/PIL on first use, so
+importing this module (and core.views) stays cheap.
+"""
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+
+from . import metrics
+from .qr import ticket_qr_png
+
+
+def _send(msg, kind, fail_silently):
+    """Send ``msg``, counting it in bms_emails_sent_total."""
+    try:
+        sent = msg.send(fail_silently=fail_silently)
+    except Exception:
+        metrics.inc('bms_emails_sent_total', kind=kind, result='failed')
+        raise
+    metrics.inc('bms_emails_sent_total', kind=kind, result='sent' if sent else 'failed')
+    return sent
+
+
+def send_booking_email(user, booking):
+    """Send booking confirmation email with QR code"""
+    from email.mime.image import MIMEImage
+
+    subject = f'Booking Confirmation - {booking.show.movie.title}'
+    
+    seats_list = booking.get_seats_list()
+    seats_str = ', '.join(seats_list)
+    
+    # QR code carrying the signed ticket payload
+    qr_image_data = ticket_qr_png(booking)
+
+    # Plain text message
+    text_content = f"""
+Dear {user.username},
+
+Thank you for booking with BookMyShow! Your booking has been confirmed.
+
+Booking Details:
+================
+Ticket Code: {booking.ticket_code}
+Booking ID: {booking.booking_id}
+Movie: {booking.show.movie.title}
+Cinema: {booking.show.screen.cinema.name}
+Screen: {booking.show.screen.name}
+Date: {booking.show.date}
+Time: {booking.show.start_time}
+Seats: {seats_str}
+Total Amount: ₹{booking.total_amount}
+
+Please present this QR code at the cinema entrance for ticket validation.
+
+Have a great movie experience!
+
+Best regards,
+BookMyShow Team
+"""
+
+    # HTML message with embedded image
+    html_content = f"""
+    <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                <div style="background-color: #e74c3c; color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0;">
+                    <h1 style="margin: 0;">Booking Confirmed!</h1>
+                </div>
+                
+                <div style="padding: 20px; background-color: #f9f9f9; border: 1px solid #ddd;">
+                    <p>Dear <strong>{user.username}</strong>,</p>
+                    
+                    <p>Thank you for booking with BookMyShow! Your booking has been confirmed.</p>
+                    
+                    <div style="background-color: white; padding: 15px; border-radius: 5px; border: 1px solid #eee; margin: 20px 0;">
+                        <h2 style="color: #e74c3c; border-bottom: 2px solid #e74c3c; padding-bottom: 10px;">Booking Details</h2>
+                        <table style="width: 100%; border-collapse: collapse;">
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Ticket Code:</td>
+                                <td style="padding: 8px; font-family: monospace; font-size: 18px;">{booking.ticket_code}</td>
+                            </tr>
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Booking ID:</td>
+                                <td style="padding: 8px;">{booking.booking_id}</td>
+                            </tr>
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Movie:</td>
+                                <td style="padding: 8px;">{booking.show.movie.title}</td>
+                            </tr>
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Cinema:</td>
+                                <td style="padding: 8px;">{booking.show.screen.cinema.name}</td>
+                            </tr>
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Screen:</td>
+                                <td style="padding: 8px;">{booking.show.screen.name}</td>
+                            </tr>
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Date:</td>
+                                <td style="padding: 8px;">{booking.show.date}</td>
+                            </tr>
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Time:</td>
+                                <td style="padding: 8px;">{booking.show.start_time}</td>
+                            </tr>
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Seats:</td>
+                                <td style="padding: 8px;">{seats_str}</td>
+                            </tr>
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Total Amount:</td>
+                                <td style="padding: 8px;">₹{booking.total_amount}</td>
+                            </tr>
+                        </table>
+                    </div>
+                    
+                    <div style="text-align: center; margin: 30px 0;">
+                        <p><strong>Please present this QR code at the cinema entrance:</strong></p>
+                        <img src="cid:qrcode_image" alt="Booking QR Code" style="width: 200px; height: 200px; border: 1px solid #ddd; padding: 10px; background: white;">
+                    </div>
+                    
+                    <p style="text-align: center; font-style: italic;">
+                        Have a great movie experience!
+                    </p>
+                </div>
+                
+                <div style="background-color: #333; color: white; padding: 15px; text-align: center; border-radius: 0 0 10px 10px; font-size: 12px;">
+                    <p>BookMyShow - Your ultimate movie ticket booking platform</p>
+                </div>
+            </div>
+        </body>
+    </html>
+    """
+    
+    msg = EmailMultiAlternatives(subject, text_content, settings.DEFAULT_FROM_EMAIL, [user.email])
+    msg.attach_alternative(html_content, "text/html")
+    
+    # Attach QR code
+    image = MIMEImage(qr_image_data)
+    image.add_header('Content-ID', '<qrcode_image>')
+    msg.attach(image)
+    
+    _send(msg, 'booking', fail_silently=True)
+
+
+def send_show_reminder_email(user, booking):
+    """Send reminder email for upcoming show"""
+    from email.mime.image import MIMEImage
+
+    subject = f'Reminder: Your show "{booking.show.movie.title}" is tomorrow!'
+    
+    seats_list = booking.get_seats_list()
+    seats_str = ', '.join(seats_list)
+    
+    # QR code carrying the signed ticket payload
+    qr_image_data = ticket_qr_png(booking)
+
+    # Plain text message
+    text_content = f"""
+Dear {user.username},
+
+This is a friendly reminder that your movie show is tomorrow!
+
+Booking Details:
+================
+Ticket Code: {booking.ticket_code}
+Booking ID: {booking.booking_id}
+Movie: {booking.show.movie.title}
+Cinema: {booking.show.screen.cinema.name}
+Screen: {booking.show.screen.name}
+Date: {booking.show.date}
+Time: {booking.show.start_time}
+Seats: {seats_str}
+Total Amount: ₹{booking.total_amount}
+
+Please arrive at least 15 minutes before the show time.
+
+Have a great movie experience!
+
+Best regards,
+BookMyShow Team
+"""
+
+    # HTML message
+    html_content = f"""
+    <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                <div style="background-color: #3498db; color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0;">
+                    <h1 style="margin: 0;">Show Reminder</h1>
+                </div>
+                
+                <div style="padding: 20px; background-color: #f9f9f9; border: 1px solid #ddd;">
+                    <p>Dear <strong>{user.username}</strong>,</p>
+                    
+                    <p>This is a friendly reminder that your movie show is <strong>tomorrow</strong>!</p>
+                    
+                    <div style="background-color: white; padding: 15px; border-radius: 5px; border: 1px solid #eee; margin: 20px 0;">
+                        <h2 style="color: #3498db; border-bottom: 2px solid #3498db; padding-bottom: 10px;">Booking Details</h2>
+                        <table style="width: 100%; border-collapse: collapse;">
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Ticket Code:</td>
+                                <td style="padding: 8px; font-family: monospace; font-size: 18px;">{booking.ticket_code}</td>
+                            </tr>
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Booking ID:</td>
+                                <td style="padding: 8px;">{booking.booking_id}</td>
+                            </tr>
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Movie:</td>
+                                <td style="padding: 8px;">{booking.show.movie.title}</td>
+                            </tr>
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Cinema:</td>
+                                <td style="padding: 8px;">{booking.show.screen.cinema.name}</td>
+                            </tr>
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Screen:</td>
+                                <td style="padding: 8px;">{booking.show.screen.name}</td>
+                            </tr>
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Date:</td>
+                                <td style="padding: 8px;">{booking.show.date}</td>
+                            </tr>
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Time:</td>
+                                <td style="padding: 8px;">{booking.show.start_time}</td>
+                            </tr>
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Seats:</td>
+                                <td style="padding: 8px;">{seats_str}</td>
+                            </tr>
+                            <tr>
+                                <td style="padding: 8px; font-weight: bold;">Total Amount:</td>
+                                <td style="padding: 8px;">₹{booking.total_amount}</td>
+                            </tr>
+                        </table>
+                    </div>
+                    
+                    <div style="background-color: #fff3cd; border: 1px solid #ffeaa7; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                        <p style="margin: 0; font-weight: bold; color: #856404;">
+                            ⏰ Please arrive at least 15 minutes before the show time.
+                        </p>
+                    </div>
+                    
+                    <div style="text-align: center; margin: 30px 0;">
+                        <p><strong>Your QR code for entry:</strong></p>
+                        <img src="cid:qrcode_image" alt="Booking QR Code" style="width: 200px; height: 200px; border: 1px solid #ddd; padding: 10px; background: white;">
+                    </div>
+                    
+                    <p style="text-align: center; font-style: italic;">
+                        Have a great movie experience!
+                    </p>
+                </div>
+                
+                <div style="background-color: #333; color: white; padding: 15px; text-align: center; border-radius: 0 0 10px 10px; font-size: 12px;">
+                    <p>BookMyShow - Your ultimate movie ticket booking platform</p>
+                </div>
+            </div>
+        </body>
+    </html>
+    """
+    
+    msg = EmailMultiAlternatives(subject, text_content, settings.DEFAULT_FROM_EMAIL, [user.email])
+    msg.attach_alternative(html_content, "text/html")
+    
+    # Attach QR code
+    image = MIMEImage(qr_image_data)
+    image.add_header('Content-ID', '<qrcode_image>')
+    msg.attach(image)
+    
+    _send(msg, 'reminder', fail_silently=False)
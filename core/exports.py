@@ -0,0 +1,151 @@
+"""
+Streaming booking exports for analytics (CSV and Parquet)
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .models import Booking
+
+
+EXPORT_CHUNK_SIZE = 2000
+# Exports paged by id (since_id) stop before bookings younger than this, so a
+# booking whose transaction commits after one with a larger id is not skipped
+EXPORT_SETTLE_SECONDS = 300
+
+# (column name, ORM lookup) pairs, fetched in one joined query
+EXPORT_FIELDS = [
+    ('id', 'id'),
+    ('booking_id', 'booking_id'),
+    ('created_at', 'created_at'),
+    ('status', 'status'),
+    ('username', 'user__username'),
+    ('email', 'user__email'),
+    ('movie', 'show__movie__title'),
+    ('language', 'show__movie__language'),
+    ('genre', 'show__movie__genre'),
+    ('cinema', 'show__screen__cinema__name'),
+    ('city', 'show__screen__cinema__city'),
+    ('screen', 'show__screen__name'),
+    ('show_date', 'show__date'),
+    ('show_time', 'show__start_time'),
+    ('price', 'show__price'),
+    ('seats', 'seats'),
+    ('total_amount', 'total_amount'),
+]
+EXPORT_COLUMNS = [name for name, _ in EXPORT_FIELDS] + ['tickets']
+
+_BOOKING_ID = EXPORT_COLUMNS.index('booking_id')
+_CREATED_AT = EXPORT_COLUMNS.index('created_at')
+_SEATS = EXPORT_COLUMNS.index('seats')
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_queryset(date_from=None, date_to=None, since_id=None):
+    """Bookings to export, oldest first, as tuples in EXPORT_FIELDS order.
+
+    ``date_from``/``date_to`` filter on the (local) booking date, as a
+    created_at range so the index is used. ``since_id`` (0 for a first pull)
+    only returns settled bookings with a larger primary key, so the largest
+    exported id is a safe watermark (see settled_before_id).
+    """
+    bookings = Booking.objects.all()
+    if date_from:
+        bookings = bookings.filter(created_at__gte=_day_start(date_from))
+    if date_to:
+        bookings = bookings.filter(created_at__lt=_day_start(date_to + timedelta(days=1)))
+    if since_id is not None:
+        bookings = bookings.filter(id__gt=since_id)
+        before_id = settled_before_id(since_id)
+        if before_id:
+            bookings = bookings.filter(id__lt=before_id)
+    return bookings.order_by('id').values_list(*[lookup for _, lookup in EXPORT_FIELDS])
+
+
+def settled_before_id(since_id):
+    """Id of the first booking after ``since_id`` that is too recent to export, or None.
+
+    Exporting only the ids below it means the watermark never passes a
+    booking that may still be uncommitted.
+    """
+    cutoff = timezone.now() - timedelta(seconds=EXPORT_SETTLE_SECONDS)
+    return (
+        Booking.objects.filter(id__gt=since_id or 0, created_at__gte=cutoff)
+        .order_by('id').values_list('id', flat=True).first()
+    )
+
+
+def iter_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield export rows as plain values, fetching ``chunk_size`` at a time."""
+    for row in queryset.iterator(chunk_size=chunk_size):
+        row = list(row)
+        try:
+            seats = json.loads(row[_SEATS])
+        except (TypeError, ValueError):
+            seats = []
+        row[_SEATS] = ' '.join(seats)
+        row[_CREATED_AT] = timezone.localtime(row[_CREATED_AT]).isoformat()
+        row[_BOOKING_ID] = str(row[_BOOKING_ID])
+        yield row + [len(seats)]
+
+
+class _Echo:
+    """File-like object whose write() just returns the value (for csv.writer)."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows, header=True):
+    """Encode rows as CSV lines one at a time, suitable for streaming."""
+    writer = csv.writer(_Echo())
+    if header:
+        yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_parquet(rows, path, row_group_size=EXPORT_CHUNK_SIZE):
+    """Write rows to a Parquet file, one row group per ``row_group_size`` rows.
+
+    Requires pyarrow, which is imported on first use.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {
+        'id': pa.int64(), 'created_at': pa.timestamp('us', tz='UTC'), 'show_date': pa.date32(),
+        'show_time': pa.time64('us'), 'price': pa.decimal128(10, 2), 'total_amount': pa.decimal128(10, 2),
+        'tickets': pa.int32(),
+    }
+    schema = pa.schema([(name, types.get(name, pa.string())) for name in EXPORT_COLUMNS])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= row_group_size:
+                writer.write_table(_parquet_table(pa, schema, batch))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(_parquet_table(pa, schema, batch))
+            count += len(batch)
+    return count
+
+
+def _parquet_table(pa, schema, batch):
+    columns = list(zip(*batch))
+    # iter_rows formats created_at for CSV; Parquet stores it as a timestamp
+    columns[_CREATED_AT] = [datetime.fromisoformat(value) for value in columns[_CREATED_AT]]
+    arrays = [
+        pa.array(column if field.type != pa.string() else [None if v is None else str(v) for v in column],
+                 type=field.type)
+        for field, column in zip(schema, columns)
+    ]
+    return pa.Table.from_arrays(arrays, schema=schema)
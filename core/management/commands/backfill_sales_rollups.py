@@ -0,0 +1,53 @@
+from collections import defaultdict
+from decimal import Decimal
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from core.models import Booking, DailySalesRollup
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily sales rollups used by the admin dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Number of bookings fetched per database round trip',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write('Rebuilding daily sales rollups...')
+
+        totals = defaultdict(lambda: [0, 0, Decimal('0')])
+        bookings = Booking.objects.filter(status__in=Booking.SOLD_STATUSES).values_list(
+            'created_at', 'show__movie_id', 'show__screen__cinema_id', 'seats', 'total_amount'
+        )
+        for created_at, movie_id, cinema_id, seats, amount in bookings.iterator(chunk_size=batch_size):
+            row = totals[(timezone.localdate(created_at), movie_id, cinema_id)]
+            row[0] += 1
+            try:
+                row[1] += len(json.loads(seats))
+            except (TypeError, ValueError):
+                pass
+            row[2] += amount
+
+        with transaction.atomic():
+            DailySalesRollup.objects.all().delete()
+            DailySalesRollup.objects.bulk_create(
+                (
+                    DailySalesRollup(
+                        day=day, movie_id=movie_id, cinema_id=cinema_id,
+                        bookings=count, tickets=tickets, revenue=revenue,
+                    )
+                    for (day, movie_id, cinema_id), (count, tickets, revenue) in totals.items()
+                ),
+                batch_size=batch_size,
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Wrote {len(totals)} rollup rows.')
+        )
@@ -0,0 +1,151 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+
+from core.models import Movie, Show
+
+BENCH_USERNAME = 'bench-asgi'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent-request throughput of the async read endpoints through the WSGI and '
+        'ASGI handlers, in process. The defaults (a seat map and a movie page) query the database on '
+        'every request; cached values such as seat layouts are warmed by one request before timing. '
+        'Cached endpoints like the movies API run no queries once warm and only measure cache hits.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and mode (default 500)')
+        parser.add_argument('--concurrency', type=int, default=50,
+                            help='Requests in flight: WSGI worker threads / concurrent ASGI tasks (default 50)')
+        parser.add_argument('--db-delay-ms', type=float, default=0,
+                            help='Add this much latency to every query, e.g. to mimic a remote database')
+        parser.add_argument('--path', action='append',
+                            help='Path to request as a logged-in user (repeatable; default a seat map and a movie page)')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be positive')
+        paths = options['path'] or self._default_paths()
+        # The seat map answers logged-in users only
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME)
+        client = Client()
+        client.force_login(user)
+        self.cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        try:
+            self._benchmark(paths, options)
+        finally:
+            client.logout()
+            user.delete()
+
+    def _benchmark(self, paths, options):
+        if connection.settings_dict['CONN_MAX_AGE']:
+            self.stderr.write(
+                'Note: CONN_MAX_AGE is not 0, so ASGI requests leave a connection open per thread '
+                '(the ASGI profile in bms_project/asgi.py sets DB_CONN_MAX_AGE=0).'
+            )
+        if options['db_delay_ms']:
+            delay = options['db_delay_ms'] / 1000
+
+            def slow_execute(execute, sql, params, many, context):
+                time.sleep(delay)
+                return execute(sql, params, many, context)
+
+            def add_delay(sender, connection, **kwargs):
+                connection.execute_wrappers.append(slow_execute)
+
+            connection_created.connect(add_delay, weak=False)
+
+        wsgi_app = get_wsgi_application()
+        asgi_app = get_asgi_application()
+        n, concurrency = options['requests'], options['concurrency']
+        self.stdout.write(
+            f'{n} requests per endpoint, {concurrency} in flight, '
+            f'{options["db_delay_ms"]:g} ms added per query'
+        )
+        self.stdout.write(f'{"path":<28}{"mode":<6}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"errors":>8}')
+        for path in paths:
+            for mode, run in [('wsgi', self._run_wsgi), ('asgi', self._run_asgi)]:
+                app = wsgi_app if mode == 'wsgi' else asgi_app
+                run(app, path, 1, 1)  # warm caches and imports
+                elapsed, timings, errors = run(app, path, n, concurrency)
+                timings.sort()
+                self.stdout.write(
+                    f'{path:<28}{mode:<6}{n / elapsed:>9.0f}{self._percentile(timings, 50):>9.1f}'
+                    f'{self._percentile(timings, 95):>9.1f}{self._percentile(timings, 99):>9.1f}{errors:>8}'
+                )
+
+    def _default_paths(self):
+        movie = Movie.objects.order_by('id').first()
+        show = Show.objects.order_by('id').first()
+        if movie is None or show is None:
+            raise CommandError('No movies or shows to request; run populate_data first or pass --path')
+        return [reverse('show_seats_api', args=[show.id]), reverse('movie_detail', args=[movie.id])]
+
+    @staticmethod
+    def _percentile(sorted_values, pct):
+        return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+    def _run_wsgi(self, app, path, n, concurrency):
+        """Thread-per-request, as a threaded WSGI server runs the app."""
+        def one(_):
+            environ = {'PATH_INFO': path, 'HTTP_HOST': 'localhost', 'HTTP_COOKIE': self.cookie,
+                       'wsgi.input': BytesIO()}
+            setup_testing_defaults(environ)
+            status = []
+            start = time.perf_counter()
+            b''.join(app(environ, lambda s, h, exc_info=None: status.append(s)))
+            return (time.perf_counter() - start) * 1000, status[0].startswith('200')
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, range(n)))
+        return time.perf_counter() - start, [ms for ms, _ in results], sum(1 for _, ok in results if not ok)
+
+    def _run_asgi(self, app, path, n, concurrency):
+        """Concurrent tasks on one event loop, as an ASGI server runs the app."""
+        async def one(limit):
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+                'root_path': '', 'headers': [(b'host', b'localhost'), (b'cookie', self.cookie.encode())],
+                'server': ('localhost', 80), 'client': ('127.0.0.1', 50000),
+            }
+            status = []
+            body_sent = []
+
+            async def receive():
+                if not body_sent:
+                    body_sent.append(True)
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await asyncio.Event().wait()  # the client never disconnects
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            async with limit:
+                start = time.perf_counter()
+                await app(scope, receive, send)
+                return (time.perf_counter() - start) * 1000, status[0] == 200
+
+        async def run_all():
+            limit = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(one(limit) for _ in range(n)))
+
+        start = time.perf_counter()
+        results = asyncio.run(run_all())
+        return time.perf_counter() - start, [ms for ms, _ in results], sum(1 for _, ok in results if not ok)
@@ -0,0 +1,82 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.urls import NoReverseMatch, reverse
+
+
+# (label, CONN_MAX_AGE, CONN_HEALTH_CHECKS)
+MODES = [
+    ('reconnect per request', 0, False),
+    ('persistent', 600, False),
+    ('persistent + health checks', 600, True),
+]
+
+
+class Command(BaseCommand):
+    help = 'Measure per-request latency with and without persistent DB connections'
+
+    def add_arguments(self, parser):
+        # The default must query on every request; cached views such as
+        # movies_list_api run no queries once warm and measure nothing
+        parser.add_argument('--url', default='showtimes_search_api',
+                            help='URL name or path to request; it should query the database on every request '
+                                 '(default: showtimes_search_api)')
+        parser.add_argument('--requests', type=int, default=300, help='Requests per mode (default 300)')
+
+    def handle(self, *args, **options):
+        n = options['requests']
+        if n < 1:
+            raise CommandError('--requests must be positive')
+        try:
+            path = reverse(options['url'])
+        except NoReverseMatch:
+            path = options['url']
+
+        settings_dict = connection.settings_dict
+        original = settings_dict['CONN_MAX_AGE'], settings_dict['CONN_HEALTH_CHECKS']
+        client = Client()
+        self.stdout.write(f'GET {path} x {n} against {connection.vendor} ({settings_dict.get("HOST") or settings_dict["NAME"]})')
+        self.stdout.write(f'{"mode":<28}{"mean ms":>9}{"p50 ms":>9}{"p95 ms":>9}{"connects":>10}')
+        try:
+            for label, max_age, health_checks in MODES:
+                settings_dict['CONN_MAX_AGE'] = max_age
+                settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+                connection.close()
+                timings, connects = self._run(client, path, n)
+                if max_age == 0 and connects < n:
+                    self.stderr.write(
+                        f'Warning: only {connects} of {n} requests opened a connection; {path} runs no '
+                        f'queries on most requests (cached?), so the modes cannot differ'
+                    )
+                timings.sort()
+                self.stdout.write(
+                    f'{label:<28}{statistics.mean(timings):>9.2f}{timings[len(timings) // 2]:>9.2f}'
+                    f'{timings[int(len(timings) * 0.95) - 1]:>9.2f}{connects:>10}'
+                )
+        finally:
+            settings_dict['CONN_MAX_AGE'], settings_dict['CONN_HEALTH_CHECKS'] = original
+            connection.close()
+
+    def _run(self, client, path, n):
+        """Time n requests, running the same connection housekeeping as a real request cycle.
+
+        The test client skips close_old_connections(), so it is called
+        explicitly at request start and end, as Django's handlers do.
+        """
+        timings = []
+        connects = 0
+        for _ in range(n):
+            start = time.perf_counter()
+            close_old_connections()
+            had_connection = connection.connection is not None
+            response = client.get(path)
+            if not had_connection and connection.connection is not None:
+                connects += 1
+            close_old_connections()
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(f'{path} returned {response.status_code}')
+        return timings, connects
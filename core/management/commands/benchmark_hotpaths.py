@@ -0,0 +1,346 @@
+import json
+import platform
+import random
+import statistics
+import time
+from datetime import time as time_cls, timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.template.loader import render_to_string
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.caching import CATALOG, DASHBOARDS, SHOWS, bump_namespace
+from core.emails import send_booking_email
+from core.models import (
+    TICKET_CODE_ALPHABET, TICKET_CODE_LENGTH, Booking, Cinema, Movie, Screen, Seat, SeatLock, Show,
+)
+from core.templatetags.qr_tags import generate_qr
+from core.views import build_seat_grid
+
+
+DEFAULT_BASELINE = 'benchmarks/hotpaths.json'
+SEATS_PER_ROW = 20
+BOOKED_SHARE = 0.7  # of the measured show's seats, in bookings of 1-4 seats
+LOCKED_SHARE = 0.05
+BACKGROUND_SHOWS = 200
+USERS = 100
+BATCH_SIZE = 5000
+
+# name -> size dimensions it depends on
+BENCHMARKS = {
+    'get_available_seats': ('seats', 'bookings'),
+    'get_booked_seats': ('seats', 'bookings'),
+    'seat_grid': ('seats', 'bookings'),
+    'movies_grid_render': (),
+    'generate_qr': (),
+    'booking_email': (),
+    'admin_dashboard': ('bookings',),
+}
+DIMENSIONS = ('seats', 'bookings')
+
+
+def time_call(func, repeat, min_time):
+    """(seconds per call in each of ``repeat`` rounds, calls per round).
+
+    Calls per round are doubled until a round lasts ``min_time`` seconds.
+    """
+    func()  # warm caches and imports
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2
+    rounds = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        rounds.append((time.perf_counter() - start) / loops)
+    return rounds, loops
+
+
+def compare(results, baseline):
+    """(name, baseline ms, current ms, relative change) of every result with a baseline entry.
+
+    Fastest rounds are compared: they are the least disturbed by other load
+    on the machine.
+    """
+    rows = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous:
+            rows.append((name, previous['min_ms'], result['min_ms'], result['min_ms'] / previous['min_ms'] - 1))
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmarks of seat-map, catalog, QR, email and dashboard hot paths at several '
+        'data sizes, compared against a JSON baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seats', type=int, nargs='+', default=[50, 200, 1000],
+                            help='Screen sizes of the measured show (default 50 200 1000)')
+        parser.add_argument('--bookings', type=int, nargs='+', default=[1000, 100000],
+                            help='Bookings in the table, existing ones included (default 1000 100000; e.g. add 1000000)')
+        parser.add_argument('--only', action='append', choices=sorted(BENCHMARKS),
+                            help='Benchmark to run (repeatable; default: all)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed rounds per benchmark (default 5)')
+        parser.add_argument('--min-time', type=float, default=0.1,
+                            help='Minimum seconds per round; calls per round are doubled until reached (default 0.1)')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                            help=f'Baseline JSON, relative to BASE_DIR (default {DEFAULT_BASELINE})')
+        parser.add_argument('--threshold', type=float, default=20,
+                            help='Percent slowdown of the fastest round that counts as a regression (default 20)')
+        parser.add_argument('--save', action='store_true', help='Write these results into the baseline')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1 or min(options['seats'] + options['bookings']) < 1:
+            raise CommandError('--repeat, --seats and --bookings must be positive')
+        names = options['only'] or list(BENCHMARKS)
+        self.rng = random.Random(options['seed'])
+        self.options = options
+
+        results = {}
+        self.stdout.write(f'{"benchmark":<48}{"median ms":>11}{"min ms":>10}{"calls":>8}')
+        # Data is generated in a transaction that is rolled back afterwards,
+        # so the benchmark leaves the database as it found it
+        with transaction.atomic(), override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        ):
+            try:
+                self._setup_common()
+                for bookings in sorted(set(options['bookings'])):
+                    self._fill_bookings(bookings)
+                    for seats in sorted(set(options['seats'])):
+                        self._run(names, results, {'seats': seats, 'bookings': bookings})
+            finally:
+                transaction.set_rollback(True)
+                # Cached entries may refer to rows that no longer exist
+                bump_namespace(CATALOG, SHOWS, DASHBOARDS)
+
+        self._compare_and_save(results)
+
+    # ---- data ----
+
+    def _setup_common(self):
+        User.objects.bulk_create(User(username=f'bench-{i}', email=f'bench-{i}@example.com') for i in range(USERS))
+        self.users = list(User.objects.filter(username__startswith='bench-').order_by('id'))
+        self.staff = User.objects.create(username='bench-staff', is_staff=True)
+        self.cinema = Cinema.objects.create(name='Benchmark Cinema', city='Benchmark', address='-')
+        Movie.objects.bulk_create(
+            Movie(title=f'Benchmark Movie {i}', description='Benchmark', duration_mins=90 + i % 60,
+                  language=Movie.LANGUAGES[i % len(Movie.LANGUAGES)][0],
+                  genre=Movie.GENRES[i % len(Movie.GENRES)][0], is_promoted=i % 10 == 0)
+            for i in range(50)
+        )
+        self.movies = list(Movie.objects.filter(title__startswith='Benchmark Movie').order_by('id'))
+
+        # Background shows that the extra bookings are spread over
+        screen = Screen.objects.create(cinema=self.cinema, name='Background', total_seats=100)
+        first_day = timezone.localdate() - timedelta(days=BACKGROUND_SHOWS // 4)
+        Show.objects.bulk_create(
+            Show(movie=self.movies[i % len(self.movies)], screen=screen,
+                 date=first_day + timedelta(days=i // 4), start_time=time_cls(10 + 3 * (i % 4), 0),
+                 price=200, seats_capacity=100)
+            for i in range(BACKGROUND_SHOWS)
+        )
+        self.background_shows = list(screen.shows.values_list('id', flat=True))
+        self.shows = {}
+        # Sizes count the whole table, so existing bookings are part of them
+        self.used_codes = set(Booking.objects.values_list('ticket_code', flat=True))
+        self.booking_count = len(self.used_codes)
+
+    def _measured_show(self, seat_count):
+        """A show on a screen of ``seat_count`` seats, mostly booked, some locked."""
+        if seat_count in self.shows:
+            return self.shows[seat_count]
+        screen = Screen.objects.create(cinema=self.cinema, name=f'Benchmark {seat_count}', total_seats=seat_count)
+        per_row = max(SEATS_PER_ROW, -(-seat_count // 26))  # single-letter rows
+        numbers = [f'{chr(65 + i // per_row)}{i % per_row + 1}' for i in range(seat_count)]
+        Seat.objects.bulk_create(
+            Seat(screen=screen, number=number, seat_type='Premium' if i < seat_count // 5 else 'Normal')
+            for i, number in enumerate(numbers)
+        )
+        show = Show.objects.create(movie=self.movies[0], screen=screen, date=timezone.localdate() + timedelta(days=1),
+                                   start_time=time_cls(21, 0), price=250)
+
+        shuffled = self.rng.sample(numbers, len(numbers))
+        booked_count = int(seat_count * BOOKED_SHARE)
+        booked, locked = shuffled[:booked_count], shuffled[booked_count:booked_count + int(seat_count * LOCKED_SHARE)]
+        groups = []
+        while booked:
+            size = self.rng.randint(1, 4)
+            groups.append(booked[:size])
+            booked = booked[size:]
+        self._create_bookings([(show.id, group) for group in groups])
+        expires_at = timezone.now() + timedelta(hours=1)
+        SeatLock.objects.bulk_create(
+            SeatLock(show=show, seat_number=number, user=self.users[i % len(self.users)], expires_at=expires_at)
+            for i, number in enumerate(locked)
+        )
+        Show.objects.filter(pk=show.pk).update(seats_booked=booked_count, seats_held=len(locked))
+        show.refresh_from_db()
+        self.shows[seat_count] = show
+        return show
+
+    def _fill_bookings(self, total):
+        """Add bookings on the background shows until the table holds ``total``."""
+        for seat_count in self.options['seats']:
+            self._measured_show(seat_count)
+        missing = total - self.booking_count
+        if missing < 0:
+            raise CommandError(
+                f'The bookings table already holds {self.booking_count} rows (existing data and the measured '
+                f'shows), more than --bookings {total}; pass larger sizes or benchmark a smaller database'
+            )
+        if missing == 0:
+            return
+        start = time.perf_counter()
+        for offset in range(0, missing, BATCH_SIZE):
+            self._create_bookings(
+                (self.rng.choice(self.background_shows), [f'A{self.rng.randint(1, 20)}', f'B{self.rng.randint(1, 20)}'])
+                for _ in range(min(BATCH_SIZE, missing - offset))
+            )
+        call_command('backfill_sales_rollups', stdout=StringIO())
+        self.stdout.write(f'  ({total} bookings ready in {time.perf_counter() - start:.1f} s)')
+
+    def _create_bookings(self, shows_and_seats):
+        # bulk_create skips Booking.save(), so ticket_count and ticket_code are set here
+        bookings = []
+        for show_id, seats in shows_and_seats:
+            bookings.append(Booking(
+                user=self.users[self.booking_count % len(self.users)], show_id=show_id, seats=json.dumps(seats),
+                ticket_count=len(seats), total_amount=Decimal(200 * len(seats)),
+                status='used' if self.booking_count % 10 == 0 else 'confirmed',
+                ticket_code=self._ticket_code(),
+            ))
+            self.booking_count += 1
+        Booking.objects.bulk_create(bookings, batch_size=BATCH_SIZE)
+
+    def _ticket_code(self):
+        while True:
+            code = ''.join(self.rng.choices(TICKET_CODE_ALPHABET, k=TICKET_CODE_LENGTH))
+            if code not in self.used_codes:
+                self.used_codes.add(code)
+                return code
+
+    # ---- benchmarks ----
+
+    def _run(self, names, results, size):
+        for name in names:
+            dims = BENCHMARKS[name]
+            # Size-independent benchmarks run once, at the first size
+            if any(size[dim] != min(self.options[dim]) for dim in DIMENSIONS if dim not in dims):
+                continue
+            label = name + (f'[{",".join(f"{dim}={size[dim]}" for dim in dims)}]' if dims else '')
+            rounds, calls = time_call(getattr(self, f'_bench_{name}')(size), self.options['repeat'],
+                                      self.options['min_time'])
+            results[label] = {
+                'median_ms': statistics.median(rounds) * 1000,
+                'min_ms': min(rounds) * 1000,
+            }
+            self.stdout.write(f'{label:<48}{results[label]["median_ms"]:>11.3f}{results[label]["min_ms"]:>10.3f}{calls:>8}')
+
+    def _bench_get_available_seats(self, size):
+        show = self.shows[size['seats']]
+        return show.get_available_seats
+
+    def _bench_get_booked_seats(self, size):
+        show = self.shows[size['seats']]
+        return show.get_booked_seats
+
+    def _bench_seat_grid(self, size):
+        show = self.shows[size['seats']]
+        seats = list(Seat.objects.filter(screen_id=show.screen_id).order_by('number').values_list('number', 'seat_type'))
+        booked, locked = show.get_booked_seats(), show.get_locked_seats()
+        user_locked = locked[:2]
+        return lambda: build_seat_grid(seats, booked, locked, user_locked)
+
+    def _bench_movies_grid_render(self, size):
+        movies = list(Movie.objects.order_by('-is_promoted', '-created_at'))
+        return lambda: render_to_string('core/_movies_grid.html', {'movies': movies})
+
+    def _bench_generate_qr(self, size):
+        booking = Booking.objects.filter(show=self.shows[min(self.options['seats'])]).first()
+        return lambda: generate_qr(booking)
+
+    def _bench_booking_email(self, size):
+        booking = Booking.objects.select_related('user', 'show__movie', 'show__screen__cinema').filter(
+            show=self.shows[min(self.options['seats'])]
+        ).first()
+
+        def send():
+            send_booking_email(booking.user, booking)
+            mail.outbox.clear()
+        return send
+
+    def _bench_admin_dashboard(self, size):
+        client = Client()
+        client.force_login(self.staff)
+        path = reverse('admin_dashboard')
+
+        def request():
+            bump_namespace(DASHBOARDS)  # recompute the occupancy heatmap
+            response = client.get(path)
+            if response.status_code != 200:
+                raise CommandError(f'admin_dashboard returned {response.status_code}')
+        return request
+
+    # ---- baseline ----
+
+    def _compare_and_save(self, results):
+        path = Path(settings.BASE_DIR) / self.options['baseline']
+        environment = {
+            'python': platform.python_version(), 'django': django.get_version(),
+            'database': connection.vendor, 'machine': platform.machine(),
+        }
+        try:
+            stored = json.loads(path.read_text())
+        except FileNotFoundError:
+            stored = {'environment': environment, 'results': {}}
+        except ValueError as e:
+            raise CommandError(f'Cannot read baseline {path}: {e}')
+
+        rows = compare(results, stored['results'])
+        threshold = self.options['threshold'] / 100
+        regressions = [row for row in rows if row[3] > threshold]
+        if rows:
+            if stored.get('environment') != environment:
+                self.stderr.write(f'Note: baseline was recorded on {stored.get("environment")}, this is {environment}')
+            self.stdout.write(f'\nMin ms against {path} (threshold {self.options["threshold"]:g}%):')
+            for name, before, after, change in rows:
+                flag = 'REGRESSION' if change > threshold else 'faster' if change < -threshold else ''
+                self.stdout.write(f'{name:<48}{before:>11.3f}{after:>10.3f} ms {change:>+8.1%}  {flag}')
+        elif not self.options['save']:
+            self.stdout.write(f'\nNo baseline entries in {path}; run with --save to record one')
+
+        if self.options['save']:
+            stored['environment'] = environment
+            stored['results'].update(results)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(stored, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(f'Saved {len(results)} results to {path}')
+        if regressions:
+            raise CommandError(
+                f'{len(regressions)} benchmark(s) slower than the baseline by more than '
+                f'{self.options["threshold"]:g}%: ' + ', '.join(name for name, *_ in regressions)
+            )
+
@@ -0,0 +1,95 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Runs in a fresh interpreter under -X importtime. App loading happens before
+# the marker, so only the imports triggered by the target module follow it.
+PROBE = r'''
+import json, sys
+import django
+django.setup()
+print('--- target ---', file=sys.stderr, flush=True)
+__import__(sys.argv[1])
+print(json.dumps(sorted(m for m in sys.argv[2:] if m in sys.modules)))
+'''
+MARKER = '--- target ---'
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+DEFAULT_FORBIDDEN = ['razorpay', 'qrcode', 'PIL', 'cryptography']
+
+
+def parse_importtime(stderr):
+    """(module, self_us, cumulative_us, depth) for each import after the marker."""
+    rows = []
+    seen_marker = False
+    for line in stderr.splitlines():
+        if line == MARKER:
+            seen_marker = True
+            continue
+        match = IMPORTTIME_LINE.match(line)
+        if seen_marker and match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure what importing core.views / core.urls costs after app loading (python -X importtime), '
+        'and fail if heavy optional dependencies are imported eagerly'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('modules', nargs='*', default=['core.views', 'core.urls'])
+        parser.add_argument('--runs', type=int, default=5, help='Fresh processes per module (default 5)')
+        parser.add_argument('--top', type=int, default=10, help='Slowest imports to list (default 10)')
+        parser.add_argument('--budget-ms', type=float, help='Fail if a module\'s median import time exceeds this')
+        parser.add_argument(
+            '--forbid', action='append',
+            help=f'Module that must not be loaded by the import (repeatable; default {", ".join(DEFAULT_FORBIDDEN)})',
+        )
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs must be positive')
+        forbidden = options['forbid'] or DEFAULT_FORBIDDEN
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        failures = []
+        for module in options['modules']:
+            totals, slowest, loaded = [], {}, set()
+            for _ in range(options['runs']):
+                proc = subprocess.run(
+                    [sys.executable, '-X', 'importtime', '-c', PROBE, module, *forbidden],
+                    capture_output=True, text=True, env=env, cwd=settings.BASE_DIR,
+                )
+                if proc.returncode:
+                    raise CommandError(f'Importing {module} failed:\n{proc.stderr[-2000:]}')
+                rows = parse_importtime(proc.stderr)
+                loaded.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+                # Top-level rows are the direct imports; their cumulative times add up
+                totals.append(sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000)
+                for name, self_us, cumulative_us, _ in rows:
+                    slowest.setdefault(name, []).append(cumulative_us / 1000)
+
+            median = statistics.median(totals)
+            self.stdout.write(
+                f'import {module}: median {median:.1f} ms   min {min(totals):.1f} ms   max {max(totals):.1f} ms'
+            )
+            ranked = sorted(slowest.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+            for name, values in ranked[:options['top']]:
+                self.stdout.write(f'  {statistics.median(values):8.1f} ms  {name}')
+
+            if loaded:
+                failures.append(f'{module} loads {", ".join(sorted(loaded))}')
+            if options['budget_ms'] is not None and median > options['budget_ms']:
+                failures.append(f'{module} takes {median:.1f} ms (budget {options["budget_ms"]:.1f} ms)')
+
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Import check passed'))
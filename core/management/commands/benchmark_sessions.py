@@ -0,0 +1,62 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request session overhead (time and DB queries) across session backends'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Simulated sessions per backend (default 200; keep below the cache MAX_ENTRIES)')
+        parser.add_argument('--backend', action='append', choices=sorted(settings.SESSION_BACKENDS),
+                            help='Backend to measure (repeatable; default: all)')
+
+    def handle(self, *args, **options):
+        n = options['requests']
+        if n < 1:
+            raise CommandError('--requests must be positive')
+        backends = options['backend'] or list(settings.SESSION_BACKENDS)
+
+        self.stdout.write(
+            f'{n} requests per backend against {connection.vendor} '
+            f'(cache: {settings.CACHES["default"]["BACKEND"].rsplit(".", 1)[-1]})'
+        )
+        self.stdout.write(f'{"backend":<16}{"read us/req":>12}{"write us/req":>14}{"read q/req":>12}{"write q/req":>13}')
+        for name in backends:
+            store_class = import_module(settings.SESSION_BACKENDS[name]).SessionStore
+            read_time, read_queries, write_time, write_queries = self._measure(store_class, n)
+            self.stdout.write(
+                f'{name:<16}{read_time / n * 1e6:>12.1f}{write_time / n * 1e6:>14.1f}'
+                f'{read_queries / n:>12.2f}{write_queries / n:>13.2f}'
+            )
+
+    def _measure(self, store_class, n):
+        """Time n session writes (as at login) and n reads (every later request)."""
+        keys = []
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            for i in range(n):
+                session = store_class()
+                session['_auth_user_id'] = str(i)
+                session['cart'] = {'show_id': i, 'seats': ['A1', 'A2']}
+                session.save()
+                # Cookie sessions carry their data in the key itself
+                keys.append(session.session_key)
+            write_time = time.perf_counter() - start
+        write_queries = len(ctx.captured_queries)
+
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            for key in keys:
+                store_class(key).get('_auth_user_id')
+            read_time = time.perf_counter() - start
+        read_queries = len(ctx.captured_queries)
+
+        for key in keys:
+            store_class(key).delete()
+        return read_time, read_queries, write_time, write_queries
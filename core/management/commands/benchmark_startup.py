@@ -0,0 +1,58 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Runs in a fresh interpreter: import the WSGI app, then serve one request
+PROBE = r'''
+import json, os, sys, time
+from wsgiref.util import setup_testing_defaults
+start = time.perf_counter()
+from bms_project.wsgi import application
+imported = time.perf_counter()
+environ = {'PATH_INFO': sys.argv[1], 'HTTP_HOST': 'localhost'}
+setup_testing_defaults(environ)
+status = []
+body = b''.join(application(environ, lambda s, h, exc_info=None: status.append(s)))
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_request_ms': (served - imported) * 1000,
+    'status': status[0],
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure bms_project.wsgi import time and time-to-first-request in fresh processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh processes to start (default 5)')
+        parser.add_argument('--path', default='/api/meta/', help='Path of the first request (default /api/meta/)')
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs must be positive')
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        results = []
+        for _ in range(options['runs']):
+            proc = subprocess.run(
+                [sys.executable, '-c', PROBE, options['path']],
+                capture_output=True, text=True, env=env, cwd=settings.BASE_DIR,
+            )
+            if proc.returncode:
+                raise CommandError(f'Probe failed:\n{proc.stderr}')
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+        self.stdout.write(f'{options["runs"]} fresh processes, first request GET {options["path"]} -> {results[0]["status"]}')
+        for field, label in [('import_ms', 'import bms_project.wsgi'), ('first_request_ms', 'first request')]:
+            values = [r[field] for r in results]
+            self.stdout.write(
+                f'{label:<24} median {statistics.median(values):8.1f} ms   '
+                f'min {min(values):8.1f} ms   max {max(values):8.1f} ms'
+            )
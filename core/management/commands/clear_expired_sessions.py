@@ -0,0 +1,43 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBSessionStore
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions from the session table in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Sessions deleted per statement (default 5000)')
+        parser.add_argument('--sleep', type=float, default=0,
+                            help='Seconds to pause between batches to spread the load')
+
+    def handle(self, *args, **options):
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if not issubclass(store, DBSessionStore):
+            # Cache entries expire on their own and cookie sessions live client side
+            self.stdout.write(f'{settings.SESSION_ENGINE} keeps no session table; nothing to clean.')
+            return
+
+        # Unlike clearsessions' single DELETE, short batches keep row locks
+        # and transaction size bounded on a busy session table
+        Session = store.get_model_class()
+        now = timezone.now()
+        total = 0
+        while True:
+            keys = list(
+                Session.objects.filter(expire_date__lt=now)
+                .values_list('session_key', flat=True)[:options['batch_size']]
+            )
+            if not keys:
+                break
+            deleted, _ = Session.objects.filter(session_key__in=keys).delete()
+            total += deleted
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {total} expired sessions.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.bootstrap import ensure_default_superuser
+
+
+class Command(BaseCommand):
+    help = 'Create the ADMIN_USERNAME/ADMIN_PASSWORD superuser if it does not exist yet (safe to re-run)'
+
+    def handle(self, *args, **options):
+        if not ensure_default_superuser(stdout=self.stdout):
+            self.stdout.write('Nothing to do (superuser exists or ADMIN_USERNAME/ADMIN_PASSWORD not set).')
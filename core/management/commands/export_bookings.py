@@ -0,0 +1,75 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from core.exports import EXPORT_CHUNK_SIZE, export_queryset, iter_csv, iter_rows, write_parquet
+from core.models import ExportCheckpoint
+
+class Command(BaseCommand):
+    help = 'Export bookings with show, movie and cinema details as CSV or Parquet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-', help='Output file path ("-" for stdout, CSV only)')
+        parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help='Output format')
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat, help='First booking date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat, help='Last booking date (YYYY-MM-DD)')
+        parser.add_argument('--since-id', type=int,
+                            help='Only export bookings with a larger id, leaving out the last five minutes')
+        parser.add_argument(
+            '--incremental',
+            metavar='NAME',
+            help='Export only bookings added since the last run with this checkpoint name, then advance it. '
+                 'Status changes to bookings already exported are not exported again.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help='Rows fetched per round trip / Parquet row group')
+
+    def handle(self, *args, **options):
+        fmt = options['format']
+        output = options['output']
+        if fmt == 'parquet' and output == '-':
+            raise CommandError('Parquet exports need an --output file path.')
+
+        since_id = options['since_id']
+        checkpoint = None
+        if options['incremental']:
+            checkpoint, _ = ExportCheckpoint.objects.get_or_create(name=options['incremental'])
+            since_id = max(since_id or 0, checkpoint.last_booking_id)
+
+        queryset = export_queryset(options['date_from'], options['date_to'], since_id)
+        rows = _LastIdTracker(iter_rows(queryset, options['chunk_size']))
+
+        if fmt == 'parquet':
+            try:
+                count = write_parquet(rows, output, options['chunk_size'])
+            except ImportError:
+                raise CommandError('Parquet export requires pyarrow (pip install pyarrow).')
+        else:
+            if output == '-':
+                count = self._write_csv(rows, lambda line: self.stdout.write(line, ending=''))
+            else:
+                with open(output, 'w', newline='', encoding='utf-8') as f:
+                    count = self._write_csv(rows, f.write)
+
+        if checkpoint and rows.last_id:
+            ExportCheckpoint.objects.filter(pk=checkpoint.pk).update(last_booking_id=rows.last_id)
+
+        self.stderr.write(self.style.SUCCESS(f'Exported {count} bookings.'))
+
+    def _write_csv(self, rows, write):
+        count = -1  # header
+        for line in iter_csv(rows):
+            write(line)
+            count += 1
+        return count
+
+
+class _LastIdTracker:
+    """Iterator wrapper remembering the id (first column) of the last row seen."""
+
+    def __init__(self, rows):
+        self._rows = rows
+        self.last_id = None
+
+    def __iter__(self):
+        for row in self._rows:
+            self.last_id = row[0]
+            yield row
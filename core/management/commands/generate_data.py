@@ -0,0 +1,331 @@
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, time as time_cls, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.caching import CATALOG, DASHBOARDS, SHOWS, bump_namespace
+from core.models import (
+    TICKET_CODE_ALPHABET, TICKET_CODE_LENGTH, Booking, Cinema, DailySalesRollup, Movie, Screen, Seat,
+    SeatLock, Show,
+)
+
+
+CITIES = [
+    'Mumbai', 'Delhi', 'Bengaluru', 'Hyderabad', 'Chennai', 'Kolkata', 'Pune', 'Ahmedabad', 'Jaipur', 'Lucknow',
+    'Kochi', 'Chandigarh', 'Indore', 'Bhopal', 'Nagpur', 'Surat', 'Patna', 'Guwahati', 'Coimbatore', 'Mysuru',
+]
+CHAINS = ['PVR', 'INOX', 'Cinepolis', 'Carnival', 'Miraj', 'Mukta A2']
+SHOW_TIMES = [time_cls(10, 0), time_cls(13, 30), time_cls(17, 0), time_cls(20, 30), time_cls(23, 0), time_cls(8, 0)]
+# Seats per booking and how often each size is chosen
+GROUP_SIZES = [1, 2, 3, 4, 5, 6]
+GROUP_WEIGHTS = [15, 45, 15, 15, 6, 4]
+CANCELLED_SHARE = 0.05
+BOOKING_WINDOW_DAYS = 14  # bookings are made up to this long before the show
+
+
+@contextmanager
+def _keep_created_at(*models):
+    """Let bulk_create store the created_at values we set instead of now()."""
+    fields = [model._meta.get_field('created_at') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a large deterministic data set (cinemas, screens, seats, shows, bookings, '
+        'seat locks) with batched bulk_create'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cities', type=int, default=5)
+        parser.add_argument('--cinemas', type=int, default=4, help='Cinemas per city (default 4)')
+        parser.add_argument('--screens', type=int, default=4, help='Screens per cinema (default 4)')
+        parser.add_argument('--seats', type=int, default=150, help='Seats per screen (default 150)')
+        parser.add_argument('--days', type=int, default=14, help='Days of shows from today (default 14)')
+        parser.add_argument('--past-days', type=int, default=14, help='Days of past shows before today (default 14)')
+        parser.add_argument('--shows-per-day', type=int, default=4, choices=range(1, len(SHOW_TIMES) + 1),
+                            help='Shows per screen and day (default 4)')
+        parser.add_argument('--movies', type=int, default=40)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--bookings', type=int, default=100000, help='Bookings to create (default 100000)')
+        parser.add_argument('--locks', type=int, default=1000, help='Active seat locks on upcoming shows (default 1000)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT (default 5000)')
+        parser.add_argument('--seed', type=int, default=0, help='Same seed, same data (default 0)')
+
+    def handle(self, *args, **options):
+        for name in ['cities', 'cinemas', 'screens', 'seats', 'movies', 'users', 'batch_size']:
+            if options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} must be positive')
+        if options['days'] < 0 or options['past_days'] < 0 or options['days'] + options['past_days'] < 1:
+            raise CommandError('--days plus --past-days must be at least 1')
+        if options['bookings'] < 0 or options['locks'] < 0:
+            raise CommandError('--bookings and --locks cannot be negative')
+        self.prefix = f'synthetic-{options["seed"]}'
+        if User.objects.filter(username__startswith=f'{self.prefix}-').exists():
+            raise CommandError(f'Data for --seed {options["seed"]} already exists; use another seed or flush the database')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.options = options
+        started = time.perf_counter()
+        with transaction.atomic(), _keep_created_at(Booking):
+            self._step('users', self._create_users)
+            self._step('movies', self._create_movies)
+            self._step('cinemas, screens and seats', self._create_venues)
+            self._step('shows', self._create_shows)
+            self._step('bookings and seat locks', self._create_bookings)
+            self._step('sales rollups', self._create_rollups)
+        bump_namespace(CATALOG, SHOWS, DASHBOARDS)
+        self.stdout.write(self.style.SUCCESS(f'Done in {time.perf_counter() - started:.1f} s'))
+
+    def _step(self, label, func):
+        start = time.perf_counter()
+        count = func()
+        self.stdout.write(f'  {label}: {count} rows in {time.perf_counter() - start:.1f} s')
+
+    def _bulk_create(self, model, objects):
+        """bulk_create ``objects`` (any iterable) in batches; returns the row count."""
+        count = 0
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch)
+            count += len(batch)
+        return count
+
+    def _create_users(self):
+        # One unusable password hash for all; nobody logs in as these users
+        password = make_password(None)
+        count = self._bulk_create(User, (
+            User(username=f'{self.prefix}-{i}', email=f'{self.prefix}-{i}@example.com', password=password)
+            for i in range(self.options['users'])
+        ))
+        self.user_ids = list(
+            User.objects.filter(username__startswith=f'{self.prefix}-').order_by('id').values_list('id', flat=True)
+        )
+        return count
+
+    def _create_movies(self):
+        count = self._bulk_create(Movie, (
+            Movie(
+                title=f'Movie {self.options["seed"]}-{i + 1}', description='Generated by generate_data',
+                duration_mins=self.rng.randint(90, 190),
+                language=self.rng.choice(Movie.LANGUAGES)[0], genre=self.rng.choice(Movie.GENRES)[0],
+                is_promoted=self.rng.random() < 0.1,
+            )
+            for i in range(self.options['movies'])
+        ))
+        self.movie_ids = list(
+            Movie.objects.filter(description='Generated by generate_data', title__startswith=f'Movie {self.options["seed"]}-')
+            .order_by('id').values_list('id', flat=True)
+        )
+        # Some movies sell far better than others
+        self.movie_weights = [1 / (rank + 1) for rank in range(len(self.movie_ids))]
+        return count
+
+    def _create_venues(self):
+        options = self.options
+        cinemas = []
+        for c in range(options['cities']):
+            city = CITIES[c % len(CITIES)] + (f' {c // len(CITIES) + 1}' if c >= len(CITIES) else '')
+            for n in range(options['cinemas']):
+                cinemas.append(Cinema(name=f'{CHAINS[n % len(CHAINS)]} {city} {n + 1}', city=city,
+                                      address=f'{n + 1} Generated Road, {city}'))
+        count = self._bulk_create(Cinema, cinemas)
+        cinema_ids = list(
+            Cinema.objects.filter(address__contains=' Generated Road, ').order_by('-id')
+            .values_list('id', flat=True)[:len(cinemas)]
+        )[::-1]
+        count += self._bulk_create(Screen, (
+            Screen(cinema_id=cinema_id, name=f'{self.prefix} Screen {s + 1}', total_seats=options['seats'])
+            for cinema_id in cinema_ids for s in range(options['screens'])
+        ))
+        self.screens = list(
+            Screen.objects.filter(name__startswith=f'{self.prefix} Screen ').order_by('id').values_list('id', 'cinema_id')
+        )
+
+        # Every screen has the same layout; the last fifth of the rows is Premium
+        per_row = max(10, -(-options['seats'] // 26))  # single-letter rows
+        rows = -(-options['seats'] // per_row)
+        self.seat_numbers = [f'{chr(65 + i // per_row)}{i % per_row + 1}' for i in range(options['seats'])]
+        premium_from = (rows - max(1, rows // 5)) * per_row
+        count += self._bulk_create(Seat, (
+            Seat(screen_id=screen_id, number=number, seat_type='Premium' if i >= premium_from else 'Normal')
+            for screen_id, _ in self.screens for i, number in enumerate(self.seat_numbers)
+        ))
+        return count
+
+    def _create_shows(self):
+        options = self.options
+        today = timezone.localdate()
+        times = SHOW_TIMES[:options['shows_per_day']]
+        shows = []
+        for screen_id, _ in self.screens:
+            for day in range(-options['past_days'], options['days']):
+                date = today + timedelta(days=day)
+                for start_time in times:
+                    price = 200 + (50 if start_time.hour >= 17 else 0) + (50 if date.weekday() >= 5 else 0)
+                    shows.append(Show(
+                        movie_id=self.rng.choices(self.movie_ids, self.movie_weights)[0], screen_id=screen_id,
+                        date=date, start_time=start_time, price=price, seats_capacity=options['seats'],
+                    ))
+        count = self._bulk_create(Show, shows)
+        self.shows = list(
+            Show.objects.filter(screen__name__startswith=f'{self.prefix} Screen ')
+            .order_by('id').values_list('id', 'screen_id', 'movie_id', 'date', 'start_time', 'price')
+        )
+        return count
+
+    def _allocate(self, total, weights, capacity):
+        """Split ``total`` over shows in proportion to ``weights``, at most ``capacity`` each."""
+        weight_sum = sum(weights)
+        counts = [min(capacity, int(total * w / weight_sum)) for w in weights]
+        # Hand out what rounding and the caps left over at random by weight,
+        # then whatever still remains to the heaviest shows with room
+        missing = total - sum(counts)
+        for _ in range(3):
+            if missing <= 0:
+                break
+            for i in self.rng.choices(range(len(weights)), weights, k=missing):
+                if counts[i] < capacity:
+                    counts[i] += 1
+                    missing -= 1
+        for i in sorted(range(len(weights)), key=lambda i: -weights[i]):
+            if missing <= 0:
+                break
+            extra = min(capacity - counts[i], missing)
+            counts[i] += extra
+            missing -= extra
+        return counts
+
+    def _create_bookings(self):
+        options = self.options
+        seat_count = len(self.seat_numbers)
+        # Bookings average about 2.6 seats; a third of the seat count always fits
+        capacity = max(1, seat_count // 3)
+        if options['bookings'] > capacity * len(self.shows):
+            raise CommandError(
+                f'{options["bookings"]} bookings do not fit in {len(self.shows)} shows of {seat_count} seats; '
+                f'add shows or seats (about {capacity * len(self.shows)} fit)'
+            )
+        today = timezone.localdate()
+        now = timezone.now()
+        # Evening and weekend shows of popular movies fill first
+        movie_weight = dict(zip(self.movie_ids, self.movie_weights))
+        weights = [
+            movie_weight[movie_id] * (1.5 if start_time.hour >= 17 else 1) * (1.4 if date.weekday() >= 5 else 1)
+            * (0.5 + self.rng.random())
+            for _, _, movie_id, date, start_time, _ in self.shows
+        ]
+        bookings_per_show = self._allocate(options['bookings'], weights, capacity)
+        upcoming = [i for i, (_, _, _, date, _, _) in enumerate(self.shows) if date >= today]
+        if options['locks'] > len(upcoming) * (seat_count // 10):
+            raise CommandError(
+                f'{options["locks"]} seat locks do not fit in {len(upcoming)} upcoming shows '
+                f'(at most a tenth of the seats of each is locked)'
+            )
+        locks_per_show = [0] * len(self.shows)
+        if upcoming and options['locks']:
+            # Holds pile up where the demand is
+            lock_counts = self._allocate(options['locks'], [weights[i] for i in upcoming], seat_count // 10)
+            for i, count in zip(upcoming, lock_counts):
+                locks_per_show[i] = count
+
+        used_codes = set(Booking.objects.values_list('ticket_code', flat=True))
+        self.rollups = defaultdict(lambda: [0, 0, Decimal('0')])
+        cinema_of_screen = dict(self.screens)
+        lock_expiry = now + timedelta(minutes=settings.SEAT_LOCK_DURATION)
+
+        def bookings():
+            for (show_id, screen_id, movie_id, date, start_time, price), booking_count, lock_count in zip(
+                self.shows, bookings_per_show, locks_per_show,
+            ):
+                free = self.rng.sample(self.seat_numbers, seat_count)
+                show_start = timezone.make_aware(datetime.combine(date, start_time))
+                for _ in range(booking_count):
+                    size = min(self.rng.choices(GROUP_SIZES, GROUP_WEIGHTS)[0], len(free) - lock_count)
+                    if size < 1:
+                        break
+                    cancelled = self.rng.random() < CANCELLED_SHARE
+                    seats = free[-size:]
+                    if not cancelled:
+                        # Cancelled bookings release their seats for resale
+                        del free[-size:]
+                    created_at = min(now, show_start) - timedelta(
+                        seconds=self.rng.randint(60, BOOKING_WINDOW_DAYS * 86400)
+                    )
+                    if cancelled:
+                        status = 'cancelled'
+                    else:
+                        status = 'used' if show_start < now and self.rng.random() < 0.85 else 'confirmed'
+                    code = self._ticket_code(used_codes)
+                    amount = price * size
+                    if not cancelled:
+                        row = self.rollups[(timezone.localdate(created_at), movie_id, cinema_of_screen[screen_id])]
+                        row[0] += 1
+                        row[1] += size
+                        row[2] += amount
+                    yield Booking(
+                        user_id=self.rng.choice(self.user_ids), show_id=show_id,
+                        seats=json.dumps(seats), ticket_count=size,
+                        total_amount=amount, status=status, ticket_code=code,
+                        booking_id=uuid.UUID(int=self.rng.getrandbits(128), version=4), created_at=created_at,
+                    )
+                self.locks.extend(
+                    SeatLock(show_id=show_id, seat_number=seat, user_id=self.rng.choice(self.user_ids),
+                             expires_at=lock_expiry)
+                    for seat in free[:lock_count]
+                )
+
+        self.locks = []
+        count = self._bulk_create(Booking, bookings())
+        count += self._bulk_create(SeatLock, self.locks)
+
+        # The views keep the seat counters in step with bookings and locks;
+        # bulk_create does not, so they are set from the new rows in one UPDATE
+        sold = Booking.objects.filter(show=OuterRef('pk'), status__in=Booking.SOLD_STATUSES).order_by().values('show')
+        held = SeatLock.objects.filter(show=OuterRef('pk')).order_by().values('show')
+        Show.objects.filter(screen__name__startswith=f'{self.prefix} Screen ').update(
+            seats_booked=Coalesce(Subquery(sold.annotate(n=Sum('ticket_count')).values('n')), 0),
+            seats_held=Coalesce(Subquery(held.annotate(n=Count('id')).values('n')), 0),
+        )
+        return count
+
+    def _ticket_code(self, used_codes):
+        while True:
+            code = ''.join(self.rng.choices(TICKET_CODE_ALPHABET, k=TICKET_CODE_LENGTH))
+            if code not in used_codes:
+                used_codes.add(code)
+                return code
+
+    def _create_rollups(self):
+        # The sales rollup signals do not fire for bulk_create; the cinemas are new, so no rows exist yet
+        return self._bulk_create(DailySalesRollup, (
+            DailySalesRollup(day=day, movie_id=movie_id, cinema_id=cinema_id, bookings=bookings, tickets=tickets,
+                             revenue=revenue)
+            for (day, movie_id, cinema_id), (bookings, tickets, revenue) in self.rollups.items()
+        ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.models import SeatLock, Show
+
+class Command(BaseCommand):
+    help = 'Recompute per-show seat counters from seats, bookings and locks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Reconcile past shows as well as upcoming ones',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Reconciling show seat counters...')
+
+        # Expired locks still count as held until they are deleted
+        released = SeatLock.release_expired_locks()
+
+        shows = Show.objects.select_related('screen')
+        if not options['all']:
+            shows = shows.filter(date__gte=timezone.now().date())
+
+        checked = 0
+        corrected = 0
+        for show in shows.iterator():
+            checked += 1
+            if show.refresh_seat_counters():
+                corrected += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Checked {checked} shows, corrected {corrected}, '
+                f'released {released} expired locks.'
+            )
+        )
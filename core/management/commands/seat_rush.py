@@ -0,0 +1,284 @@
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import time as time_cls, timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Booking, Cinema, Movie, Screen, Seat, Show
+from core.querylog import percentile
+
+
+SEAT_PATTERN = re.compile(r'data-seat="([^"]+)"\s+data-type="[^"]*"\s+data-status="available"')
+STEPS = ['show_page', 'lock_seats', 'create_order', 'confirm_booking']
+SEATS_PER_ROW = 10
+MAX_ROWS = 26  # single-letter row labels
+
+
+class ClientTransport:
+    """Requests through Django's test client, in this process."""
+
+    def __init__(self, user):
+        self.client = Client()
+        self.client.force_login(user)
+
+    def get(self, path):
+        response = self.client.get(path)
+        return response.status_code, response.content.decode()
+
+    def post_json(self, path, data):
+        response = self.client.post(path, json.dumps(data), content_type='application/json')
+        return response.status_code, _json(response.content)
+
+    def close(self):
+        connection.close()
+
+
+class HttpTransport:
+    """Requests over HTTP to a running server that shares this database and session store."""
+
+    def __init__(self, user, base_url):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        csrf_token = secrets.token_hex(16)
+        self.session.cookies.set(settings.SESSION_COOKIE_NAME, _login_session(user))
+        self.session.cookies.set(settings.CSRF_COOKIE_NAME, csrf_token)
+        self.session.headers['X-CSRFToken'] = csrf_token
+
+    def get(self, path):
+        response = self.session.get(self.base_url + path, allow_redirects=False, timeout=30)
+        return response.status_code, response.text
+
+    def post_json(self, path, data):
+        response = self.session.post(self.base_url + path, json=data, timeout=30)
+        return response.status_code, _json(response.content)
+
+    def close(self):
+        self.session.close()
+
+
+def _json(content):
+    try:
+        return json.loads(content)
+    except ValueError:
+        return {}
+
+
+def _login_session(user):
+    """Session key of a new logged-in session for ``user``, saved to the session store."""
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return session.session_key
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate a ticket-opening rush on one show: concurrent users go through show_page, '
+        'lock_seats, create_order (stub gateway) and confirm_booking. Fails if any seat is sold twice, '
+        'the seats_booked counter disagrees with the bookings, or requests fail with server errors. '
+        'Needs the postgres profile: SQLite serialises writers and fails most of a rush.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--show', type=int, help='Show to rush (default: create a fresh one)')
+        parser.add_argument('--seats', type=int, default=100, help='Seats of the created show (default 100)')
+        parser.add_argument('--users', type=int, default=50, help='Concurrent users (default 50)')
+        parser.add_argument('--seats-per-user', type=int, default=2)
+        parser.add_argument('--hot-seats', type=int, default=20,
+                            help='Users pick among the first N available seats, so they collide (default 20)')
+        parser.add_argument('--retries', type=int, default=3, help='New seat picks after a lock conflict (default 3)')
+        parser.add_argument('--url', help='Base URL of a running server (started with PAYMENT_GATEWAY=stub); '
+                                          'default: in-process test client')
+        parser.add_argument('--max-errors', type=int, default=0,
+                            help='Users hitting server errors or crashing to tolerate before failing (default 0)')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['seats_per_user'] < 1:
+            raise CommandError('--users and --seats-per-user must be positive')
+        if connection.vendor == 'sqlite':
+            self.stderr.write(
+                'Note: SQLite answers concurrent writers with "database is locked"; '
+                'rush the postgres profile (DB_PROFILE=postgres) for meaningful numbers.'
+            )
+        if options['url']:
+            self._run(options)
+        else:
+            # In process the stub gateway is switched on for this run only
+            with override_settings(PAYMENT_GATEWAY='stub'):
+                self._run(options)
+
+    def _run(self, options):
+        if options['show']:
+            try:
+                show = Show.objects.get(pk=options['show'])
+            except Show.DoesNotExist:
+                raise CommandError(f'No show {options["show"]}')
+        else:
+            show = self._create_show(options['seats'])
+        users = self._users(options['users'])
+        if options['url']:
+            transports = [HttpTransport(user, options['url']) for user in users]
+        else:
+            transports = [ClientTransport(user) for user in users]
+
+        self.stdout.write(
+            f'Seat rush: {len(users)} users x {options["seats_per_user"]} seats on show {show.pk} '
+            f'({show.seats_capacity} seats) via {options["url"] or "test client"}'
+        )
+        results = [None] * len(users)
+        barrier = threading.Barrier(len(users))
+
+        def run(i):
+            try:
+                barrier.wait()
+                results[i] = self._rush(transports[i], show.pk, options, random.Random(options['seed'] * 100003 + i))
+            finally:
+                transports[i].close()
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(len(users))]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        self._report(show, [r for r in results if r is not None], elapsed, options['max_errors'])
+
+    def _create_show(self, seat_count):
+        cinema = Cinema.objects.create(name='Seat Rush Cinema', city='Loadtest', address='-')
+        screen = Screen.objects.create(cinema=cinema, name='Screen 1', total_seats=seat_count)
+        per_row = max(SEATS_PER_ROW, -(-seat_count // MAX_ROWS))
+        Seat.objects.bulk_create(
+            Seat(screen=screen, number=f'{chr(65 + i // per_row)}{i % per_row + 1}')
+            for i in range(seat_count)
+        )
+        movie = Movie.objects.create(title='Seat Rush', description='Load test', duration_mins=120,
+                                     language='Hindi', genre='Action')
+        return Show.objects.create(movie=movie, screen=screen, date=timezone.localdate() + timedelta(days=1),
+                                   start_time=time_cls(20, 0), price=200)
+
+    def _users(self, count):
+        users = []
+        for i in range(count):
+            user, created = User.objects.get_or_create(username=f'seat-rush-{i}')
+            if created:
+                user.set_unusable_password()
+                user.save(update_fields=['password'])
+            users.append(user)
+        return users
+
+    def _rush(self, transport, show_id, options, rng):
+        """One user's funnel; returns outcome, per-step timings and lock stats."""
+        timings = defaultdict(list)
+        result = {'timings': timings, 'lock_attempts': 0, 'conflicts': 0, 'requests': 0, 'errors': []}
+
+        def timed(step, call, *args):
+            start = time.perf_counter()
+            status, body = call(*args)
+            timings[step].append((time.perf_counter() - start) * 1000)
+            result['requests'] += 1
+            if status >= 500:
+                result['errors'].append(f'{step}: {body.get("error") if isinstance(body, dict) else status}')
+            return status, body
+
+        try:
+            for _ in range(options['retries'] + 1):
+                status, html = timed('show_page', transport.get, reverse('show_page', args=[show_id]))
+                if status != 200:
+                    return {**result, 'outcome': 'sold_out' if status == 302 else 'error'}
+                available = SEAT_PATTERN.findall(html)
+                if len(available) < options['seats_per_user']:
+                    return {**result, 'outcome': 'sold_out'}
+                seats = rng.sample(available[:max(options['hot_seats'], options['seats_per_user'])],
+                                   options['seats_per_user'])
+                result['lock_attempts'] += 1
+                status, data = timed('lock_seats', transport.post_json, reverse('lock_seats'),
+                                     {'show_id': show_id, 'seats': seats})
+                if status == 200 and data.get('success'):
+                    break
+                if status == 409:
+                    return {**result, 'outcome': 'sold_out'}
+                if status < 500:
+                    result['conflicts'] += 1
+            else:
+                return {**result, 'outcome': 'gave_up'}
+
+            status, data = timed('create_order', transport.post_json, reverse('create_order'),
+                                 {'show_id': show_id, 'seats': seats})
+            if status != 200 or not data.get('success'):
+                return {**result, 'outcome': 'order_failed'}
+            status, data = timed('confirm_booking', transport.post_json, reverse('confirm_booking'), {
+                'show_id': show_id, 'seats': seats, 'order_id': data['order_id'],
+                'payment_id': f'pay_stub_{secrets.token_hex(7)}',
+            })
+            if status != 200 or not data.get('success'):
+                return {**result, 'outcome': 'confirm_failed'}
+            return {**result, 'outcome': 'booked', 'seats': seats}
+        except Exception as e:
+            result['errors'].append(f'{type(e).__name__}: {e}')
+            return {**result, 'outcome': 'error'}
+
+    def _report(self, show, results, elapsed, max_errors):
+        outcomes = Counter(r['outcome'] for r in results)
+        requests = sum(r['requests'] for r in results)
+        lock_attempts = sum(r['lock_attempts'] for r in results)
+        conflicts = sum(r['conflicts'] for r in results)
+        self.stdout.write(
+            f'  {elapsed:.2f} s: {len(results) / elapsed:.1f} users/s, {requests} requests ({requests / elapsed:.1f} req/s)'
+        )
+        self.stdout.write('  outcomes: ' + ', '.join(f'{name} {count}' for name, count in outcomes.most_common()))
+        if lock_attempts:
+            self.stdout.write(f'  lock attempts {lock_attempts}, conflicts {conflicts} ({conflicts / lock_attempts:.1%})')
+        errors = Counter(error for r in results for error in r['errors'])
+        for error, count in errors.most_common(5):
+            self.stderr.write(f'  {count}x server error: {error}')
+
+        self.stdout.write(f'  {"step":<16}{"count":>7}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}')
+        for step in STEPS:
+            values = [ms for r in results for ms in r['timings'].get(step, [])]
+            if values:
+                self.stdout.write(
+                    f'  {step:<16}{len(values):>7}{percentile(values, 50):>9.1f}'
+                    f'{percentile(values, 95):>9.1f}{percentile(values, 99):>9.1f}'
+                )
+
+        sold = Counter()
+        for seats in Booking.objects.filter(show=show, status__in=Booking.SOLD_STATUSES).values_list('seats', flat=True):
+            sold.update(json.loads(seats))
+        show.refresh_from_db()
+        self.stdout.write(
+            f'  seats sold {sum(sold.values())} / {show.seats_capacity}; '
+            f'counters: booked {show.seats_booked}, held {show.seats_held}'
+        )
+        double_sold = {seat: count for seat, count in sold.items() if count > 1}
+        if double_sold:
+            raise CommandError(f'Seats sold more than once: {double_sold}')
+        self.stdout.write(self.style.SUCCESS('  No seat sold twice'))
+
+        problems = []
+        if show.seats_booked != sum(sold.values()):
+            problems.append(f'seats_booked counter is {show.seats_booked} but {sum(sold.values())} seats are sold')
+        failed = sum(1 for r in results if r['errors'] or r['outcome'] == 'error')
+        if failed > max_errors:
+            problems.append(f'{failed} of {len(results)} users hit server errors or crashed (--max-errors {max_errors})')
+        if problems:
+            raise CommandError('; '.join(problems))
@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from core.models import Booking
-from core.views import send_show_reminder_email
+from core.emails import send_show_reminder_email
 from django.utils import timezone
 from datetime import timedelta
 
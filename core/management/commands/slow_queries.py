@@ -0,0 +1,105 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.urls import NoReverseMatch, reverse
+
+from core.querylog import STATS, explain, percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Rank SQL statements by view and fingerprint: from a slow-query log (--log) '
+        'or by requesting URLs in process (--url)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', help='Slow-query log (SLOW_QUERY_LOG_FILE) to aggregate')
+        parser.add_argument('--url', action='append', help='URL name or path to GET (repeatable)')
+        parser.add_argument('--requests', type=int, default=20, help='Requests per --url (default 20)')
+        parser.add_argument('--user', help='Username to log in as for --url requests')
+        parser.add_argument('--sort', choices=['total', 'p95', 'max', 'count'], default='total')
+        parser.add_argument('--limit', type=int, default=10, help='Offenders to print (default 10)')
+        parser.add_argument('--explain', action='store_true', help='Print the EXPLAIN plan of each offender')
+
+    def handle(self, *args, **options):
+        if bool(options['log']) == bool(options['url']):
+            raise CommandError('Pass either --log FILE or one or more --url')
+        if options['log']:
+            rows = self._from_log(options['log'], options['sort'])
+        else:
+            rows = self._from_requests(options)
+        rows = rows[:options['limit']]
+        if not rows:
+            self.stdout.write('No queries recorded')
+            return
+
+        self.stdout.write(f'{"count":>7}{"total ms":>11}{"p95 ms":>9}{"max ms":>9}  view / fingerprint')
+        for row in rows:
+            self.stdout.write(
+                f'{row["count"]:>7}{row["total_ms"]:>11.1f}{row["p95_ms"]:>9.1f}{row["max_ms"]:>9.1f}  '
+                f'{row["view"]}\n{"":>38}{row["fingerprint"][:300]}'
+            )
+            if not options['explain']:
+                continue
+            # Log entries carry the plan captured when the query was slow
+            plan = row.get('explain')
+            if plan is None and row.get('params') is not None:
+                plan = explain(connection, row['sql'], row['params'])
+            if plan:
+                self.stdout.write('\n'.join(f'{"":>40}{line}' for line in plan.splitlines()))
+
+    def _from_log(self, path, sort):
+        """Aggregate slow-query log lines; counts cover slow executions only."""
+        entries = {}
+        try:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if not isinstance(record, dict) or 'fingerprint' not in record:
+                        continue
+                    entry = entries.setdefault((record['view'], record['fingerprint']), {
+                        'view': record['view'], 'fingerprint': record['fingerprint'], 'samples': [],
+                        'sql': record.get('sql'), 'explain': None,
+                    })
+                    entry['samples'].append(record['ms'])
+                    entry['explain'] = record.get('explain') or entry['explain']
+        except OSError as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+        rows = []
+        for entry in entries.values():
+            samples = entry.pop('samples')
+            entry.update(count=len(samples), total_ms=sum(samples), p95_ms=percentile(samples, 95),
+                         max_ms=max(samples))
+            rows.append(entry)
+        key = {'total': 'total_ms', 'p95': 'p95_ms', 'max': 'max_ms', 'count': 'count'}[sort]
+        return sorted(rows, key=lambda row: row[key], reverse=True)
+
+    def _from_requests(self, options):
+        client = Client()
+        if options['user']:
+            try:
+                client.force_login(User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f'No user {options["user"]}')
+        paths = []
+        for url in options['url']:
+            try:
+                paths.append(reverse(url))
+            except NoReverseMatch:
+                paths.append(url)
+
+        with STATS.collecting():
+            for path in paths:
+                for _ in range(options['requests']):
+                    response = client.get(path)
+                    if getattr(response, 'streaming', False):
+                        b''.join(response.streaming_content)
+                    close_old_connections()
+        return STATS.top(limit=None, order_by=options['sort'])
@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from core.models import Movie, Show, Cinema, Screen, Booking
-from core.views import send_booking_email
+from core.emails import send_booking_email
 import json
 from decimal import Decimal
 
@@ -0,0 +1,157 @@
+"""
+In-process request and business metrics, exposed in Prometheus text format.
+
+Recording is a dict update under a lock, cheap enough to leave on under peak
+traffic. Values live in the worker process that recorded them: with several
+workers, scrape each process (or run one worker per scrape target); restarts
+reset the counters, which Prometheus' rate() handles.
+
+Per-request DB query counts and time come from an execute wrapper installed
+on every connection (see ``install_query_counter``); it adds to the stats of
+the request in progress through a context variable, so queries made from
+async views' worker threads are attributed too.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# name -> (type, help)
+METRICS = {
+    'bms_http_requests_total': ('counter', 'HTTP requests by route, method and status'),
+    'bms_http_request_duration_seconds': ('histogram', 'Request latency by route'),
+    'bms_http_request_db_queries': ('histogram', 'Database queries per request by route'),
+    'bms_http_request_db_seconds': ('histogram', 'Database time per request by route'),
+    'bms_seat_lock_attempts_total': ('counter', 'Seat lock attempts by result (locked, conflict, sold_out, error)'),
+    'bms_bookings_total': ('counter', 'Confirmed bookings'),
+    'bms_tickets_sold_total': ('counter', 'Seats sold in confirmed bookings'),
+    'bms_ticket_scans_total': ('counter', 'Ticket scans by result (accepted, conflict, rejected)'),
+    'bms_emails_sent_total': ('counter', 'Emails by kind and result (sent, failed)'),
+    'bms_app_cache_requests_total': ('counter', 'Application cache lookups by namespace and outcome'),
+}
+
+_current_request = ContextVar('bms_request_db_stats', default=None)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += amount
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect_left(buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [buckets, [0] * (len(buckets) + 1), 0.0]
+            histogram[1][index] += 1
+            histogram[2] += value
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def samples(self):
+        """{name: [(suffix, labels, value)]} snapshot of every series."""
+        series = defaultdict(list)
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                series[name].append(('', labels, value))
+            for (name, labels), (buckets, counts, total) in sorted(self._histograms.items(), key=lambda item: item[0]):
+                cumulative = 0
+                for bound, count in zip((*buckets, '+Inf'), counts):
+                    cumulative += count
+                    series[name].append(('_bucket', (*labels, ('le', _format_value(bound))), cumulative))
+                series[name].append(('_sum', labels, total))
+                series[name].append(('_count', labels, cumulative))
+        return series
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+reset = REGISTRY.reset
+
+
+def _format_value(value):
+    if isinstance(value, str):
+        return value
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _cache_samples():
+    from .caching import cache_stats
+
+    return [
+        ('', (('event', event), ('namespace', namespace)), counts[event])
+        for namespace, counts in cache_stats().items()
+        for event in ('hits', 'misses', 'waits')
+    ]
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    series = REGISTRY.samples()
+    series['bms_app_cache_requests_total'].extend(_cache_samples())
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for suffix, labels, value in series.get(name, ()):
+            label_str = ','.join(f'{key}="{_escape(label)}"' for key, label in labels)
+            label_str = f'{{{label_str}}}' if label_str else ''
+            lines.append(f'{name}{suffix}{label_str} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def _count_query(execute, sql, params, many, context):
+    stats = _current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - start
+
+
+def install_query_counter(sender=None, connection=None, **kwargs):
+    """connection_created receiver adding the per-request query counter."""
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def start_request():
+    """Begin timing a request; pass the result to finish_request."""
+    stats = [0, 0.0]
+    return time.perf_counter(), stats, _current_request.set(stats)
+
+
+def finish_request(request, response, token):
+    """Record latency, status and DB stats of a finished request."""
+    started, stats, context_token = token
+    _current_request.reset(context_token)
+    match = getattr(request, 'resolver_match', None)
+    route = match.route if match is not None else '<unmatched>'
+    inc('bms_http_requests_total', route=route, method=request.method, status=str(response.status_code))
+    observe('bms_http_request_duration_seconds', time.perf_counter() - started, route=route)
+    observe('bms_http_request_db_queries', stats[0], buckets=QUERY_COUNT_BUCKETS, route=route)
+    observe('bms_http_request_db_seconds', stats[1], route=route)
@@ -0,0 +1,91 @@
+"""
+Project middleware.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import metrics, querylog
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise, usable in async middleware chains.
+
+    WhiteNoiseMiddleware is sync-only, which makes Django run everything
+    below it (including async views) through sync/async adapters under
+    ASGI. Looking up a static file is an in-memory dict hit, so the async
+    path does it inline and only awaits the rest of the chain.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class RequestHookMiddleware:
+    """Base for sync-and-async middleware that runs code around each request.
+
+    Subclasses implement ``start(request)`` and ``finish(request, response,
+    state)``, where ``state`` is whatever ``start`` returned.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = self.start(request)
+        response = self.get_response(request)
+        self.finish(request, response, state)
+        return response
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        response = await self.get_response(request)
+        self.finish(request, response, state)
+        return response
+
+
+class MetricsMiddleware(RequestHookMiddleware):
+    """Records latency, status and DB usage of every request (see core.metrics)."""
+
+    def start(self, request):
+        return metrics.start_request()
+
+    def finish(self, request, response, state):
+        metrics.finish_request(request, response, state)
+
+
+class QueryLogMiddleware(RequestHookMiddleware):
+    """Attributes SQL statistics and slow queries to the view (see core.querylog)."""
+
+    def start(self, request):
+        return querylog.start_request(request)
+
+    def finish(self, request, response, state):
+        querylog.finish_request(state)
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:12
+
+import json
+
+from django.db import migrations, models
+
+
+def backfill_seat_counters(apps, schema_editor):
+    Show = apps.get_model('core', 'Show')
+    Seat = apps.get_model('core', 'Seat')
+    Booking = apps.get_model('core', 'Booking')
+    SeatLock = apps.get_model('core', 'SeatLock')
+
+    for show in Show.objects.all().iterator():
+        booked = 0
+        for seats in Booking.objects.filter(show_id=show.id, status='confirmed').values_list('seats', flat=True):
+            try:
+                booked += len(json.loads(seats))
+            except (TypeError, ValueError):
+                pass
+        Show.objects.filter(pk=show.pk).update(
+            seats_capacity=Seat.objects.filter(screen_id=show.screen_id).count(),
+            seats_booked=booked,
+            seats_held=SeatLock.objects.filter(show_id=show.id).count(),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_movie_is_promoted_movie_organizer_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='show',
+            name='seats_booked',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='show',
+            name='seats_capacity',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='show',
+            name='seats_held',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_seat_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_show_seat_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cinema',
+            index=models.Index(fields=['city'], name='core_cinema_city_a4c9bb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['language', 'genre'], name='core_movie_languag_ff75b6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='show',
+            index=models.Index(fields=['date', 'start_time'], name='core_show_date_02ce8d_idx'),
+        ),
+    ]
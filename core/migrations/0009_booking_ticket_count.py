@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:10
+
+import json
+
+from django.db import migrations, models
+
+
+def backfill_ticket_count(apps, schema_editor):
+    Booking = apps.get_model('core', 'Booking')
+    for pk, seats in Booking.objects.values_list('pk', 'seats').iterator():
+        try:
+            count = len(json.loads(seats))
+        except (TypeError, ValueError):
+            continue
+        Booking.objects.filter(pk=pk).update(ticket_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_exportcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='ticket_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_ticket_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['created_at'], name='core_bookin_created_f24220_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:40
+
+import secrets
+
+from django.db import migrations, models
+
+
+ALPHABET = 'ABCDEFGHJKMNPQRSTUVWXYZ23456789'
+
+
+def backfill_ticket_code(apps, schema_editor):
+    """Give existing bookings the 8-character UUID prefix staff already used.
+
+    Tickets handed out before this migration show the full booking UUID, so
+    its first 8 characters keep working at the gate. The rare prefix clash
+    gets a fresh random code instead.
+    """
+    Booking = apps.get_model('core', 'Booking')
+    used = set()
+    for pk, booking_id in Booking.objects.order_by('pk').values_list('pk', 'booking_id').iterator():
+        code = booking_id.hex[:8].upper()
+        while code in used:
+            code = ''.join(secrets.choice(ALPHABET) for _ in range(8))
+        used.add(code)
+        Booking.objects.filter(pk=pk).update(ticket_code=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_booking_ticket_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='ticket_code',
+            field=models.CharField(editable=False, max_length=8, null=True),
+        ),
+        migrations.RunPython(backfill_ticket_code, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='booking',
+            name='ticket_code',
+            field=models.CharField(editable=False, max_length=8, unique=True),
+        ),
+    ]
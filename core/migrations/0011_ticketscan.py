@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0010_booking_ticket_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketScan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gate', models.CharField(blank=True, max_length=50)),
+                ('scanned_at', models.DateTimeField()),
+                ('synced_at', models.DateTimeField(auto_now_add=True)),
+                ('result', models.CharField(choices=[('accepted', 'Accepted'), ('duplicate', 'Already used'), ('rejected', 'Rejected')], max_length=20)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scans', to='core.booking')),
+                ('scanned_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ticket_scans', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['scanned_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def recount_booked_seats(apps, schema_editor):
+    """Recount seats_booked with used (scanned) bookings counted as sold.
+
+    Scanning used to subtract a booking's seats from the counter.
+    """
+    Show = apps.get_model('core', 'Show')
+    Booking = apps.get_model('core', 'Booking')
+    sold = Booking.objects.filter(show=OuterRef('pk'), status__in=('confirmed', 'used')).order_by().values('show')
+    Show.objects.update(
+        seats_booked=Coalesce(Subquery(sold.annotate(n=Sum('ticket_count')).values('n')), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_ticketscan'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_booked_seats, migrations.RunPython.noop),
+    ]
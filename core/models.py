@@ -1,14 +1,21 @@
 """
 Database models for BookMyShow clone
 """
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 import uuid
 import json
+import secrets
+
+from .caching import CATALOG, DASHBOARDS, SHOWS, bump_namespace
 
 
 class UserProfile(models.Model):
@@ -38,17 +45,54 @@ class UserProfile(models.Model):
     def has_role(self, role):
         return self.role == role and self.is_role_approved
 
+    @staticmethod
+    def _role_cache_key(user_id):
+        return f'user-role:{user_id}'
+
+    @classmethod
+    def role_state(cls, user):
+        """(role, is_role_approved) for ``user``, without loading the profile.
+
+        Read from the cache (or one values query on a miss) and memoized on the
+        user object for the rest of the request. Users without a profile get
+        (None, False).
+        """
+        if not user.is_authenticated:
+            return None, False
+        state = getattr(user, '_role_state', None)
+        if state is None:
+            key = cls._role_cache_key(user.pk)
+            state = cache.get(key)
+            if state is None:
+                row = cls.objects.filter(user_id=user.pk).values_list('role', 'is_role_approved').first()
+                state = tuple(row) if row else (None, False)
+                cache.set(key, state, settings.ROLE_CACHE_TIMEOUT)
+            user._role_state = state
+        return state
+
+    @classmethod
+    def invalidate_role_cache(cls, user_ids):
+        """Forget cached role state, e.g. after a queryset.update() on profiles."""
+        cache.delete_many([cls._role_cache_key(user_id) for user_id in user_ids])
+
 
 @receiver(post_save, sender=User)
-def create_or_update_user_profile(sender, instance, created, **kwargs):
-    """Ensure every User has an associated UserProfile."""
+def create_user_profile(sender, instance, created, **kwargs):
+    """Ensure every new User has an associated UserProfile."""
+    if not created:
+        return
     try:
-        # Safe even if profile already exists; get_or_create won't overwrite role
         UserProfile.objects.get_or_create(user=instance)
     except Exception:
         pass
 
 
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_role(sender, instance, **kwargs):
+    UserProfile.invalidate_role_cache([instance.user_id])
+
+
 class Cinema(models.Model):
     """Cinema/Theatre model"""
     name = models.CharField(max_length=200)
@@ -58,6 +102,7 @@ class Cinema(models.Model):
 
     class Meta:
         ordering = ['city', 'name']
+        indexes = [models.Index(fields=['city'])]
 
     def __str__(self):
         return f"{self.name} - {self.city}"
@@ -136,6 +181,7 @@ class Movie(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['language', 'genre'])]
 
     def __str__(self):
         return f"{self.title} ({self.language})"
@@ -175,15 +221,82 @@ class Show(models.Model):
     date = models.DateField()
     start_time = models.TimeField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    # Seat counters kept in step with bookings and locks so listings can show
+    # availability without loading the seat map (see adjust_seat_counters)
+    seats_capacity = models.IntegerField(default=0)
+    seats_booked = models.IntegerField(default=0)
+    seats_held = models.IntegerField(default=0)
+
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['date', 'start_time']
         unique_together = ['screen', 'date', 'start_time']
+        # Showtime search filters on date and time window across all screens
+        indexes = [models.Index(fields=['date', 'start_time'])]
 
     def __str__(self):
         return f"{self.movie.title} - {self.screen.cinema.name} - {self.date} {self.start_time}"
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.seats_capacity:
+            self.seats_capacity = self.screen.seats.count()
+        super().save(*args, **kwargs)
+
+    @property
+    def seats_left(self):
+        """Seats neither booked nor held, according to the counters"""
+        return max(self.seats_capacity - self.seats_booked - self.seats_held, 0)
+
+    @property
+    def is_sold_out(self):
+        """Every seat is booked; no lock can ever succeed"""
+        return self.seats_capacity > 0 and self.seats_booked >= self.seats_capacity
+
+    @property
+    def is_near_capacity(self):
+        """Few seats left, though some may be freed when holds expire"""
+        return not self.is_sold_out and self.seats_left <= settings.SHOW_NEAR_CAPACITY_SEATS
+
+    def can_ever_seat(self, count):
+        """Whether ``count`` more seats could be sold, ignoring temporary holds.
+
+        An unknown capacity (0) never rejects; the seat checks decide.
+        """
+        return not self.seats_capacity or count <= self.seats_capacity - self.seats_booked
+
+    @classmethod
+    def adjust_seat_counters(cls, show_id, booked=0, held=0):
+        """Atomically shift the booked/held counters of a show by a delta"""
+        updates = {}
+        if booked:
+            updates['seats_booked'] = Greatest(F('seats_booked') + booked, 0)
+        if held:
+            updates['seats_held'] = Greatest(F('seats_held') + held, 0)
+        if updates:
+            cls.objects.filter(pk=show_id).update(**updates)
+
+    def refresh_seat_counters(self):
+        """Recompute the counters from seat, booking and lock rows.
+
+        The show row is locked for the duration so concurrent counter
+        updates are applied on top of the recomputed values.
+        """
+        with transaction.atomic():
+            Show.objects.select_for_update().filter(pk=self.pk).first()
+            capacity = self.screen.seats.count()
+            booked = len(self.get_booked_seats())
+            held = self.seat_locks.count()
+            changed = (capacity, booked, held) != (
+                self.seats_capacity, self.seats_booked, self.seats_held
+            )
+            self.seats_capacity, self.seats_booked, self.seats_held = capacity, booked, held
+            Show.objects.filter(pk=self.pk).update(
+                seats_capacity=capacity, seats_booked=booked, seats_held=held
+            )
+        return changed
+
     def get_available_seats(self):
         """Get list of available seat numbers"""
         all_seats = list(self.screen.seats.values_list('number', flat=True))
@@ -191,7 +304,7 @@ class Show(models.Model):
         locked_seats = []
 
         # Get booked seats
-        bookings = self.bookings.filter(status='confirmed')
+        bookings = self.bookings.filter(status__in=Booking.SOLD_STATUSES)
         for booking in bookings:
             try:
                 seats = json.loads(booking.seats) if isinstance(booking.seats, str) else booking.seats
@@ -210,7 +323,7 @@ class Show(models.Model):
     def get_booked_seats(self):
         """Get list of booked seat numbers"""
         booked_seats = []
-        bookings = self.bookings.filter(status='confirmed')
+        bookings = self.bookings.filter(status__in=Booking.SOLD_STATUSES)
         for booking in bookings:
             try:
                 seats = json.loads(booking.seats) if isinstance(booking.seats, str) else booking.seats
@@ -225,6 +338,39 @@ class Show(models.Model):
         locks = self.seat_locks.filter(expires_at__gt=now)
         return list(locks.values_list('seat_number', flat=True))
 
+    async def aget_booked_seats(self):
+        """Async get_booked_seats"""
+        booked_seats = []
+        async for seats in self.bookings.filter(status__in=Booking.SOLD_STATUSES).values_list('seats', flat=True):
+            try:
+                booked_seats.extend(json.loads(seats) if isinstance(seats, str) else seats)
+            except (TypeError, ValueError):
+                pass
+        return booked_seats
+
+    async def aget_locked_seats(self):
+        """Async get_locked_seats"""
+        locks = self.seat_locks.filter(expires_at__gt=timezone.now())
+        return [number async for number in locks.values_list('seat_number', flat=True)]
+
+
+# Unambiguous characters for ticket codes (no 0/O, 1/I/L)
+TICKET_CODE_ALPHABET = 'ABCDEFGHJKMNPQRSTUVWXYZ23456789'
+TICKET_CODE_LENGTH = 8
+
+
+def generate_ticket_code():
+    """Random short ticket code that no booking uses yet."""
+    while True:
+        code = ''.join(secrets.choice(TICKET_CODE_ALPHABET) for _ in range(TICKET_CODE_LENGTH))
+        if not Booking.objects.filter(ticket_code=code).exists():
+            return code
+
+
+def normalize_ticket_code(code):
+    """Canonical form of a typed or scanned ticket code."""
+    return code.strip().upper()
+
 
 class Booking(models.Model):
     """Ticket booking"""
@@ -234,21 +380,40 @@ class Booking(models.Model):
         ('cancelled', 'Cancelled'),
         ('used', 'Used'),
     ]
+    # Statuses that count as a sale in revenue and ticket figures
+    SOLD_STATUSES = ('confirmed', 'used')
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings')
     show = models.ForeignKey(Show, on_delete=models.CASCADE, related_name='bookings')
     seats = models.TextField()  # JSON list of seat numbers
+    ticket_count = models.IntegerField(default=0, editable=False)  # len(seats), for SQL aggregates
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=BOOKING_STATUS, default='pending')
     booking_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    # Short code printed on tickets and typed/scanned at the gate (unique index)
+    ticket_code = models.CharField(max_length=TICKET_CODE_LENGTH, unique=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_at'])]
 
     def __str__(self):
         return f"Booking {self.booking_id} - {self.user.username}"
 
+    def save(self, *args, **kwargs):
+        self.ticket_count = len(self.get_seats_list())
+        if not self.ticket_code:
+            self.ticket_code = generate_ticket_code()
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so post_save can detect transitions
+        instance._loaded_status = dict(zip(field_names, values)).get('status')
+        return instance
+
     def get_seats_list(self):
         """Return seats as a list"""
         try:
@@ -257,6 +422,102 @@ class Booking(models.Model):
             return []
 
 
+class DailySalesRollup(models.Model):
+    """Sold bookings aggregated per (day, movie, cinema) for dashboards.
+
+    Maintained incrementally by the Booking signals below; rebuild with the
+    backfill_sales_rollups command.
+    """
+    day = models.DateField()
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='sales_rollups')
+    cinema = models.ForeignKey(Cinema, on_delete=models.CASCADE, related_name='sales_rollups')
+    bookings = models.IntegerField(default=0)
+    tickets = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-day']
+        unique_together = ['day', 'movie', 'cinema']
+
+    def __str__(self):
+        return f"{self.day} - {self.movie_id}/{self.cinema_id}: {self.bookings} bookings"
+
+    @classmethod
+    def record(cls, booking, sign=1):
+        """Add (sign=1) or remove (sign=-1) a booking from its rollup row"""
+        show = booking.show
+        key = {
+            'day': timezone.localdate(booking.created_at),
+            'movie_id': show.movie_id,
+            'cinema_id': show.screen.cinema_id,
+        }
+        if sign > 0:
+            cls.objects.get_or_create(**key)
+        # Removals never create rows (they may run inside a cascading delete)
+        cls.objects.filter(**key).update(
+            bookings=F('bookings') + sign,
+            tickets=F('tickets') + sign * len(booking.get_seats_list()),
+            revenue=F('revenue') + sign * booking.total_amount,
+        )
+
+
+@receiver(post_save, sender=Booking)
+def update_sales_rollup(sender, instance, created, **kwargs):
+    """Keep DailySalesRollup in step when a booking enters or leaves a sold status."""
+    was_sold = not created and getattr(instance, '_loaded_status', None) in Booking.SOLD_STATUSES
+    is_sold = instance.status in Booking.SOLD_STATUSES
+    if was_sold != is_sold:
+        DailySalesRollup.record(instance, 1 if is_sold else -1)
+        if not created:
+            # An older booking changed; cached closed time-series buckets may include it
+            from .timeseries import invalidate_closed_buckets
+            invalidate_closed_buckets()
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Booking)
+def remove_from_sales_rollup(sender, instance, **kwargs):
+    if getattr(instance, '_loaded_status', instance.status) in Booking.SOLD_STATUSES:
+        DailySalesRollup.record(instance, -1)
+        from .timeseries import invalidate_closed_buckets
+        invalidate_closed_buckets()
+
+
+class ExportCheckpoint(models.Model):
+    """High-water mark of an incremental export (last exported booking pk)"""
+    name = models.CharField(max_length=50, unique=True)
+    last_booking_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_booking_id}"
+
+
+class TicketScan(models.Model):
+    """A ticket presented at a gate, scanned online or synced from an offline scanner"""
+    RESULT_ACCEPTED = 'accepted'
+    RESULT_DUPLICATE = 'duplicate'
+    RESULT_REJECTED = 'rejected'
+    RESULT_CHOICES = [
+        (RESULT_ACCEPTED, 'Accepted'),
+        (RESULT_DUPLICATE, 'Already used'),
+        (RESULT_REJECTED, 'Rejected'),
+    ]
+
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='scans')
+    gate = models.CharField(max_length=50, blank=True)
+    scanned_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='ticket_scans')
+    scanned_at = models.DateTimeField()  # scanner clock, may be earlier than synced_at
+    synced_at = models.DateTimeField(auto_now_add=True)
+    result = models.CharField(max_length=20, choices=RESULT_CHOICES)
+
+    class Meta:
+        ordering = ['scanned_at']
+
+    def __str__(self):
+        return f"{self.booking.ticket_code} @ {self.gate or '-'}: {self.result}"
+
+
 class SeatLock(models.Model):
     """Temporary seat lock during booking process"""
     show = models.ForeignKey(Show, on_delete=models.CASCADE, related_name='seat_locks')
@@ -276,12 +537,19 @@ class SeatLock(models.Model):
         return timezone.now() > self.expires_at
 
     @classmethod
-    def release_expired_locks(cls):
-        """Release all expired locks"""
+    def release_expired_locks(cls, queryset=None):
+        """Release all expired locks (optionally within ``queryset``)"""
         now = timezone.now()
-        expired = cls.objects.filter(expires_at__lte=now)
-        count = expired.count()
-        expired.delete()
+        expired = (queryset if queryset is not None else cls.objects.all()).filter(expires_at__lte=now)
+        show_ids = set(expired.values_list('show_id', flat=True))
+        count = 0
+        for show_id in show_ids:
+            # Decrement by what this call actually deleted, so concurrent
+            # releases never double count
+            with transaction.atomic():
+                deleted, _ = expired.filter(show_id=show_id).delete()
+                Show.adjust_seat_counters(show_id, held=-deleted)
+            count += deleted
         return count
         
     @classmethod
@@ -313,3 +581,62 @@ class Wallet(models.Model):
             self.save()
             return True
         return False
+
+
+# ---- Application cache invalidation (see caching.py) ----
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def invalidate_catalog_cache(sender, **kwargs):
+    bump_namespace(CATALOG)
+
+
+@receiver(post_save, sender=Cinema)
+@receiver(post_delete, sender=Cinema)
+@receiver(post_save, sender=Screen)
+@receiver(post_delete, sender=Screen)
+def invalidate_venue_cache(sender, **kwargs):
+    bump_namespace(SHOWS, DASHBOARDS)
+
+
+class _SeatChanges:
+    """Seat edits of one transaction, applied once it commits.
+
+    Editing a seat map saves seats one by one; recounting every show of the
+    screen and bumping the cache per seat made that O(seats x shows).
+    """
+
+    def __init__(self):
+        self.screen_ids = set()
+
+    def __call__(self):
+        for screen_id in self.screen_ids:
+            Show.objects.filter(screen_id=screen_id).update(
+                seats_capacity=Seat.objects.filter(screen_id=screen_id).count()
+            )
+        bump_namespace(SHOWS, DASHBOARDS)
+
+
+def _queue_seat_change(screen_id=None):
+    """Recount capacity for ``screen_id`` (if given) and bump the venue cache after commit."""
+    connection = transaction.get_connection()
+    changes = getattr(connection, 'pending_seat_changes', None)
+    # Rolling back discards the hook, so a batch not in run_on_commit is stale
+    if changes is not None and any(hook[1] is changes for hook in connection.run_on_commit):
+        if screen_id is not None:
+            changes.screen_ids.add(screen_id)
+        return
+    changes = connection.pending_seat_changes = _SeatChanges()
+    if screen_id is not None:
+        changes.screen_ids.add(screen_id)
+    transaction.on_commit(changes)
+
+
+@receiver(post_save, sender=Seat)
+def seat_saved(sender, instance, created, **kwargs):
+    _queue_seat_change(instance.screen_id if created else None)
+
+
+@receiver(post_delete, sender=Seat)
+def seat_removed(sender, instance, **kwargs):
+    _queue_seat_change(instance.screen_id)
@@ -0,0 +1,38 @@
+"""
+Razorpay gateway access.
+
+The razorpay SDK (and the requests stack under it) is imported on the first
+payment call rather than when core.views is imported, and the client is
+reused across requests.
+
+PAYMENT_GATEWAY=stub swaps in an offline gateway that returns fake orders,
+for load tests (see the seat_rush command); never enable it in production.
+"""
+import uuid
+from functools import lru_cache
+
+from django.conf import settings
+
+
+@lru_cache(maxsize=1)
+def _client(key_id, key_secret):
+    import razorpay
+
+    return razorpay.Client(auth=(key_id, key_secret))
+
+
+def get_client():
+    """Shared Razorpay client for the configured credentials."""
+    return _client(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
+
+
+def create_order(amount_paise, currency='INR'):
+    """Create a Razorpay order for ``amount_paise`` and return its dict."""
+    if settings.PAYMENT_GATEWAY == 'stub':
+        return {'id': f'order_stub_{uuid.uuid4().hex[:14]}', 'amount': amount_paise, 'currency': currency,
+                'status': 'created'}
+    return get_client().order.create(data={
+        'amount': amount_paise,
+        'currency': currency,
+        'payment_capture': 1,
+    })
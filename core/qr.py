@@ -0,0 +1,35 @@
+"""
+QR code rendering.
+
+qrcode pulls in PIL, which is slow to import, so both are loaded on the first
+render instead of when views, emails or template tags are imported.
+"""
+from .tickets import sign_ticket
+
+
+def qr_png(data, error_correction='M', box_size=10, border=4):
+    """PNG bytes of a QR code encoding ``data``.
+
+    ``error_correction`` is one of the qrcode levels L, M, Q or H.
+    """
+    from io import BytesIO
+
+    import qrcode
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=getattr(qrcode.constants, f'ERROR_CORRECT_{error_correction}'),
+        box_size=box_size,
+        border=border,
+    )
+    qr.add_data(str(data))
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def ticket_qr_png(booking):
+    """QR code carrying ``booking``'s signed ticket payload."""
+    return qr_png(sign_ticket(booking))
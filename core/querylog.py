@@ -0,0 +1,189 @@
+"""
+SQL statistics per view and fingerprint, and a slow-query log.
+
+Every statement is timed and, when needed, reduced to a fingerprint
+(literals and placeholders replaced, IN lists and VALUES rows collapsed).
+Inside ``STATS.collecting()`` (the slow_queries command) each (view,
+fingerprint) also gets count, total and max time plus recent durations for
+the p95; see ``QueryStats.top``. Outside it nothing is kept per statement.
+
+Statements slower than SLOW_QUERY_MS are logged as one JSON object per line
+on the ``core.querylog`` logger, with the EXPLAIN plan of SELECTs (at most
+once per fingerprint every EXPLAIN_INTERVAL seconds, run in a savepoint so a
+failing EXPLAIN cannot abort the caller's transaction). The slow_queries
+command ranks offenders from that log or from requests it makes itself.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+
+
+logger = logging.getLogger(__name__)
+
+MAX_SAMPLES = 1000  # durations kept per key for the p95
+EXPLAIN_INTERVAL = 300
+MAX_EXPLAINED = 1000  # fingerprints remembered for EXPLAIN throttling
+SQL_LOG_LENGTH = 2000
+
+_current_request = ContextVar('bms_querylog_request', default=None)
+_explaining = ContextVar('bms_querylog_explaining', default=False)
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """Normalise SQL so statements differing only in literals compare equal."""
+    sql = sql.replace('%s', '?')
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+    sql = re.sub(r'\(\s*\?(?:\s*,\s*\?)*\s*\)', '(?...)', sql)
+    sql = re.sub(r'\(\?\.\.\.\)(?:\s*,\s*\(\?\.\.\.\))+', '(?...), ...', sql)
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0
+
+
+class QueryStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.active = False
+
+    def record(self, view, sql_fingerprint, seconds, sql, params):
+        key = (view, sql_fingerprint)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                # The first statement seen is kept as the example (for EXPLAIN)
+                entry = self._entries[key] = {'count': 0, 'total': 0.0, 'max': 0.0,
+                                              'samples': deque(maxlen=MAX_SAMPLES), 'sql': sql, 'params': params}
+            entry['count'] += 1
+            entry['total'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            entry['samples'].append(seconds)
+
+    @contextmanager
+    def collecting(self):
+        """Record statements (from a clean slate) only inside this block."""
+        with self._lock:
+            self._entries.clear()
+            self.active = True
+        try:
+            yield self
+        finally:
+            self.active = False
+
+    def top(self, limit=10, order_by='total'):
+        """Heaviest (view, fingerprint) pairs; times in milliseconds.
+
+        ``order_by`` is total, p95, max or count.
+        """
+        with self._lock:
+            rows = [
+                {
+                    'view': view, 'fingerprint': fp, 'count': e['count'],
+                    'total_ms': e['total'] * 1000, 'p95_ms': percentile(e['samples'], 95) * 1000,
+                    'max_ms': e['max'] * 1000, 'sql': e['sql'], 'params': e['params'],
+                }
+                for (view, fp), e in self._entries.items()
+            ]
+        key = {'total': 'total_ms', 'p95': 'p95_ms', 'max': 'max_ms', 'count': 'count'}[order_by]
+        return sorted(rows, key=lambda row: row[key], reverse=True)[:limit]
+
+
+STATS = QueryStats()
+# fingerprint -> monotonic time of its last EXPLAIN, oldest first
+_last_explained = {}
+_explained_lock = threading.Lock()
+
+
+def current_view():
+    """URL name of the view running this query ('-' outside requests)."""
+    request = _current_request.get()
+    if request is None:
+        return '-'
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else '<middleware>'
+
+
+def explain(connection, sql, params):
+    """EXPLAIN plan of a SELECT as text, or None."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    token = _explaining.set(True)
+    try:
+        # On Postgres an error would otherwise abort the caller's transaction
+        with transaction.atomic(using=connection.alias, savepoint=True), connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+    except Exception as e:
+        return f'EXPLAIN failed: {e}'
+    finally:
+        _explaining.reset(token)
+
+
+def _should_explain(sql_fingerprint):
+    """True at most once per fingerprint every EXPLAIN_INTERVAL seconds."""
+    now = time.monotonic()
+    with _explained_lock:
+        last = _last_explained.get(sql_fingerprint)
+        if last is not None and now - last < EXPLAIN_INTERVAL:
+            return False
+        _last_explained.pop(sql_fingerprint, None)
+        _last_explained[sql_fingerprint] = now
+        # Entries past the interval no longer throttle anything; drop them and
+        # the oldest beyond MAX_EXPLAINED
+        while _last_explained:
+            oldest = next(iter(_last_explained))
+            if len(_last_explained) <= MAX_EXPLAINED and now - _last_explained[oldest] < EXPLAIN_INTERVAL:
+                break
+            del _last_explained[oldest]
+    return True
+
+
+def _log_query(execute, sql, params, many, context):
+    if _explaining.get():
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    seconds = time.perf_counter() - start
+
+    slow = seconds * 1000 >= settings.SLOW_QUERY_MS
+    if not (slow or STATS.active):
+        return result
+    sql_fingerprint = fingerprint(sql)
+    view = current_view()
+    if STATS.active:
+        STATS.record(view, sql_fingerprint, seconds, sql, None if many else params)
+    if slow:
+        entry = {'view': view, 'fingerprint': sql_fingerprint, 'ms': round(seconds * 1000, 2),
+                 'sql': sql[:SQL_LOG_LENGTH]}
+        if settings.SLOW_QUERY_EXPLAIN and not many and _should_explain(sql_fingerprint):
+            entry['explain'] = explain(context['connection'], sql, params)
+        logger.warning('%s', json.dumps(entry))
+    return result
+
+
+def install_query_log(sender=None, connection=None, **kwargs):
+    """connection_created receiver adding the statistics / slow-log wrapper."""
+    if _log_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_log_query)
+
+
+def start_request(request):
+    return _current_request.set(request)
+
+
+def finish_request(token):
+    _current_request.reset(token)
@@ -0,0 +1,189 @@
+"""
+Gate scanning: admitting tickets, per-show manifests for offline scanners and
+bulk sync.
+
+A scanner downloads a show's manifest before doors open: the show's public
+key and, per booking id, seat count and used flag. It verifies signed QR
+payloads locally (tickets.py) and checks them against the manifest. Scans
+made offline are uploaded in batches; each one marks its booking used with a
+conditional UPDATE, so a ticket scanned at two gates is accepted once and
+reported as a conflict the second time. Online scans (the JSON scan API and
+the staff scan page) go through the same path.
+
+Threat model: a gate device, or a leaked manifest, must not let anyone admit
+a ticket that was not sold. The manifest therefore holds no signing key (the
+public key only verifies) and no ticket codes in any form. Codes have about
+40 bits, so even salted hashes of them could be brute-forced offline. Devices
+cannot validate typed ticket codes; they record them, and sync_scans
+validates them on upload. A signed payload is still a bearer token: a copied
+QR code verifies at every gate, and only the synced used state catches the
+second entry.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import metrics
+from .models import Booking, TicketScan, normalize_ticket_code
+from .tickets import InvalidTicket, is_ticket_payload, show_public_key, verify_ticket
+
+
+MAX_SYNC_BATCH = 500
+
+
+def build_manifest(show):
+    """Manifest of a show's sold tickets for offline validation.
+
+    ``tickets`` maps booking id to ``[seats, used]`` where ``used`` is 1 for
+    tickets already scanned when the manifest was generated.
+    """
+    rows = Booking.objects.filter(show=show, status__in=Booking.SOLD_STATUSES).values_list(
+        'pk', 'ticket_count', 'status'
+    )
+    return {
+        'show_id': show.id,
+        'generated_at': timezone.now().isoformat(),
+        # Verifies (but cannot sign) the QR payloads of this show's tickets
+        'signature': 'ed25519',
+        'public_key': show_public_key(show.id),
+        'tickets': {str(pk): [seats, int(status == 'used')] for pk, seats, status in rows},
+    }
+
+
+def parse_scans(items):
+    """Validate an uploaded batch into (code, scanned_at) pairs.
+
+    A code is either a ticket code or a signed QR payload (see tickets.py).
+    Raises ValueError describing the first malformed entry.
+    """
+    if not isinstance(items, list):
+        raise ValueError('scans must be a list')
+    if len(items) > MAX_SYNC_BATCH:
+        raise ValueError(f'At most {MAX_SYNC_BATCH} scans per request')
+    scans = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('code'), str) or not item['code'].strip():
+            raise ValueError(f'scans[{i}] needs a code')
+        scanned_at = timezone.now()
+        if item.get('scanned_at'):
+            scanned_at = parse_datetime(str(item['scanned_at']))
+            if scanned_at is None:
+                raise ValueError(f'scans[{i}] has an invalid scanned_at')
+            if timezone.is_naive(scanned_at):
+                scanned_at = timezone.make_aware(scanned_at)
+        code = item['code'].strip()
+        scans.append((code if is_ticket_payload(code) else normalize_ticket_code(code), scanned_at))
+    return scans
+
+
+def _first_scan(scan):
+    if scan is None:
+        return None
+    return {'gate': scan.gate, 'scanned_at': scan.scanned_at.isoformat()}
+
+
+def sync_scans(scans, user, gate='', show_id=None):
+    """Apply (code, scanned_at) scans in scan-time order.
+
+    Returns one result dict per scan, in the order given. ``result`` is
+    ``accepted``, ``conflict`` (already used; ``first_scan`` says where and
+    when, if known) or ``rejected`` with a ``reason``.
+
+    Signed QR payloads are verified in memory and admitted with a single
+    UPDATE; the booking is only read when that UPDATE matches nothing.
+    """
+    results = [None] * len(scans)
+    tickets = {}
+    for i, (code, _) in enumerate(scans):
+        if is_ticket_payload(code):
+            try:
+                tickets[i] = verify_ticket(code)
+            except InvalidTicket as e:
+                results[i] = {'code': code, 'result': 'rejected', 'reason': e.reason}
+
+    fields = ('id', 'ticket_code', 'show_id', 'status', 'ticket_count')
+    plain_codes = {code for i, (code, _) in enumerate(scans) if results[i] is None and i not in tickets}
+    bookings = {
+        b.ticket_code: b for b in Booking.objects.filter(ticket_code__in=plain_codes).only(*fields)
+    } if plain_codes else {}
+    used = [b for b in bookings.values() if b.status == 'used']
+    first_scans = {
+        scan.booking_id: scan
+        for scan in TicketScan.objects.filter(
+            booking__in=used, result=TicketScan.RESULT_ACCEPTED,
+        ).order_by('-scanned_at')
+    } if used else {}
+
+    records = []
+
+    def record(booking_id, scanned_at, outcome):
+        scan = TicketScan(booking_id=booking_id, gate=gate, scanned_by=user, scanned_at=scanned_at, result=outcome)
+        records.append(scan)
+        return scan
+
+    order = sorted(range(len(scans)), key=lambda i: scans[i][1])
+    with transaction.atomic():
+        for i in order:
+            if results[i] is not None:
+                continue
+            code, scanned_at = scans[i]
+            ticket = tickets.get(i)
+            if ticket is not None:
+                code = ticket['ticket_code']
+                result = {'code': code}
+                if show_id and ticket['show_id'] != show_id:
+                    result.update(result='rejected', reason='wrong_show')
+                    results[i] = result
+                    continue
+                admitted = Booking.objects.filter(
+                    pk=ticket['booking_id'], ticket_code=code, status='confirmed'
+                ).update(status='used')
+                if admitted:
+                    first_scans[ticket['booking_id']] = record(
+                        ticket['booking_id'], scanned_at, TicketScan.RESULT_ACCEPTED
+                    )
+                    result.update(result='accepted', seats=len(ticket['seats']))
+                    results[i] = result
+                    continue
+                # Not admitted: read the booking to explain why
+                booking = Booking.objects.filter(pk=ticket['booking_id'], ticket_code=code).only(*fields).first()
+            else:
+                booking = bookings.get(code)
+                result = {'code': code}
+
+            if booking is None:
+                result.update(result='rejected', reason='not_found')
+            elif show_id and booking.show_id != show_id:
+                result.update(result='rejected', reason='wrong_show')
+                record(booking.pk, scanned_at, TicketScan.RESULT_REJECTED)
+            elif ticket is None and Booking.objects.filter(pk=booking.pk, status='confirmed').update(status='used'):
+                first_scans[booking.pk] = record(booking.pk, scanned_at, TicketScan.RESULT_ACCEPTED)
+                booking.status = 'used'
+                result.update(result='accepted', seats=booking.ticket_count)
+            elif booking.status in Booking.SOLD_STATUSES:
+                record(booking.pk, scanned_at, TicketScan.RESULT_DUPLICATE)
+                if booking.pk not in first_scans:
+                    # Used by another gate after the bookings were read
+                    first_scans[booking.pk] = booking.scans.filter(result=TicketScan.RESULT_ACCEPTED).first()
+                result.update(result='conflict', reason='already_used',
+                              first_scan=_first_scan(first_scans[booking.pk]))
+            else:
+                result.update(result='rejected', reason=booking.status)
+                record(booking.pk, scanned_at, TicketScan.RESULT_REJECTED)
+            results[i] = result
+        TicketScan.objects.bulk_create(records)
+    for outcome, count in Counter(r['result'] for r in results).items():
+        metrics.inc('bms_ticket_scans_total', count, result=outcome)
+    return results
+
+
+def summarize_scans(results):
+    """Counts per outcome alongside the per-scan results."""
+    return {
+        'accepted': sum(1 for r in results if r['result'] == 'accepted'),
+        'conflicts': sum(1 for r in results if r['result'] == 'conflict'),
+        'rejected': sum(1 for r in results if r['result'] == 'rejected'),
+        'results': results,
+    }
@@ -1,8 +1,20 @@
+import json
+import re
+from collections import Counter
+from datetime import time, timedelta
+
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from .models import UserProfile
+from .models import (
+    Booking, Cinema, DailySalesRollup, ExportCheckpoint, Movie, Screen, Seat, SeatLock, Show, TicketScan, UserProfile,
+)
+from .querylog import fingerprint as sql_fingerprint
 
 
 class LoginPortalTests(TestCase):
@@ -111,3 +123,1181 @@ class RegistrationRoleTests(TestCase):
         self.assertFalse(profile.is_role_approved)
         self.assertEqual(profile.role, UserProfile.ROLE_ORGANIZER)
         self.assertIsNone(self.client.session.get('_auth_user_id'))
+
+
+class ShowFixtureMixin:
+    """Builds a small cinema with a single upcoming show."""
+
+    @classmethod
+    def _create_show(cls, seat_count=10, city='Mumbai', start=time(20, 0), days_ahead=1):
+        cinema = Cinema.objects.create(name=f'PVR {city}', city=city, address='Somewhere')
+        screen = Screen.objects.create(cinema=cinema, name='Screen 1', total_seats=seat_count)
+        Seat.objects.bulk_create(
+            Seat(screen=screen, number=f'A{i}') for i in range(1, seat_count + 1)
+        )
+        movie = Movie.objects.create(
+            title='Jawan', description='Action', duration_mins=169,
+            language='Hindi', genre='Action',
+        )
+        return Show.objects.create(
+            movie=movie, screen=screen,
+            date=timezone.localdate() + timedelta(days=days_ahead),
+            start_time=start, price=200,
+        )
+
+    def _lock(self, client, show, seats):
+        return client.post(
+            reverse('lock_seats'),
+            json.dumps({'show_id': show.id, 'seats': seats}),
+            content_type='application/json',
+        )
+
+    def _confirm(self, client, show, seats):
+        return client.post(
+            reverse('confirm_booking'),
+            json.dumps({'show_id': show.id, 'seats': seats, 'payment_id': 'pay_test'}),
+            content_type='application/json',
+        )
+
+
+class ShowSeatCounterTests(ShowFixtureMixin, TestCase):
+    def setUp(self):
+        self.show = self._create_show(seat_count=10)
+        self.user = User.objects.create_user(username='buyer', password='pass12345')
+        self.client.login(username='buyer', password='pass12345')
+
+    def test_capacity_set_on_creation(self):
+        self.assertEqual(self.show.seats_capacity, 10)
+        self.assertEqual(self.show.seats_left, 10)
+
+    def test_lock_and_confirm_update_counters(self):
+        self._lock(self.client, self.show, ['A1', 'A2'])
+        self.show.refresh_from_db()
+        self.assertEqual((self.show.seats_booked, self.show.seats_held), (0, 2))
+
+        # Re-locking replaces the previous hold instead of adding to it
+        self._lock(self.client, self.show, ['A1', 'A2', 'A3'])
+        self.show.refresh_from_db()
+        self.assertEqual(self.show.seats_held, 3)
+
+        self._confirm(self.client, self.show, ['A1', 'A2', 'A3'])
+        self.show.refresh_from_db()
+        self.assertEqual((self.show.seats_booked, self.show.seats_held), (3, 0))
+        self.assertEqual(self.show.seats_left, 7)
+
+    def test_expired_locks_release_held_seats(self):
+        self._lock(self.client, self.show, ['A1'])
+        SeatLock.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(SeatLock.release_expired_locks(), 1)
+        self.show.refresh_from_db()
+        self.assertEqual(self.show.seats_held, 0)
+
+    def test_reconcile_command_repairs_drift(self):
+        Booking.objects.create(
+            user=self.user, show=self.show, seats=json.dumps(['A5', 'A6']),
+            total_amount=400, status='confirmed',
+        )
+        Show.objects.filter(pk=self.show.pk).update(seats_booked=0, seats_held=4)
+        call_command('reconcile_show_counters', stdout=open('/dev/null', 'w'))
+        self.show.refresh_from_db()
+        self.assertEqual((self.show.seats_booked, self.show.seats_held), (2, 0))
+
+    def test_movie_detail_renders_badges_in_one_show_query(self):
+        Show.objects.filter(pk=self.show.pk).update(seats_booked=10)
+        self.client.logout()
+        with self.assertNumQueries(2):  # movie, shows
+            response = self.client.get(reverse('movie_detail', args=[self.show.movie_id]))
+        self.assertContains(response, 'Sold out')
+
+
+class UsedTicketSeatTests(ShowFixtureMixin, TestCase):
+    """Seats of scanned (used) tickets stay sold."""
+
+    def setUp(self):
+        self.show = self._create_show(seat_count=4)
+        self.buyer = User.objects.create_user(username='buyer', password='pass12345')
+        self.client.force_login(self.buyer)
+        self._lock(self.client, self.show, ['A1', 'A2'])
+        self._confirm(self.client, self.show, ['A1', 'A2'])
+        self.booking = Booking.objects.get(show=self.show)
+
+    def test_scanned_seats_stay_booked(self):
+        staff = User.objects.create_user(username='gate', password='pass12345')
+        UserProfile.objects.filter(user=staff).update(role=UserProfile.ROLE_STAFF, is_role_approved=True)
+        self.client.force_login(staff)
+        self.client.post(reverse('staff_scan_ticket'), {'booking_code': self.booking.ticket_code, 'action': 'mark_used'})
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, 'used')
+
+        self.show.refresh_from_db()
+        self.assertEqual(self.show.seats_booked, 2)
+        self.assertEqual(sorted(self.show.get_booked_seats()), ['A1', 'A2'])
+        self.assertNotIn('A1', self.show.get_available_seats())
+        self.client.force_login(self.buyer)
+        self.assertEqual(self._lock(self.client, self.show, ['A1']).status_code, 400)
+
+    def test_migration_recounts_used_seats(self):
+        from importlib import import_module
+        from django.apps import apps
+
+        Booking.objects.filter(pk=self.booking.pk).update(status='used')
+        Show.objects.filter(pk=self.show.pk).update(seats_booked=0)
+        import_module('core.migrations.0012_recount_used_seats').recount_booked_seats(apps, None)
+        self.show.refresh_from_db()
+        self.assertEqual(self.show.seats_booked, 2)
+
+
+class SoldOutFastPathTests(ShowFixtureMixin, TestCase):
+    def setUp(self):
+        self.show = self._create_show(seat_count=4)
+        Show.objects.filter(pk=self.show.pk).update(seats_booked=4)
+        User.objects.create_user(username='buyer', password='pass12345')
+        self.client.login(username='buyer', password='pass12345')
+
+    def test_lock_rejected_without_seat_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._lock(self.client, self.show, ['A1'])
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(response.json()['sold_out'])
+        touched = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('core_seatlock', touched)
+        self.assertNotIn('core_booking', touched)
+
+    def test_show_page_redirects_when_sold_out(self):
+        response = self.client.get(reverse('show_page', args=[self.show.id]))
+        self.assertRedirects(response, reverse('movie_detail', args=[self.show.movie_id]))
+
+    def test_request_larger_than_remaining_capacity_rejected(self):
+        Show.objects.filter(pk=self.show.pk).update(seats_booked=3)
+        response = self._lock(self.client, self.show, ['A1', 'A2'])
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(response.json()['sold_out'])
+
+    def test_show_created_before_its_seats(self):
+        screen = Screen.objects.create(cinema=self.show.screen.cinema, name='Screen 2', total_seats=2)
+        show = Show.objects.create(movie=self.show.movie, screen=screen, date=self.show.date,
+                                   start_time=self.show.start_time, price=200)
+        self.assertEqual(show.seats_capacity, 0)
+        self.assertTrue(show.can_ever_seat(2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Seat.objects.create(screen=screen, number='A1')
+            Seat.objects.create(screen=screen, number='A2')
+        show.refresh_from_db()
+        self.assertEqual(show.seats_capacity, 2)
+        response = self._lock(self.client, show, ['A1', 'A2'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_seat_map_edit_recounts_each_screen_once(self):
+        later = Show.objects.create(movie=self.show.movie, screen=self.show.screen, date=self.show.date,
+                                    start_time=time(22, 0), price=200)
+        capacity = self.show.screen.seats.count()
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for n in range(5):
+                    Seat.objects.create(screen=self.show.screen, number=f'Z{n}')
+                self.show.screen.seats.get(number='Z0').delete()
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "core_show"')]
+        self.assertEqual(len(updates), 1)
+        for show in (self.show, later):
+            show.refresh_from_db()
+            self.assertEqual(show.seats_capacity, capacity + 4)
+
+
+class ShowtimeSearchApiTests(ShowFixtureMixin, TestCase):
+    def setUp(self):
+        self.evening = self._create_show(city='Mumbai', start=time(20, 0), days_ahead=1)
+        self.matinee = Show.objects.create(
+            movie=self.evening.movie, screen=self.evening.screen,
+            date=self.evening.date, start_time=time(13, 0), price=150,
+        )
+        self.elsewhere = self._create_show(city='Delhi', start=time(21, 0), days_ahead=1)
+
+    def test_filters_by_city_date_and_time_window(self):
+        response = self.client.get(reverse('showtimes_search_api'), {
+            'city': 'Mumbai',
+            'date': self.evening.date.isoformat(),
+            'time_from': '19:00',
+            'language': 'Hindi',
+        })
+        data = response.json()
+        self.assertEqual(data['count'], 1)
+        result = data['results'][0]
+        self.assertEqual(result['show_id'], self.evening.id)
+        self.assertEqual(result['cinema']['city'], 'Mumbai')
+        self.assertEqual(result['movie']['title'], 'Jawan')
+
+    def test_city_matches_case_insensitively(self):
+        response = self.client.get(reverse('showtimes_search_api'), {'city': 'mumbai'})
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_page_is_fetched_in_bounded_queries(self):
+        with self.assertNumQueries(2):  # count + page
+            response = self.client.get(reverse('showtimes_search_api'), {'page_size': 2})
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertEqual(response.json()['num_pages'], 2)
+
+    def test_shows_started_today_are_excluded(self):
+        started = Show.objects.create(
+            movie=self.evening.movie, screen=self.evening.screen,
+            date=timezone.localdate(), start_time=time(0, 0), price=150,
+        )
+        response = self.client.get(reverse('showtimes_search_api'))
+        ids = [result['show_id'] for result in response.json()['results']]
+        self.assertNotIn(started.id, ids)
+        self.assertIn(self.evening.id, ids)
+
+    def test_invalid_date_rejected(self):
+        response = self.client.get(reverse('showtimes_search_api'), {'date': 'tonight'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SalesRollupTests(ShowFixtureMixin, TestCase):
+    def setUp(self):
+        self.show = self._create_show()
+        self.user = User.objects.create_user(username='buyer', password='pass12345')
+
+    def _book(self, seats, status='confirmed'):
+        return Booking.objects.create(
+            user=self.user, show=self.show, seats=json.dumps(seats),
+            total_amount=200 * len(seats), status=status,
+        )
+
+    def _rollup(self):
+        return DailySalesRollup.objects.get(movie=self.show.movie)
+
+    def test_rollup_follows_status_transitions(self):
+        booking = self._book(['A1', 'A2'])
+        self._book(['A3'], status='pending')
+        rollup = self._rollup()
+        self.assertEqual((rollup.bookings, rollup.tickets, rollup.revenue), (1, 2, 400))
+
+        booking = Booking.objects.get(pk=booking.pk)
+        booking.status = 'used'
+        booking.save()
+        self.assertEqual(self._rollup().bookings, 1)
+
+        booking.status = 'cancelled'
+        booking.save()
+        rollup = self._rollup()
+        self.assertEqual((rollup.bookings, rollup.tickets, rollup.revenue), (0, 0, 0))
+
+    def test_backfill_matches_incremental_rollups(self):
+        self._book(['A1', 'A2'])
+        self._book(['A3'], status='used')
+        expected = list(DailySalesRollup.objects.values_list('bookings', 'tickets', 'revenue'))
+        DailySalesRollup.objects.all().delete()
+        call_command('backfill_sales_rollups', stdout=open('/dev/null', 'w'))
+        self.assertEqual(list(DailySalesRollup.objects.values_list('bookings', 'tickets', 'revenue')), expected)
+
+    def test_deleting_movie_cascades_cleanly(self):
+        self._book(['A1'])
+        self.show.movie.delete()
+        self.assertFalse(DailySalesRollup.objects.exists())
+
+    def test_admin_dashboard_reads_rollups(self):
+        self._book(['A1', 'A2'])
+        User.objects.create_superuser(username='boss', password='pass12345')
+        self.client.login(username='boss', password='pass12345')
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.context['total_bookings'], 1)
+        self.assertEqual(response.context['total_revenue'], 400)
+        self.assertEqual(response.context['popular_movies'][0].ticket_count, 2)
+
+
+class OrganizerDashboardTests(ShowFixtureMixin, TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user(username='org', password='pass12345')
+        self.organizer.profile.role = UserProfile.ROLE_ORGANIZER
+        self.organizer.profile.save()
+        self.show = self._create_show()
+        Movie.objects.filter(pk=self.show.movie_id).update(organizer=self.organizer)
+        Show.objects.create(
+            movie=self.show.movie, screen=self.show.screen,
+            date=self.show.date, start_time=time(10, 0), price=200,
+        )
+        buyer = User.objects.create_user(username='buyer', password='pass12345')
+        for seats in (['A1'], ['A2', 'A3'], ['A4']):
+            Booking.objects.create(
+                user=buyer, show=self.show, seats=json.dumps(seats),
+                total_amount=200 * len(seats), status='confirmed',
+            )
+        self.client.login(username='org', password='pass12345')
+
+    def test_stats_are_not_inflated_by_bookings(self):
+        response = self.client.get(reverse('organizer_dashboard'))
+        movie = response.context['movies'][0]
+        self.assertEqual(movie.total_shows, 2)
+        self.assertEqual(movie.total_bookings, 3)
+        self.assertEqual(movie.revenue, 800)
+        self.assertEqual(response.context['total_revenue'], 800)
+        self.assertEqual(response.context['total_tickets'], 3)
+
+
+class BookingExportTests(ShowFixtureMixin, TestCase):
+    def setUp(self):
+        self.show = self._create_show()
+        self.user = User.objects.create_user(username='buyer', password='pass12345', is_staff=True)
+        for seats in (['A1'], ['A2', 'A3']):
+            Booking.objects.create(
+                user=self.user, show=self.show, seats=json.dumps(seats),
+                total_amount=200 * len(seats), status='confirmed',
+            )
+
+    def test_endpoint_streams_csv_for_staff(self):
+        self.client.login(username='buyer', password='pass12345')
+        response = self.client.get(reverse('export_bookings_csv'))
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('id,booking_id'))
+        self.assertIn('PVR Mumbai', lines[2])
+        self.assertTrue(lines[2].endswith('A2 A3,400.00,2'))
+
+    def test_endpoint_forbidden_for_customers(self):
+        User.objects.create_user(username='customer', password='pass12345')
+        self.client.login(username='customer', password='pass12345')
+        self.assertEqual(self.client.get(reverse('export_bookings_csv')).status_code, 403)
+
+    def test_incremental_command_advances_checkpoint(self):
+        import os, tempfile
+        path = os.path.join(tempfile.mkdtemp(), 'bookings.csv')
+        Booking.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        call_command('export_bookings', output=path, incremental='finance', stderr=open(os.devnull, 'w'))
+        with open(path) as f:
+            self.assertEqual(len(f.readlines()), 3)
+        self.assertEqual(ExportCheckpoint.objects.get(name='finance').last_booking_id, Booking.objects.latest('id').id)
+
+        call_command('export_bookings', output=path, incremental='finance', stderr=open(os.devnull, 'w'))
+        with open(path) as f:
+            self.assertEqual(len(f.readlines()), 1)  # header only
+
+    def test_incremental_export_waits_for_recent_bookings_to_settle(self):
+        from io import StringIO
+
+        first = Booking.objects.order_by('id').first()
+        Booking.objects.filter(pk=first.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        out = StringIO()
+        call_command('export_bookings', incremental='finance', stdout=out, stderr=StringIO())
+        self.assertEqual(len(out.getvalue().splitlines()), 2)  # header + the settled booking
+        # The recent booking is exported by a later run rather than skipped
+        self.assertEqual(ExportCheckpoint.objects.get(name='finance').last_booking_id, first.id)
+
+    def test_endpoint_since_id_waits_for_recent_bookings_to_settle(self):
+        first = Booking.objects.order_by('id').first()
+        Booking.objects.filter(pk=first.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        self.client.login(username='buyer', password='pass12345')
+        response = self.client.get(reverse('export_bookings_csv'), {'since_id': 0})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], [str(first.id)])
+
+    def test_parquet_columns_are_typed(self):
+        import os
+        import tempfile
+        from decimal import Decimal
+        from io import StringIO
+
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest('pyarrow is not installed')
+        path = os.path.join(tempfile.mkdtemp(), 'bookings.parquet')
+        self.addCleanup(os.remove, path)
+        call_command('export_bookings', format='parquet', output=path, stderr=StringIO())
+        table = pq.read_table(path)
+        self.assertEqual(str(table.schema.field('created_at').type), 'timestamp[us, tz=UTC]')
+        self.assertEqual(str(table.schema.field('show_date').type), 'date32[day]')
+        row = table.to_pylist()[1]
+        self.assertEqual((row['total_amount'], row['tickets']), (Decimal('400.00'), 2))
+        self.assertEqual(row['show_date'], self.show.date)
+
+    def test_date_range_uses_local_day_bounds(self):
+        from io import StringIO
+
+        today = timezone.localdate()
+        out = StringIO()
+        call_command('export_bookings', date_from=today, date_to=today, stdout=out, stderr=StringIO())
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+        call_command('export_bookings', date_to=today - timedelta(days=1), stdout=out, stderr=StringIO())
+        self.assertEqual(len(out.getvalue().splitlines()), 4)  # header only
+
+
+class OccupancyAnalyticsTests(ShowFixtureMixin, TestCase):
+    def test_report_matrices_and_percentiles(self):
+        import numpy as np
+        from .analytics import occupancy_report
+
+        show = self._create_show(seat_count=10, days_ahead=-7)
+        Show.objects.filter(pk=show.pk).update(seats_booked=8)
+        other = Show.objects.create(
+            movie=show.movie, screen=show.screen, date=show.date,
+            start_time=time(10, 0), price=200,
+        )
+        Show.objects.filter(pk=other.pk).update(seats_booked=2)
+
+        report = occupancy_report(Show.objects.all())
+        weekday = show.date.weekday()
+        self.assertEqual(report['slots'], ['10:00', '20:00'])
+        self.assertAlmostEqual(report['weekday_slot'][weekday][1], 0.8)
+        self.assertAlmostEqual(report['weekday_slot'][weekday][0], 0.2)
+        self.assertAlmostEqual(report['overall']['fill_rate'], 0.5)
+        self.assertTrue(np.allclose(report['screen_percentiles'], [[0.5, 0.74]]))
+
+    def test_dashboard_renders_heatmap(self):
+        show = self._create_show(seat_count=10, days_ahead=-1)
+        Show.objects.filter(pk=show.pk).update(seats_booked=9)
+        User.objects.create_superuser(username='boss', password='pass12345')
+        self.client.login(username='boss', password='pass12345')
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertContains(response, 'Occupancy Heatmap')
+        self.assertContains(response, '90%')
+
+
+class RevenueTimeseriesTests(ShowFixtureMixin, TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.show = self._create_show()
+        self.user = User.objects.create_user(username='boss', password='pass12345', is_staff=True)
+        self.client.login(username='boss', password='pass12345')
+        self.old = Booking.objects.create(
+            user=self.user, show=self.show, seats=json.dumps(['A1', 'A2']),
+            total_amount=400, status='confirmed',
+        )
+        Booking.objects.filter(pk=self.old.pk).update(created_at=timezone.now() - timedelta(days=2))
+        Booking.objects.create(
+            user=self.user, show=self.show, seats=json.dumps(['A3']),
+            total_amount=200, status='used',
+        )
+
+    def _get(self, **params):
+        return self.client.get(reverse('revenue_timeseries_api'), {'bucket': 'day', **params}).json()
+
+    def test_daily_buckets_are_zero_filled(self):
+        today = timezone.localdate()
+        data = self._get(**{'from': (today - timedelta(days=3)).isoformat(), 'to': today.isoformat()})
+        self.assertEqual([p['tickets'] for p in data['series']], [0, 2, 0, 1])
+        self.assertEqual(data['totals']['revenue'], '600.00')
+
+    def test_closed_buckets_are_served_from_cache(self):
+        self._get()
+        with CaptureQueriesContext(connection) as ctx:
+            data = self._get()
+        # Only the current bucket is aggregated (besides session/user lookups)
+        self.assertEqual(len([q for q in ctx.captured_queries if 'core_booking' in q['sql']]), 1)
+        self.assertEqual(data['totals']['bookings'], 2)
+
+    def test_status_change_invalidates_closed_buckets(self):
+        self._get()
+        booking = Booking.objects.get(pk=self.old.pk)
+        booking.status = 'cancelled'
+        booking.save()
+        self.assertEqual(self._get()['totals']['bookings'], 1)
+
+    def test_customers_are_rejected(self):
+        User.objects.create_user(username='customer', password='pass12345')
+        self.client.login(username='customer', password='pass12345')
+        self.assertEqual(self.client.get(reverse('revenue_timeseries_api')).status_code, 403)
+
+
+class QueryBudgetTests(ShowFixtureMixin, TestCase):
+    """Every URL in core/urls.py has a maximum query count per role.
+
+    The seeded data has several rows behind every list, so an N+1 pushes a
+    view over its budget. On failure the offending statements are listed by
+    fingerprint with their repeat counts.
+    """
+
+    ROLES = ['anonymous', 'customer', 'organizer', 'staff', 'admin']
+
+    # url name -> (method, body) for views that are not plain GETs
+    REQUESTS = {
+        'lock_seats': ('post', {'seats': ['A9']}),
+        'create_order': ('post', {'seats': ['A9']}),
+        'confirm_booking': ('post', {'seats': ['A9']}),
+        'scan_sync': ('post', {'gate': 'G1', 'scans': [{'code': 'NOPE2345'}]}),
+        'scan_tickets_api': ('post', {'codes': ['NOPE2345']}),
+    }
+
+    # url name -> {role: max queries}; roles left out use the 'default' entry
+    QUERY_BUDGETS = {
+        'home': {'default': 3},
+        'movies': {'default': 3},
+        'movie_detail': {'default': 5},
+        'show_page': {'default': 11},
+        'lock_seats': {'default': 11},
+        'confirm_booking': {'default': 17},
+        'create_order': {'default': 4},
+        'movies_list_api': {'default': 1},
+        'movies_meta_api': {'default': 0},
+        'show_seats_api': {'default': 5},
+        'showtimes_search_api': {'default': 2},
+        'revenue_timeseries_api': {'default': 4},
+        'register': {'default': 2},
+        'verify_otp': {'default': 2},
+        'login': {'default': 2},
+        'organizer_login': {'default': 2},
+        'staff_login': {'default': 2},
+        'logout': {'default': 4},
+        'profile': {'default': 6},
+        'my_bookings': {'default': 3},
+        'admin_dashboard': {'default': 2, 'admin': 10},
+        'organizer_dashboard': {'default': 2, 'organizer': 9},
+        'organizer_movie_create': {'default': 2},
+        'organizer_movie_edit': {'default': 3},
+        'organizer_movie_delete': {'default': 3},
+        'wallet_view': {'default': 3},
+        'promote_movie': {'default': 4},
+        'admin_gift_funds': {'default': 2},
+        'export_bookings_csv': {'default': 3},
+        'staff_scan_ticket': {'default': 2},
+        'scan_manifest': {'default': 4},
+        'scan_sync': {'default': 5},
+        'scan_tickets_api': {'default': 5},
+        'metrics': {'default': 2},
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {}
+        for role, profile_role in [
+            ('customer', UserProfile.ROLE_CUSTOMER),
+            ('organizer', UserProfile.ROLE_ORGANIZER),
+            ('staff', UserProfile.ROLE_STAFF),
+            ('admin', UserProfile.ROLE_CUSTOMER),
+        ]:
+            user = User.objects.create_user(username=role, password='pass12345', is_staff=(role == 'admin'))
+            UserProfile.objects.filter(user=user).update(role=profile_role)
+            cls.users[role] = user
+
+        shows = [
+            cls._create_show(seat_count=20, city=city, days_ahead=day)
+            for city in ('Mumbai', 'Delhi') for day in (-1, 0, 1)
+        ]
+        Movie.objects.update(organizer=cls.users['organizer'])
+        cls.show = shows[-1]
+        cls.movie = cls.show.movie
+        for i, show in enumerate(shows):
+            for buyer in ('customer', 'organizer', 'staff'):
+                Booking.objects.create(
+                    user=cls.users[buyer], show=show, seats=json.dumps([f'A{i + 1}', f'B{i + 1}']),
+                    total_amount=400, status='confirmed',
+                )
+            SeatLock.objects.create(
+                show=show, seat_number='A20', user=cls.users['staff'],
+                expires_at=timezone.now() + timedelta(minutes=5),
+            )
+
+    def setUp(self):
+        # Budgets assume role state is cached, as it is after the first request
+        for user in self.users.values():
+            UserProfile.role_state(User.objects.get(pk=user.pk))
+
+    def _url_kwargs(self, pattern):
+        kwargs = {}
+        for name in pattern.pattern.converters:
+            kwargs[name] = {'movie_id': self.movie.id, 'show_id': self.show.id}[name]
+        return kwargs
+
+    def _request(self, name, kwargs):
+        method, body = self.REQUESTS.get(name, ('get', None))
+        url = reverse(name, kwargs=kwargs)
+        if method == 'post':
+            response = self.client.post(
+                url, json.dumps({'show_id': self.show.id, **body}), content_type='application/json'
+            )
+        else:
+            response = self.client.get(url)
+        if getattr(response, 'streaming', False):
+            b''.join(response.streaming_content)
+        return response
+
+    def test_every_url_declares_a_budget(self):
+        from .urls import urlpatterns
+        missing = sorted(p.name for p in urlpatterns if p.name not in self.QUERY_BUDGETS)
+        self.assertEqual(missing, [], 'Add these URLs to QueryBudgetTests.QUERY_BUDGETS')
+
+    def test_views_stay_within_query_budget(self):
+        from .urls import urlpatterns
+        for pattern in urlpatterns:
+            budgets = self.QUERY_BUDGETS.get(pattern.name, {})
+            for role in self.ROLES:
+                budget = budgets.get(role, budgets.get('default'))
+                if budget is None:
+                    continue
+                with self.subTest(url=pattern.name, role=role):
+                    self.client.logout()
+                    if role != 'anonymous':
+                        self.client.force_login(self.users[role])
+                    with CaptureQueriesContext(connection) as ctx:
+                        self._request(pattern.name, self._url_kwargs(pattern))
+                    if len(ctx.captured_queries) > budget:
+                        counts = Counter(sql_fingerprint(q['sql']) for q in ctx.captured_queries)
+                        report = '\n'.join(f'  {n}x {sql}' for sql, n in counts.most_common())
+                        self.fail(
+                            f'{pattern.name} as {role}: {len(ctx.captured_queries)} queries '
+                            f'(budget {budget})\n{report}'
+                        )
+
+
+class TicketCodeTests(ShowFixtureMixin, TestCase):
+    def setUp(self):
+        self.show = self._create_show()
+        buyer = User.objects.create_user(username='buyer', password='pass12345')
+        self.booking = Booking.objects.create(
+            user=buyer, show=self.show, seats=json.dumps(['A1']), total_amount=200, status='confirmed',
+        )
+        staff = User.objects.create_user(username='gate', password='pass12345')
+        UserProfile.objects.filter(user=staff).update(role=UserProfile.ROLE_STAFF, is_role_approved=True)
+        self.client.force_login(staff)
+
+    def test_code_generated_at_booking_time(self):
+        code = self.booking.ticket_code
+        self.assertEqual(len(code), 8)
+        self.assertTrue(set(code) <= set('ABCDEFGHJKMNPQRSTUVWXYZ23456789'))
+        self.booking.save()
+        self.assertEqual(self.booking.ticket_code, code)
+
+    def test_scan_by_code_uses_exact_lookup(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(
+                reverse('staff_scan_ticket'),
+                {'booking_code': self.booking.ticket_code.lower(), 'action': 'mark_used'},
+            )
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, 'used')
+        lookups = [q['sql'] for q in ctx.captured_queries if 'ticket_code' in q['sql'] and 'SELECT' in q['sql']]
+        self.assertTrue(lookups)
+        self.assertFalse(any('LIKE' in sql for sql in lookups))
+
+
+class OfflineScanSyncTests(ShowFixtureMixin, TestCase):
+    def setUp(self):
+        self.show = self._create_show()
+        buyer = User.objects.create_user(username='buyer', password='pass12345')
+        self.booking = Booking.objects.create(
+            user=buyer, show=self.show, seats=json.dumps(['A1', 'A2']), total_amount=400, status='confirmed',
+        )
+        staff = User.objects.create_user(username='gate', password='pass12345')
+        UserProfile.objects.filter(user=staff).update(role=UserProfile.ROLE_STAFF, is_role_approved=True)
+        self.client.force_login(staff)
+
+    def _sync(self, gate, scans, **extra):
+        return self.client.post(
+            reverse('scan_sync'), json.dumps({'gate': gate, 'scans': scans, **extra}),
+            content_type='application/json',
+        ).json()
+
+    def test_manifest_verifies_tickets_but_holds_no_secrets(self):
+        import base64
+        from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+        from .tickets import sign_ticket
+
+        manifest = self.client.get(reverse('scan_manifest', args=[self.show.id])).json()
+        self.assertNotIn(self.booking.ticket_code, json.dumps(manifest))
+        self.assertEqual(manifest['tickets'], {str(self.booking.pk): [2, 0]})
+
+        # What a gate device does with a QR payload: verify it with the public key alone
+        body, signature = sign_ticket(self.booking).rsplit(':', 1)
+        public_key = Ed25519PublicKey.from_public_bytes(bytes.fromhex(manifest['public_key']))
+        public_key.verify(base64.b32decode(signature + '=' * (-len(signature) % 8)), body.encode())
+
+    def test_same_ticket_at_two_gates_is_a_conflict(self):
+        code = self.booking.ticket_code
+        first = self._sync('G1', [{'code': code, 'scanned_at': '2026-01-01T19:00:00+00:00'}])
+        self.assertEqual(first['accepted'], 1)
+        second = self._sync('G2', [{'code': code.lower(), 'scanned_at': '2026-01-01T19:02:00+00:00'}])
+        self.assertEqual(second['conflicts'], 1)
+        result = second['results'][0]
+        self.assertEqual(result['first_scan']['gate'], 'G1')
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, 'used')
+        self.assertEqual(TicketScan.objects.filter(booking=self.booking).count(), 2)
+
+    def test_batch_keeps_earliest_scan_and_reports_unknown_codes(self):
+        code = self.booking.ticket_code
+        response = self._sync('G1', [
+            {'code': code, 'scanned_at': '2026-01-01T19:05:00+00:00'},
+            {'code': code, 'scanned_at': '2026-01-01T19:00:00+00:00'},
+            {'code': 'ZZZZ2222'},
+        ], show_id=self.show.id)
+        self.assertEqual([r['result'] for r in response['results']], ['conflict', 'accepted', 'rejected'])
+        self.assertEqual(response['results'][2]['reason'], 'not_found')
+
+
+class ScanApiTests(ShowFixtureMixin, TestCase):
+    def setUp(self):
+        self.show = self._create_show()
+        buyer = User.objects.create_user(username='buyer', password='pass12345')
+        self.bookings = [
+            Booking.objects.create(
+                user=buyer, show=self.show, seats=json.dumps([seat]), total_amount=200, status=status,
+            )
+            for seat, status in [('A1', 'confirmed'), ('A2', 'confirmed'), ('A3', 'cancelled')]
+        ]
+        staff = User.objects.create_user(username='gate', password='pass12345')
+        UserProfile.objects.filter(user=staff).update(role=UserProfile.ROLE_STAFF, is_role_approved=True)
+        self.client.force_login(staff)
+
+    def _scan(self, **body):
+        return self.client.post(reverse('scan_tickets_api'), json.dumps(body), content_type='application/json')
+
+    def test_single_code_is_admitted_once(self):
+        code = self.bookings[0].ticket_code
+        self.assertEqual(self._scan(code=code, gate='G1').status_code, 200)
+        response = self._scan(code=code, gate='G2')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['first_scan']['gate'], 'G1')
+        self.assertEqual(self._scan(code='ZZZZ2222').status_code, 404)
+
+    def test_batch(self):
+        codes = [b.ticket_code for b in self.bookings]
+        response = self._scan(codes=codes).json()
+        self.assertEqual((response['accepted'], response['conflicts'], response['rejected']), (2, 0, 1))
+        self.assertEqual(response['results'][2]['reason'], 'cancelled')
+        self.assertEqual(
+            list(Booking.objects.order_by('id').values_list('status', flat=True)),
+            ['used', 'used', 'cancelled'],
+        )
+
+
+class SignedTicketTests(ShowFixtureMixin, TestCase):
+    def setUp(self):
+        self.show = self._create_show()
+        buyer = User.objects.create_user(username='buyer', password='pass12345')
+        self.booking = Booking.objects.create(
+            user=buyer, show=self.show, seats=json.dumps(['A1', 'A2']), total_amount=400, status='confirmed',
+        )
+        staff = User.objects.create_user(username='gate', password='pass12345')
+        UserProfile.objects.filter(user=staff).update(role=UserProfile.ROLE_STAFF, is_role_approved=True)
+        self.client.force_login(staff)
+
+    def test_payload_verifies_without_queries(self):
+        from .tickets import sign_ticket, verify_ticket
+
+        payload = sign_ticket(self.booking)
+        with self.assertNumQueries(0):
+            ticket = verify_ticket(payload)
+        self.assertEqual(ticket['booking_id'], self.booking.pk)
+        self.assertEqual(ticket['seats'], ['A1', 'A2'])
+
+    def test_tampered_and_expired_payloads_rejected(self):
+        from .tickets import InvalidTicket, sign_ticket, verify_ticket
+
+        payload = sign_ticket(self.booking)
+        with self.assertRaisesMessage(InvalidTicket, 'bad_signature'):
+            verify_ticket(payload.replace(':A1+A2:', ':A1+A2+A3:'))
+        with self.assertRaisesMessage(InvalidTicket, 'expired'):
+            verify_ticket(payload, now=timezone.now() + timedelta(days=3))
+
+    def test_legacy_hmac_payload_verifies_on_the_server(self):
+        from .tickets import _legacy_signature, ticket_expiry, verify_ticket
+
+        body = f'BMS1:{self.booking.pk}:{self.booking.ticket_code}:{self.show.id}:A1+A2:{ticket_expiry(self.show)}'
+        ticket = verify_ticket(f'{body}:{_legacy_signature(self.show.id, body)}')
+        self.assertEqual(ticket['booking_id'], self.booking.pk)
+
+    def test_scan_api_admits_payload_with_single_update(self):
+        from .tickets import sign_ticket
+
+        payload = sign_ticket(self.booking)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                reverse('scan_tickets_api'), json.dumps({'code': payload}), content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        booking_reads = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT') and 'core_booking' in q['sql']]
+        self.assertEqual(booking_reads, [])
+        second = self.client.post(
+            reverse('scan_tickets_api'), json.dumps({'code': payload}), content_type='application/json',
+        )
+        self.assertEqual(second.status_code, 409)
+
+
+class RoleCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='org', password='pass12345')
+        UserProfile.objects.filter(user=self.user).update(role=UserProfile.ROLE_ORGANIZER, is_role_approved=False)
+        UserProfile.invalidate_role_cache([self.user.pk])
+
+    def test_role_state_cached_across_requests(self):
+        UserProfile.role_state(User.objects.get(pk=self.user.pk))
+        fresh = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            state = UserProfile.role_state(fresh)
+        self.assertEqual(state, (UserProfile.ROLE_ORGANIZER, False))
+
+    def test_admin_approval_invalidates_cache(self):
+        from django.contrib.admin.sites import site
+        from .admin import UserProfileAdmin
+
+        self.assertEqual(UserProfile.role_state(User.objects.get(pk=self.user.pk))[1], False)
+        model_admin = UserProfileAdmin(UserProfile, site)
+        model_admin.message_user = lambda *args, **kwargs: None
+        model_admin.approve_selected_roles(None, UserProfile.objects.filter(user=self.user))
+        self.assertEqual(UserProfile.role_state(User.objects.get(pk=self.user.pk)), (UserProfile.ROLE_ORGANIZER, True))
+
+    def test_user_save_does_not_touch_profile(self):
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['last_login'])
+
+
+class SessionCleanupTests(TestCase):
+    def test_deletes_only_expired_sessions_in_batches(self):
+        from io import StringIO
+        from django.contrib.sessions.models import Session
+
+        past = timezone.now() - timedelta(days=1)
+        Session.objects.bulk_create(
+            Session(session_key=f'expired{i:025d}', session_data='x', expire_date=past) for i in range(7)
+        )
+        Session.objects.create(session_key='live' + '0' * 28, session_data='x',
+                               expire_date=timezone.now() + timedelta(days=1))
+        out = StringIO()
+        call_command('clear_expired_sessions', batch_size=3, stdout=out)
+        self.assertIn('Deleted 7', out.getvalue())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live' + '0' * 28])
+
+
+class SessionSettingsTests(TestCase):
+    def _load_settings(self, **env):
+        import os
+        import runpy
+        from unittest import mock
+        from django.conf import settings
+
+        with mock.patch.dict(os.environ, env):
+            return runpy.run_path(os.path.join(settings.BASE_DIR, 'bms_project', 'settings.py'))
+
+    def test_cached_sessions_need_a_shared_cache(self):
+        from django.core.exceptions import ImproperlyConfigured
+
+        for backend in ['cached_db', 'cache']:
+            with self.subTest(backend=backend), self.assertRaisesMessage(ImproperlyConfigured, 'shared cache'):
+                self._load_settings(SESSION_BACKEND=backend, CACHE_BACKEND='locmem')
+        loaded = self._load_settings(SESSION_BACKEND='cached_db', CACHE_BACKEND='file')
+        self.assertEqual(loaded['SESSION_ENGINE'], 'django.contrib.sessions.backends.cached_db')
+
+    def test_database_sessions_by_default(self):
+        import os
+        from unittest import mock
+
+        with mock.patch.dict(os.environ):
+            os.environ.pop('SESSION_BACKEND', None)
+            loaded = self._load_settings(CACHE_BACKEND='locmem')
+        self.assertEqual(loaded['SESSION_ENGINE'], 'django.contrib.sessions.backends.db')
+
+
+class AppCacheTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from .caching import reset_cache_stats
+
+        cache.clear()
+        reset_cache_stats()
+
+    def test_hits_misses_and_namespace_bump(self):
+        from .caching import bump_namespace, cache_stats, get_or_compute
+
+        calls = []
+        compute = lambda: calls.append(1) or len(calls)
+        self.assertEqual(get_or_compute('catalog', ('x',), compute), 1)
+        self.assertEqual(get_or_compute('catalog', ('x',), compute), 1)
+        bump_namespace('catalog')
+        self.assertEqual(get_or_compute('catalog', ('x',), compute), 2)
+        stats = cache_stats()['catalog']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_waits_for_concurrent_recompute_then_falls_back(self):
+        from django.core.cache import cache
+        from . import caching
+
+        key = caching.make_key('shows', ('slow',))
+        cache.add(f'{key}:lock', 1, 30)  # another worker is recomputing
+        original = caching.LOCK_WAIT
+        caching.LOCK_WAIT = 0.1
+        try:
+            self.assertEqual(caching.get_or_compute('shows', ('slow',), lambda: 'fresh'), 'fresh')
+        finally:
+            caching.LOCK_WAIT = original
+        cache.set(key, 'shared')
+        cache.add(f'{key}:lock', 1, 30)
+        self.assertEqual(caching.get_or_compute('shows', ('slow',), lambda: 'fresh'), 'shared')
+
+    def test_movie_change_invalidates_catalog_grid(self):
+        movie = Movie.objects.create(title='Jawan', description='x', duration_mins=169, language='Hindi', genre='Action')
+        self.assertContains(self.client.get(reverse('movies_list_api')), 'Jawan')
+        with self.assertNumQueries(0):
+            self.client.get(reverse('movies_list_api'))
+        movie.title = 'Pathaan'
+        movie.save()
+        self.assertContains(self.client.get(reverse('movies_list_api')), 'Pathaan')
+
+
+class BootstrapTests(TestCase):
+    def test_ensure_superuser_is_idempotent(self):
+        from .bootstrap import ensure_default_superuser
+
+        with self.settings(ADMIN_USERNAME='root', ADMIN_PASSWORD='s3cret-pass', ADMIN_EMAIL='root@example.com'):
+            self.assertTrue(ensure_default_superuser())
+            self.assertFalse(ensure_default_superuser())
+        self.assertTrue(User.objects.get(username='root').is_superuser)
+
+    def test_no_credentials_is_a_no_op(self):
+        from .bootstrap import ensure_default_superuser
+
+        with self.settings(ADMIN_USERNAME=None, ADMIN_PASSWORD=None):
+            self.assertFalse(ensure_default_superuser())
+
+
+class AsyncReadViewTests(ShowFixtureMixin, TestCase):
+    def setUp(self):
+        self.show = self._create_show(seat_count=4)
+        self.user = User.objects.create_user(username='buyer', password='pass12345')
+        self.client.force_login(self.user)
+
+    def test_seat_map_reports_booked_and_locked_seats(self):
+        Booking.objects.create(user=self.user, show=self.show, seats=json.dumps(['A1']), total_amount=200,
+                               status='confirmed')
+        SeatLock.objects.create(show=self.show, seat_number='A2', user=self.user,
+                                expires_at=timezone.now() + timedelta(minutes=5))
+        SeatLock.objects.create(show=self.show, seat_number='A3', user=self.user,
+                                expires_at=timezone.now() - timedelta(minutes=1))
+        data = self.client.get(reverse('show_seats_api', args=[self.show.id])).json()
+        self.assertEqual(
+            {seat['number']: seat['status'] for seat in data['seats']},
+            {'A1': 'booked', 'A2': 'locked', 'A3': 'available', 'A4': 'available'},
+        )
+        # Read-only: the expired lock is skipped, not released
+        self.assertTrue(SeatLock.objects.filter(seat_number='A3').exists())
+
+    def test_async_views_handle_missing_objects_and_methods(self):
+        self.assertEqual(self.client.get(reverse('show_seats_api', args=[999])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('movie_detail', args=[999])).status_code, 404)
+        self.assertEqual(self.client.post(reverse('movies_list_api')).status_code, 405)
+        self.assertContains(self.client.get(reverse('movie_detail', args=[self.show.movie_id])), 'PVR Mumbai')
+
+    def test_seat_map_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('show_seats_api', args=[self.show.id])).status_code, 401)
+
+
+class ImportCostTests(TestCase):
+    def test_views_do_not_load_payment_or_qr_libraries(self):
+        from io import StringIO
+
+        out = StringIO()
+        call_command('benchmark_imports', runs=1, top=0, stdout=out)
+        self.assertIn('Import check passed', out.getvalue())
+
+
+class MetricsTests(ShowFixtureMixin, TestCase):
+    def setUp(self):
+        from . import metrics
+
+        metrics.reset()
+        self.show = self._create_show(seat_count=4)
+        self.user = User.objects.create_user(username='buyer', password='pass12345')
+
+    def test_requests_and_business_events_are_exported(self):
+        self.client.force_login(self.user)
+        self._lock(self.client, self.show, ['A1'])
+        self._confirm(self.client, self.show, ['A1'])
+        self._lock(self.client, self.show, ['A1'])
+        self.client.logout()
+
+        with self.settings(METRICS_TOKEN='scrape-me'):
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-me')
+        body = response.content.decode()
+        self.assertIn('bms_http_requests_total{method="POST",route="api/lock_seats/",status="200"} 1', body)
+        self.assertIn('bms_seat_lock_attempts_total{result="locked"} 1', body)
+        self.assertIn('bms_seat_lock_attempts_total{result="conflict"} 1', body)
+        self.assertIn('bms_bookings_total 1', body)
+        self.assertIn('bms_tickets_sold_total 1', body)
+        self.assertIn('bms_http_request_db_queries_bucket{route="api/lock_seats/",le="+Inf"} 2', body)
+        count = re.search(r'bms_http_request_db_queries_sum\{route="api/confirm_booking/"\} (\d+)', body)
+        self.assertGreater(int(count.group(1)), 0)
+
+    def test_metrics_need_a_token_or_staff(self):
+        with self.settings(METRICS_TOKEN='scrape-me'):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+            self.assertEqual(
+                self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403
+            )
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+
+class QueryLogTests(ShowFixtureMixin, TestCase):
+    def setUp(self):
+        from . import querylog
+
+        querylog._last_explained.clear()
+        self.show = self._create_show(seat_count=4)
+        self.client.force_login(User.objects.create_user(username='buyer', password='pass12345'))
+
+    def test_fingerprint_collapses_placeholders_and_in_lists(self):
+        self.assertEqual(
+            sql_fingerprint('SELECT * FROM t WHERE a = %s AND b IN (%s, %s, %s) LIMIT 21'),
+            sql_fingerprint("SELECT * FROM t WHERE a = 'x' AND b IN (1, 2) LIMIT 5"),
+        )
+
+    def test_slow_queries_are_logged_per_view_with_a_plan(self):
+        import os
+        import tempfile
+        from io import StringIO
+
+        with self.settings(SLOW_QUERY_MS=0), self.assertLogs('core.querylog', 'WARNING') as logs:
+            self.client.get(reverse('show_seats_api', args=[self.show.id]))
+        entries = [json.loads(record.getMessage()) for record in logs.records]
+        show_query = next(e for e in entries if e['sql'].startswith('SELECT') and 'FROM "core_show"' in e['sql'])
+        self.assertEqual(show_query['view'], 'show_seats_api')
+        self.assertTrue(show_query['explain'])
+
+        fd, path = tempfile.mkstemp()
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w') as f:
+            f.write('\n'.join(record.getMessage() for record in logs.records) + '\nnot json\n')
+        out = StringIO()
+        call_command('slow_queries', log=path, stdout=out)
+        self.assertIn('show_seats_api', out.getvalue())
+
+    def test_failing_explain_rolls_back_to_a_savepoint(self):
+        from django.db import transaction
+        from .querylog import explain
+
+        with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+            self.assertTrue(explain(connection, 'SELECT * FROM no_such_table', []).startswith('EXPLAIN failed'))
+            self.assertTrue(Show.objects.filter(pk=self.show.pk).exists())
+        self.assertTrue(any(q['sql'].startswith('ROLLBACK TO SAVEPOINT') for q in queries.captured_queries))
+
+    def test_explain_throttle_is_bounded(self):
+        from unittest import mock
+        from . import querylog
+
+        with mock.patch.object(querylog, 'MAX_EXPLAINED', 3):
+            self.assertTrue(all(querylog._should_explain(f'fp{i}') for i in range(5)))
+            self.assertFalse(querylog._should_explain('fp4'))
+            self.assertEqual(list(querylog._last_explained), ['fp2', 'fp3', 'fp4'])
+
+    def test_statistics_are_collected_only_when_asked(self):
+        from .querylog import STATS
+
+        with STATS.collecting():
+            self.client.get(reverse('show_seats_api', args=[self.show.id]))
+        self.assertIn('show_seats_api', {row['view'] for row in STATS.top(limit=None)})
+        self.assertFalse(STATS.active)
+
+        with STATS.collecting():
+            pass
+        self.client.get(reverse('show_seats_api', args=[self.show.id]))
+        self.assertEqual(STATS.top(), [])
+
+
+class SeatRushTests(TransactionTestCase):
+    def test_rush_never_sells_a_seat_twice(self):
+        from io import StringIO
+
+        out = StringIO()
+        # SQLite answers concurrent writers with "database is locked"; tolerate those here
+        call_command('seat_rush', users=6, seats=8, hot_seats=4, max_errors=6, stdout=out, stderr=StringIO())
+        self.assertIn('No seat sold twice', out.getvalue())
+        show = Show.objects.get(movie__title='Seat Rush')
+        sold = [seat for seats in show.bookings.values_list('seats', flat=True) for seat in json.loads(seats)]
+        self.assertEqual(len(sold), len(set(sold)))
+
+    def test_double_sold_seat_fails_the_run(self):
+        from io import StringIO
+        from django.core.management.base import CommandError
+
+        call_command('seat_rush', users=1, seats=4, stdout=StringIO(), stderr=StringIO())
+        show = Show.objects.get(movie__title='Seat Rush')
+        booking = show.bookings.get()
+        Booking.objects.create(user=booking.user, show=show, seats=booking.seats, total_amount=400, status='confirmed')
+        with self.assertRaisesMessage(CommandError, 'Seats sold more than once'):
+            call_command('seat_rush', show=show.id, users=1, stdout=StringIO(), stderr=StringIO())
+
+    def test_counter_mismatch_fails_the_run(self):
+        from io import StringIO
+        from django.core.management.base import CommandError
+
+        call_command('seat_rush', users=1, seats=4, stdout=StringIO(), stderr=StringIO())
+        show = Show.objects.get(movie__title='Seat Rush')
+        Show.objects.filter(pk=show.pk).update(seats_booked=0)
+        with self.assertRaisesMessage(CommandError, 'seats_booked counter is 2 but 4 seats are sold'):
+            call_command('seat_rush', show=show.id, users=1, stdout=StringIO(), stderr=StringIO())
+
+
+class HotpathBenchmarkTests(ShowFixtureMixin, TestCase):
+    def test_baseline_round_trip_and_regression(self):
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management.base import CommandError
+
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'baseline.json')
+        self.addCleanup(os.rmdir, directory)
+        self.addCleanup(os.remove, path)
+        options = dict(seats=[20], bookings=[30], repeat=1, min_time=0, baseline=path, stdout=StringIO())
+
+        call_command('benchmark_hotpaths', save=True, **options)
+        with open(path) as f:
+            stored = json.load(f)
+        self.assertIn('get_available_seats[seats=20,bookings=30]', stored['results'])
+        self.assertIn('admin_dashboard[bookings=30]', stored['results'])
+        self.assertFalse(User.objects.filter(username__startswith='bench-').exists())
+
+        for result in stored['results'].values():
+            result['min_ms'] = 1e-6
+        with open(path, 'w') as f:
+            json.dump(stored, f)
+        with self.assertRaisesMessage(CommandError, 'slower than the baseline'):
+            call_command('benchmark_hotpaths', only=['get_booked_seats'], stderr=StringIO(), **options)
+
+    def test_sizes_count_existing_bookings(self):
+        from io import StringIO
+        from django.core.management.base import CommandError
+
+        show = self._create_show(seat_count=4)
+        user = User.objects.create_user(username='buyer', password='pass12345')
+        for seat in ['A1', 'A2', 'A3']:
+            Booking.objects.create(user=user, show=show, seats=json.dumps([seat]), total_amount=200, status='confirmed')
+        with self.assertRaisesMessage(CommandError, 'more than --bookings 3'):
+            call_command('benchmark_hotpaths', seats=[4], bookings=[3], repeat=1, min_time=0, stdout=StringIO())
+
+
+class GenerateDataTests(TestCase):
+    options = dict(cities=1, cinemas=1, screens=2, seats=20, days=2, past_days=2, shows_per_day=2,
+                   movies=3, users=5, bookings=60, locks=4, batch_size=7)
+
+    def _generate(self):
+        from io import StringIO
+
+        call_command('generate_data', seed=1, stdout=StringIO(), **self.options)
+        return Show.objects.filter(screen__name__startswith='synthetic-1 ')
+
+    def test_generated_data_is_consistent(self):
+        from django.db.models import Sum
+
+        shows = self._generate()
+        self.assertEqual(shows.count(), 16)
+        self.assertEqual(Booking.objects.filter(show__in=shows).count(), 60)
+        self.assertEqual(SeatLock.objects.filter(show__in=shows).count(), 4)
+        for show in shows:
+            booked = show.get_booked_seats()
+            self.assertEqual(len(booked), len(set(booked)))
+            self.assertFalse(show.refresh_seat_counters())
+        sold = Booking.objects.filter(show__in=shows, status__in=Booking.SOLD_STATUSES)
+        self.assertEqual(DailySalesRollup.objects.aggregate(n=Sum('bookings'))['n'], sold.count())
+
+    def test_same_seed_same_data(self):
+        from django.db import transaction
+
+        with transaction.atomic():
+            first = list(Booking.objects.filter(show__in=self._generate()).order_by('id').values_list('ticket_code', 'seats'))
+            transaction.set_rollback(True)
+        second = list(Booking.objects.filter(show__in=self._generate()).order_by('id').values_list('ticket_code', 'seats'))
+        self.assertEqual(first, second)
@@ -0,0 +1,129 @@
+"""
+Signed QR ticket payloads.
+
+A QR code carries everything a gate needs to validate the ticket:
+
+    BMS2:<booking pk>:<ticket code>:<show id>:<seats joined by +>:<expiry>:<signature>
+
+The signature is Ed25519 over the payload up to the last colon, base32 without
+padding, with a key pair per show derived from SECRET_KEY. Scanners get only
+the show's public key (in the scan manifest), which verifies tickets but cannot
+sign them. Only the used-state transition needs the database. The whole
+payload uses the QR alphanumeric character set, which keeps the code small.
+
+BMS1 payloads, from before this scheme, carry an HMAC that only the server can
+check; they still verify here but not on gate devices.
+
+cryptography is imported on first use, like the QR and payment libraries.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils import timezone
+
+
+TICKET_PAYLOAD_PREFIX = 'BMS2'
+LEGACY_PAYLOAD_PREFIX = 'BMS1'
+LEGACY_SIGNATURE_BYTES = 10
+VALID_AFTER_SHOW_END = timedelta(hours=1)
+
+
+class InvalidTicket(ValueError):
+    """The payload is malformed, forged or expired (``reason`` says which)."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+@lru_cache(maxsize=256)
+def _signing_key(secret_key, show_id):
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+    seed = hmac.new(secret_key.encode(), f'ticket-ed25519:{show_id}'.encode(), hashlib.sha256).digest()
+    return Ed25519PrivateKey.from_private_bytes(seed)
+
+
+def show_public_key(show_id):
+    """Raw Ed25519 public key (hex) verifying one show's tickets; safe to hand to scanners."""
+    from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+    key = _signing_key(settings.SECRET_KEY, show_id).public_key()
+    return key.public_bytes(Encoding.Raw, PublicFormat.Raw).hex()
+
+
+def _signature(show_id, body):
+    signature = _signing_key(settings.SECRET_KEY, show_id).sign(body.encode())
+    return base64.b32encode(signature).decode().rstrip('=')
+
+
+def _signature_valid(show_id, body, signature):
+    from cryptography.exceptions import InvalidSignature
+
+    try:
+        raw = base64.b32decode(signature + '=' * (-len(signature) % 8))
+        _signing_key(settings.SECRET_KEY, show_id).public_key().verify(raw, body.encode())
+    except (binascii.Error, InvalidSignature):
+        return False
+    return True
+
+
+def _legacy_signature(show_id, body):
+    key = hmac.new(settings.SECRET_KEY.encode(), f'ticket-qr:{show_id}'.encode(), hashlib.sha256).digest()
+    digest = hmac.new(key, body.encode(), hashlib.sha256).digest()[:LEGACY_SIGNATURE_BYTES]
+    return base64.b32encode(digest).decode()
+
+
+def ticket_expiry(show):
+    """Unix time after which the ticket no longer verifies."""
+    start = timezone.make_aware(datetime.combine(show.date, show.start_time))
+    return int((start + timedelta(minutes=show.movie.duration_mins) + VALID_AFTER_SHOW_END).timestamp())
+
+
+def sign_ticket(booking):
+    """QR payload for ``booking``."""
+    seats = '+'.join(booking.get_seats_list())
+    body = ':'.join([
+        TICKET_PAYLOAD_PREFIX, str(booking.pk), booking.ticket_code, str(booking.show_id), seats,
+        str(ticket_expiry(booking.show)),
+    ])
+    return f'{body}:{_signature(booking.show_id, body)}'
+
+
+def is_ticket_payload(value):
+    return value.startswith((TICKET_PAYLOAD_PREFIX + ':', LEGACY_PAYLOAD_PREFIX + ':'))
+
+
+def verify_ticket(payload, now=None):
+    """Check a QR payload without touching the database.
+
+    Returns a dict with booking_id, ticket_code, show_id, seats and expires;
+    raises InvalidTicket otherwise.
+    """
+    parts = payload.strip().split(':')
+    if len(parts) != 7 or parts[0] not in (TICKET_PAYLOAD_PREFIX, LEGACY_PAYLOAD_PREFIX):
+        raise InvalidTicket('malformed')
+    prefix, booking_id, code, show_id, seats, expires, signature = parts
+    if not (booking_id.isdigit() and show_id.isdigit() and expires.isdigit()):
+        raise InvalidTicket('malformed')
+    body = payload.strip().rsplit(':', 1)[0]
+    if prefix == TICKET_PAYLOAD_PREFIX:
+        valid = _signature_valid(int(show_id), body, signature)
+    else:
+        valid = hmac.compare_digest(signature, _legacy_signature(int(show_id), body))
+    if not valid:
+        raise InvalidTicket('bad_signature')
+    if int(expires) < (now or timezone.now()).timestamp():
+        raise InvalidTicket('expired')
+    return {
+        'booking_id': int(booking_id),
+        'ticket_code': code,
+        'show_id': int(show_id),
+        'seats': seats.split('+') if seats else [],
+        'expires': int(expires),
+    }
@@ -0,0 +1,125 @@
+"""
+Bucketed revenue / ticket time series for dashboards and charts.
+
+Buckets are aggregated in the database with Trunc. A bucket that has fully
+elapsed never changes (apart from rare status changes, which bump a cache
+version), so closed buckets are cached without expiry and only the
+current bucket is recomputed on each request.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncWeek
+from django.utils import timezone
+
+from .caching import bump_namespace, namespace_version
+from .models import Booking
+
+
+BUCKETS = {
+    'hour': TruncHour,
+    'day': TruncDay,
+    'week': TruncWeek,
+}
+MAX_BUCKETS = 2000
+EMPTY_BUCKET = ('0.00', 0, 0)  # (revenue, bookings, tickets)
+TIMESERIES = 'timeseries'  # cache namespace
+
+
+def invalidate_closed_buckets():
+    """Drop every cached closed bucket by bumping the namespace version."""
+    bump_namespace(TIMESERIES)
+
+
+def bucket_start(moment, bucket):
+    """Start of the bucket containing ``moment``, in the current time zone."""
+    moment = timezone.localtime(moment)
+    if bucket == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == 'week':
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def _next_bucket(start, bucket):
+    if bucket == 'hour':
+        return timezone.localtime(start + timedelta(hours=1))
+    days = 7 if bucket == 'week' else 1
+    # Build from the calendar date so DST shifts never drift the boundary
+    return timezone.make_aware(datetime.combine(start.date() + timedelta(days=days), datetime.min.time()))
+
+
+def bucket_range(start, end, bucket):
+    """Bucket start times covering [start, end)."""
+    current = bucket_start(start, bucket)
+    starts = []
+    while current < end:
+        starts.append(current)
+        if len(starts) > MAX_BUCKETS:
+            raise ValueError(f'Range spans more than {MAX_BUCKETS} {bucket} buckets')
+        current = _next_bucket(current, bucket)
+    return starts
+
+
+def _aggregate(bucket, start, end, filters):
+    """Per-bucket revenue, bookings and tickets for sold bookings in [start, end)."""
+    rows = (
+        Booking.objects.filter(status__in=Booking.SOLD_STATUSES, created_at__gte=start, created_at__lt=end, **filters)
+        .annotate(bucket=BUCKETS[bucket]('created_at'))
+        .values('bucket')
+        .annotate(revenue=Sum('total_amount'), bookings=Count('id'), tickets=Sum('ticket_count'))
+        .order_by()
+    )
+    return {
+        bucket_start(row['bucket'], bucket): (str(row['revenue'] or Decimal('0.00')), row['bookings'], row['tickets'] or 0)
+        for row in rows
+    }
+
+
+def revenue_series(bucket, start, end, movie_id=None, cinema_id=None, organizer_id=None):
+    """Revenue, bookings and tickets per bucket between ``start`` and ``end``.
+
+    Returns a list of dicts (one per bucket, zero-filled) in time order.
+    """
+    filters = {}
+    if movie_id:
+        filters['show__movie_id'] = movie_id
+    if cinema_id:
+        filters['show__screen__cinema_id'] = cinema_id
+    if organizer_id:
+        filters['show__movie__organizer_id'] = organizer_id
+
+    starts = bucket_range(start, end, bucket)
+    current = bucket_start(timezone.now(), bucket)
+    scope = f'{movie_id or "-"}:{cinema_id or "-"}:{organizer_id or "-"}'
+    prefix = f'{TIMESERIES}:{namespace_version(TIMESERIES)}:{bucket}:{scope}'
+    keys = {s: f'{prefix}:{s.isoformat()}' for s in starts if s < current}
+
+    values = {}
+    cached = cache.get_many(list(keys.values()))
+    for s, key in keys.items():
+        if key in cached:
+            values[s] = cached[key]
+
+    # One query covering every closed bucket that missed the cache
+    missing = [s for s in keys if s not in values]
+    if missing:
+        fresh = _aggregate(bucket, missing[0], _next_bucket(missing[-1], bucket), filters)
+        to_cache = {}
+        for s in missing:
+            values[s] = fresh.get(s, EMPTY_BUCKET)
+            to_cache[keys[s]] = values[s]
+        cache.set_many(to_cache, None)
+
+    # The open bucket is always recomputed
+    if current in starts:
+        values.update(_aggregate(bucket, current, _next_bucket(current, bucket), filters))
+
+    series = []
+    for s in starts:
+        revenue, bookings, tickets = values.get(s, EMPTY_BUCKET)
+        series.append({'start': s.isoformat(), 'revenue': revenue, 'bookings': bookings, 'tickets': tickets})
+    return series
@@ -19,6 +19,9 @@ urlpatterns = [
     path('api/create_order/', views.create_order, name='create_order'),
     path('api/movies/', views.movies_list_api, name='movies_list_api'),
     path('api/meta/', views.movies_meta_api, name='movies_meta_api'),
+    path('api/shows/<int:show_id>/seats/', views.show_seats_api, name='show_seats_api'),
+    path('api/showtimes/', views.showtimes_search_api, name='showtimes_search_api'),
+    path('api/revenue/timeseries/', views.revenue_timeseries_api, name='revenue_timeseries_api'),
     
     # Authentication
     path('register/', views.register_view, name='register'),
@@ -42,6 +45,12 @@ urlpatterns = [
     path('organizer/movies/<int:movie_id>/promote/', views.promote_movie, name='promote_movie'),
     
     path('admin/gift-funds/', views.admin_gift_funds, name='admin_gift_funds'),
+    path('exports/bookings.csv', views.export_bookings_csv, name='export_bookings_csv'),
     
     path('staff/scan/', views.staff_scan_ticket, name='staff_scan_ticket'),
+    path('staff/scan/shows/<int:show_id>/manifest/', views.scan_manifest, name='scan_manifest'),
+    path('staff/scan/sync/', views.scan_sync, name='scan_sync'),
+    path('api/scan/', views.scan_tickets_api, name='scan_tickets_api'),
+
+    path('metrics', views.metrics_view, name='metrics'),
 ]
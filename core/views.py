@@ -2,47 +2,46 @@
 Views for BookMyShow clone
 """
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.db import transaction
 from django.utils import timezone
 from django.conf import settings
-from django.core.mail import send_mail, EmailMultiAlternatives
-from django.db.models import Sum, Count, Q
-from datetime import timedelta
-from email.mime.image import MIMEImage
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.core.mail import send_mail
+from django.db.models import Sum, Count, OuterRef, Subquery, Value, DecimalField
+from django.db.models.functions import Coalesce
+from django.core.paginator import EmptyPage, Paginator
+from datetime import date as date_cls, time as time_cls, timedelta
+from decimal import Decimal
 import json
 import random
-import razorpay
-import qrcode
-from io import BytesIO
 
-from .models import Movie, Show, Cinema, Screen, Seat, Booking, SeatLock, UserProfile, Wallet
+from asgiref.sync import sync_to_async
+
+from .models import Movie, Show, Cinema, Screen, Seat, Booking, SeatLock, UserProfile, Wallet, DailySalesRollup
+from .models import TICKET_CODE_LENGTH, normalize_ticket_code
+from .tickets import InvalidTicket, is_ticket_payload, verify_ticket
+from .emails import send_booking_email
 from .forms import UserRegistrationForm, MovieForm
+from .caching import CATALOG, DASHBOARDS, SHOWS, aget_or_compute, get_or_compute
+from . import metrics, payments
 
 
 # ---- Role helpers ----
 
 def _get_user_role(user):
-    if not user.is_authenticated:
-        return None
-    try:
-        return user.profile.role
-    except UserProfile.DoesNotExist:
-        return None
+    return UserProfile.role_state(user)[0]
 
 def _has_approved_role(user, role):
-    if not user.is_authenticated:
-        return False
-    try:
-        return user.profile.has_role(role)
-    except UserProfile.DoesNotExist:
-        return False
+    user_role, is_approved = UserProfile.role_state(user)
+    return user_role == role and is_approved
 
 
 def is_organizer(user):
@@ -70,6 +69,7 @@ def home(request):
         movies = movies.filter(language=language)
     if q:
         movies = movies.filter(title__icontains=q)
+    movies = get_or_compute(CATALOG, ('movies', genre, language, q), lambda: list(movies))
     
     # Get unique genres and languages for filters
     genres = Movie.GENRES
@@ -86,9 +86,15 @@ def home(request):
     return render(request, 'core/movies.html', context)
 
 
-@require_http_methods(["GET"])
-def movies_list_api(request):
-    """AJAX endpoint to return filtered movies HTML fragment."""
+async def movies_list_api(request):
+    """AJAX endpoint to return filtered movies HTML fragment.
+
+    Async (like movie_detail and show_seats_api): under ASGI a slow query
+    waits on the event loop instead of holding a worker.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
     # Order by promoted status first, then by creation date
     movies = Movie.objects.all().order_by('-is_promoted', '-created_at')
 
@@ -103,12 +109,14 @@ def movies_list_api(request):
     if q:
         movies = movies.filter(title__icontains=q)
 
-    # Render only the movies grid partial
+    # Render only the movies grid partial; it has no per-user content, so the
+    # HTML is cached per filter combination until a movie changes
     from django.template.loader import render_to_string
 
-    html = render_to_string('core/_movies_grid.html', {
-        'movies': movies,
-    }, request=request)
+    async def render_grid():
+        return render_to_string('core/_movies_grid.html', {'movies': [movie async for movie in movies]})
+
+    html = await aget_or_compute(CATALOG, ('movies-grid', genre, language, q), render_grid)
 
     response = JsonResponse({'success': True, 'html': html})
     response['Access-Control-Allow-Origin'] = '*'
@@ -129,12 +137,100 @@ def movies_meta_api(request):
     response['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
     return response
 
+SHOWTIME_SEARCH_PAGE_SIZE = 20
+SHOWTIME_SEARCH_MAX_PAGE_SIZE = 100
+
+
+@require_http_methods(["GET"])
+def showtimes_search_api(request):
+    """Search upcoming showtimes by city, date range, time window, language and genre.
+
+    Query params: city, date (or date_from/date_to, YYYY-MM-DD),
+    time_from/time_to (HH:MM), language, genre, page, page_size.
+    """
+    params = request.GET
+    try:
+        date_from = params.get('date_from') or params.get('date')
+        date_to = params.get('date_to') or params.get('date')
+        date_from = date_cls.fromisoformat(date_from) if date_from else timezone.localdate()
+        date_to = date_cls.fromisoformat(date_to) if date_to else None
+        time_from = time_cls.fromisoformat(params['time_from']) if params.get('time_from') else None
+        time_to = time_cls.fromisoformat(params['time_to']) if params.get('time_to') else None
+        page_number = int(params.get('page', 1))
+        page_size = min(int(params.get('page_size', SHOWTIME_SEARCH_PAGE_SIZE)), SHOWTIME_SEARCH_MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid date, time or page parameter'}, status=400)
+
+    # Shows that already started today cannot be booked
+    now = timezone.localtime()
+    shows = Show.objects.filter(date__gte=date_from).exclude(date=now.date(), start_time__lt=now.time())
+    if date_to:
+        shows = shows.filter(date__lte=date_to)
+    if time_from:
+        shows = shows.filter(start_time__gte=time_from)
+    if time_to:
+        shows = shows.filter(start_time__lte=time_to)
+    if params.get('city'):
+        shows = shows.filter(screen__cinema__city__iexact=params['city'])
+    if params.get('language'):
+        shows = shows.filter(movie__language=params['language'])
+    if params.get('genre'):
+        shows = shows.filter(movie__genre=params['genre'])
+
+    # One query for the page (plus the count) regardless of page size
+    shows = shows.select_related('movie', 'screen__cinema').order_by('date', 'start_time', 'id')
+    paginator = Paginator(shows, max(page_size, 1))
+    try:
+        page = paginator.page(page_number)
+    except EmptyPage:
+        page = None
+
+    results = [{
+        'show_id': show.id,
+        'date': show.date.isoformat(),
+        'start_time': show.start_time.strftime('%H:%M'),
+        'price': str(show.price),
+        'seats_left': show.seats_left,
+        'sold_out': show.is_sold_out,
+        'url': reverse('show_page', args=[show.id]),
+        'movie': {
+            'id': show.movie.id,
+            'title': show.movie.title,
+            'language': show.movie.language,
+            'genre': show.movie.genre,
+            'poster_url': show.movie.poster_url,
+        },
+        'cinema': {
+            'id': show.screen.cinema.id,
+            'name': show.screen.cinema.name,
+            'city': show.screen.cinema.city,
+        },
+        'screen': {
+            'id': show.screen.id,
+            'name': show.screen.name,
+        },
+    } for show in (page.object_list if page else [])]
+
+    response = JsonResponse({
+        'success': True,
+        'results': results,
+        'page': page_number,
+        'num_pages': paginator.num_pages,
+        'count': paginator.count,
+    })
+    response['Access-Control-Allow-Origin'] = '*'
+    response['Access-Control-Allow-Headers'] = 'Content-Type'
+    response['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
+    return response
+
 def welcome_page(request):
     return render(request, 'core/welcome.html')
 
-def movie_detail(request, movie_id):
+async def movie_detail(request, movie_id):
     """Movie detail page with trailer and shows"""
-    movie = get_object_or_404(Movie, id=movie_id)
+    movie = await Movie.objects.select_related('organizer').filter(id=movie_id).afirst()
+    if movie is None:
+        raise Http404('No Movie matches the given query.')
     
     # Get upcoming shows for this movie
     today = timezone.now().date()
@@ -145,26 +241,61 @@ def movie_detail(request, movie_id):
     
     context = {
         'movie': movie,
-        'shows': shows,
+        'shows': [show async for show in shows],
     }
-    return render(request, 'core/movie_detail.html', context)
+    # The base template reads request.user, which is loaded lazily and sync-only
+    return await sync_to_async(render)(request, 'core/movie_detail.html', context)
+
+
+def build_seat_grid(seats, booked_seats, locked_seats, user_locked_seats):
+    """Seats of a screen grouped by row, each with its status for the seat map."""
+    # Organize seats in a grid (assuming naming like A1, A2, B1, B2, etc.)
+    seat_grid = {}
+    for number, seat_type in seats:
+        row = number[0]  # First character is row
+        if row not in seat_grid:
+            seat_grid[row] = []
+        
+        seat_status = 'available'
+        if number in booked_seats:
+            seat_status = 'booked'
+        elif number in locked_seats:
+            if number in user_locked_seats:
+                seat_status = 'user_locked'
+            else:
+                seat_status = 'locked'
+        
+        seat_grid[row].append({
+            'number': number,
+            'type': seat_type,
+            'status': seat_status
+        })
+    
+    return dict(sorted(seat_grid.items()))
 
 
 @login_required
 def show_page(request, show_id):
     """Show page with seat map"""
     show = get_object_or_404(Show, id=show_id)
+
+    # Sold-out shows have nothing to select; skip the seat map entirely
+    if show.is_sold_out:
+        messages.info(request, 'Sorry, this show is sold out.')
+        return redirect('movie_detail', movie_id=show.movie_id)
     
     # Release expired locks
     SeatLock.release_expired_locks()
     
-    # Get all seats for this screen
-    seats = show.screen.seats.all().order_by('number')
+    # Seat layout of the screen (number, type); changes only when seats are edited
+    seats = get_or_compute(
+        SHOWS, ('screen-seats', show.screen_id),
+        lambda: list(Seat.objects.filter(screen_id=show.screen_id).order_by('number').values_list('number', 'seat_type')),
+    )
     
     # Get seat states
     booked_seats = show.get_booked_seats()
     locked_seats = show.get_locked_seats()
-    available_seats = show.get_available_seats()
     
     # Get user's locked seats for this show
     user_locks = SeatLock.objects.filter(
@@ -174,37 +305,51 @@ def show_page(request, show_id):
     )
     user_locked_seats = list(user_locks.values_list('seat_number', flat=True))
     
-    # Organize seats in a grid (assuming naming like A1, A2, B1, B2, etc.)
-    seat_grid = {}
-    for seat in seats:
-        row = seat.number[0]  # First character is row
-        if row not in seat_grid:
-            seat_grid[row] = []
-        
-        seat_status = 'available'
-        if seat.number in booked_seats:
-            seat_status = 'booked'
-        elif seat.number in locked_seats:
-            if seat.number in user_locked_seats:
-                seat_status = 'user_locked'
-            else:
-                seat_status = 'locked'
-        
-        seat_grid[row].append({
-            'number': seat.number,
-            'type': seat.seat_type,
-            'status': seat_status
-        })
-    
     context = {
         'show': show,
-        'seat_grid': dict(sorted(seat_grid.items())),
+        'seat_grid': build_seat_grid(seats, booked_seats, locked_seats, user_locked_seats),
         'price': show.price,
         'razorpay_key_id': settings.RAZORPAY_KEY_ID,
     }
     return render(request, 'core/show.html', context)
 
 
+async def show_seats_api(request, show_id):
+    """Seat map of a show as JSON, for logged-in users (like show_page).
+
+    Read-only and async: expired locks are skipped here rather than released.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    # login_required is not async-aware in Django 4.2; request.user loads lazily
+    if not await sync_to_async(lambda: request.user.is_authenticated)():
+        return JsonResponse({'success': False, 'error': 'Login required'}, status=401)
+    show = await Show.objects.filter(id=show_id).afirst()
+    if show is None:
+        return JsonResponse({'success': False, 'error': 'Show not found'}, status=404)
+
+    async def load_layout():
+        seats = Seat.objects.filter(screen_id=show.screen_id).order_by('number').values_list('number', 'seat_type')
+        return [seat async for seat in seats]
+
+    # Same cache entry as show_page
+    seats = await aget_or_compute(SHOWS, ('screen-seats', show.screen_id), load_layout)
+    booked_seats = set(await show.aget_booked_seats())
+    locked_seats = set(await show.aget_locked_seats())
+
+    return JsonResponse({
+        'success': True,
+        'show_id': show.id,
+        'seats_left': show.seats_left,
+        'sold_out': show.is_sold_out,
+        'seats': [{
+            'number': number,
+            'type': seat_type,
+            'status': 'booked' if number in booked_seats else 'locked' if number in locked_seats else 'available',
+        } for number, seat_type in seats],
+    })
+
+
 @login_required
 @require_http_methods(["POST"])
 def lock_seats(request):
@@ -218,6 +363,15 @@ def lock_seats(request):
             return JsonResponse({'success': False, 'error': 'Invalid data'}, status=400)
         
         show = get_object_or_404(Show, id=show_id)
+
+        # Fast path: reject from the counters before touching seat data
+        if not show.can_ever_seat(len(seat_numbers)):
+            metrics.inc('bms_seat_lock_attempts_total', result='sold_out')
+            return JsonResponse({
+                'success': False,
+                'error': 'This show is sold out' if show.is_sold_out else 'Not enough seats left',
+                'sold_out': show.is_sold_out,
+            }, status=409)
         
         # Release expired locks first
         SeatLock.release_expired_locks()
@@ -229,6 +383,7 @@ def lock_seats(request):
             
             for seat_number in seat_numbers:
                 if seat_number in booked_seats:
+                    metrics.inc('bms_seat_lock_attempts_total', result='conflict')
                     return JsonResponse({
                         'success': False,
                         'error': f'Seat {seat_number} is already booked'
@@ -243,13 +398,14 @@ def lock_seats(request):
                     ).first()
                     
                     if lock and lock.user != request.user:
+                        metrics.inc('bms_seat_lock_attempts_total', result='conflict')
                         return JsonResponse({
                             'success': False,
                             'error': f'Seat {seat_number} is locked by another user'
                         }, status=400)
             
             # Remove user's previous locks for this show
-            SeatLock.objects.filter(show=show, user=request.user).delete()
+            released, _ = SeatLock.objects.filter(show=show, user=request.user).delete()
             
             # Create new locks
             expires_at = timezone.now() + timedelta(minutes=settings.SEAT_LOCK_DURATION)
@@ -260,6 +416,8 @@ def lock_seats(request):
                     user=request.user,
                     expires_at=expires_at
                 )
+            Show.adjust_seat_counters(show.id, held=len(seat_numbers) - released)
+            metrics.inc('bms_seat_lock_attempts_total', result='locked')
             
             return JsonResponse({
                 'success': True,
@@ -268,6 +426,7 @@ def lock_seats(request):
             })
     
     except Exception as e:
+        metrics.inc('bms_seat_lock_attempts_total', result='error')
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
@@ -304,15 +463,7 @@ def create_order(request):
         amount_paise = int(total_amount * 100)  # Razorpay uses paise
         
         # Create Razorpay order
-        client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-        
-        order_data = {
-            'amount': amount_paise,
-            'currency': 'INR',
-            'payment_capture': 1
-        }
-        
-        razorpay_order = client.order.create(data=order_data)
+        razorpay_order = payments.create_order(amount_paise)
         
         return JsonResponse({
             'success': True,
@@ -381,7 +532,10 @@ def confirm_booking(request):
             )
             
             # Remove seat locks
-            user_locks.delete()
+            released, _ = user_locks.delete()
+            Show.adjust_seat_counters(show.id, booked=len(seat_numbers), held=-released)
+            metrics.inc('bms_bookings_total')
+            metrics.inc('bms_tickets_sold_total', len(seat_numbers))
             
             # Send confirmation email
             try:
@@ -395,6 +549,7 @@ def confirm_booking(request):
             return JsonResponse({
                 'success': True,
                 'booking_id': str(booking.booking_id),
+                'ticket_code': booking.ticket_code,
                 'message': 'Booking confirmed successfully'
             })
     
@@ -402,269 +557,11 @@ def confirm_booking(request):
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
-def send_booking_email(user, booking):
-    """Send booking confirmation email with QR code"""
-    import qrcode
-    from io import BytesIO
-    from django.core.mail import EmailMultiAlternatives
-    from email.mime.image import MIMEImage
-
-    subject = f'Booking Confirmation - {booking.show.movie.title}'
-    
-    seats_list = booking.get_seats_list()
-    seats_str = ', '.join(seats_list)
-    
-    # Generate QR Code
-    qr = qrcode.QRCode(version=1, box_size=10, border=4)
-    qr.add_data(str(booking.booking_id))
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffer = BytesIO()
-    img.save(buffer, format="PNG")
-    qr_image_data = buffer.getvalue()
-
-    # Plain text message
-    text_content = f"""
-Dear {user.username},
-
-Thank you for booking with BookMyShow! Your booking has been confirmed.
-
-Booking Details:
-================
-Booking ID: {booking.booking_id}
-Movie: {booking.show.movie.title}
-Cinema: {booking.show.screen.cinema.name}
-Screen: {booking.show.screen.name}
-Date: {booking.show.date}
-Time: {booking.show.start_time}
-Seats: {seats_str}
-Total Amount: ₹{booking.total_amount}
-
-Please present this QR code at the cinema entrance for ticket validation.
-
-Have a great movie experience!
-
-Best regards,
-BookMyShow Team
-"""
-
-    # HTML message with embedded image
-    html_content = f"""
-    <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <div style="background-color: #e74c3c; color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0;">
-                    <h1 style="margin: 0;">Booking Confirmed!</h1>
-                </div>
-                
-                <div style="padding: 20px; background-color: #f9f9f9; border: 1px solid #ddd;">
-                    <p>Dear <strong>{user.username}</strong>,</p>
-                    
-                    <p>Thank you for booking with BookMyShow! Your booking has been confirmed.</p>
-                    
-                    <div style="background-color: white; padding: 15px; border-radius: 5px; border: 1px solid #eee; margin: 20px 0;">
-                        <h2 style="color: #e74c3c; border-bottom: 2px solid #e74c3c; padding-bottom: 10px;">Booking Details</h2>
-                        <table style="width: 100%; border-collapse: collapse;">
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Booking ID:</td>
-                                <td style="padding: 8px;">{booking.booking_id}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Movie:</td>
-                                <td style="padding: 8px;">{booking.show.movie.title}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Cinema:</td>
-                                <td style="padding: 8px;">{booking.show.screen.cinema.name}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Screen:</td>
-                                <td style="padding: 8px;">{booking.show.screen.name}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Date:</td>
-                                <td style="padding: 8px;">{booking.show.date}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Time:</td>
-                                <td style="padding: 8px;">{booking.show.start_time}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Seats:</td>
-                                <td style="padding: 8px;">{seats_str}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Total Amount:</td>
-                                <td style="padding: 8px;">₹{booking.total_amount}</td>
-                            </tr>
-                        </table>
-                    </div>
-                    
-                    <div style="text-align: center; margin: 30px 0;">
-                        <p><strong>Please present this QR code at the cinema entrance:</strong></p>
-                        <img src="cid:qrcode_image" alt="Booking QR Code" style="width: 200px; height: 200px; border: 1px solid #ddd; padding: 10px; background: white;">
-                    </div>
-                    
-                    <p style="text-align: center; font-style: italic;">
-                        Have a great movie experience!
-                    </p>
-                </div>
-                
-                <div style="background-color: #333; color: white; padding: 15px; text-align: center; border-radius: 0 0 10px 10px; font-size: 12px;">
-                    <p>BookMyShow - Your ultimate movie ticket booking platform</p>
-                </div>
-            </div>
-        </body>
-    </html>
-    """
-    
-    msg = EmailMultiAlternatives(subject, text_content, settings.DEFAULT_FROM_EMAIL, [user.email])
-    msg.attach_alternative(html_content, "text/html")
-    
-    # Attach QR code
-    image = MIMEImage(qr_image_data)
-    image.add_header('Content-ID', '<qrcode_image>')
-    msg.attach(image)
-    
-    msg.send(fail_silently=True)
-
-
-def send_show_reminder_email(user, booking):
-    """Send reminder email for upcoming show"""
-    from django.core.mail import EmailMultiAlternatives
-    from email.mime.image import MIMEImage
-    import qrcode
-    from io import BytesIO
-
-    subject = f'Reminder: Your show "{booking.show.movie.title}" is tomorrow!'
-    
-    seats_list = booking.get_seats_list()
-    seats_str = ', '.join(seats_list)
-    
-    # Generate QR Code
-    qr = qrcode.QRCode(version=1, box_size=10, border=4)
-    qr.add_data(str(booking.booking_id))
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffer = BytesIO()
-    img.save(buffer, format="PNG")
-    qr_image_data = buffer.getvalue()
-
-    # Plain text message
-    text_content = f"""
-Dear {user.username},
-
-This is a friendly reminder that your movie show is tomorrow!
-
-Booking Details:
-================
-Booking ID: {booking.booking_id}
-Movie: {booking.show.movie.title}
-Cinema: {booking.show.screen.cinema.name}
-Screen: {booking.show.screen.name}
-Date: {booking.show.date}
-Time: {booking.show.start_time}
-Seats: {seats_str}
-Total Amount: ₹{booking.total_amount}
-
-Please arrive at least 15 minutes before the show time.
-
-Have a great movie experience!
-
-Best regards,
-BookMyShow Team
-"""
-
-    # HTML message
-    html_content = f"""
-    <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <div style="background-color: #3498db; color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0;">
-                    <h1 style="margin: 0;">Show Reminder</h1>
-                </div>
-                
-                <div style="padding: 20px; background-color: #f9f9f9; border: 1px solid #ddd;">
-                    <p>Dear <strong>{user.username}</strong>,</p>
-                    
-                    <p>This is a friendly reminder that your movie show is <strong>tomorrow</strong>!</p>
-                    
-                    <div style="background-color: white; padding: 15px; border-radius: 5px; border: 1px solid #eee; margin: 20px 0;">
-                        <h2 style="color: #3498db; border-bottom: 2px solid #3498db; padding-bottom: 10px;">Booking Details</h2>
-                        <table style="width: 100%; border-collapse: collapse;">
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Booking ID:</td>
-                                <td style="padding: 8px;">{booking.booking_id}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Movie:</td>
-                                <td style="padding: 8px;">{booking.show.movie.title}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Cinema:</td>
-                                <td style="padding: 8px;">{booking.show.screen.cinema.name}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Screen:</td>
-                                <td style="padding: 8px;">{booking.show.screen.name}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Date:</td>
-                                <td style="padding: 8px;">{booking.show.date}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Time:</td>
-                                <td style="padding: 8px;">{booking.show.start_time}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Seats:</td>
-                                <td style="padding: 8px;">{seats_str}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Total Amount:</td>
-                                <td style="padding: 8px;">₹{booking.total_amount}</td>
-                            </tr>
-                        </table>
-                    </div>
-                    
-                    <div style="background-color: #fff3cd; border: 1px solid #ffeaa7; padding: 15px; border-radius: 5px; margin: 20px 0;">
-                        <p style="margin: 0; font-weight: bold; color: #856404;">
-                            ⏰ Please arrive at least 15 minutes before the show time.
-                        </p>
-                    </div>
-                    
-                    <div style="text-align: center; margin: 30px 0;">
-                        <p><strong>Your QR code for entry:</strong></p>
-                        <img src="cid:qrcode_image" alt="Booking QR Code" style="width: 200px; height: 200px; border: 1px solid #ddd; padding: 10px; background: white;">
-                    </div>
-                    
-                    <p style="text-align: center; font-style: italic;">
-                        Have a great movie experience!
-                    </p>
-                </div>
-                
-                <div style="background-color: #333; color: white; padding: 15px; text-align: center; border-radius: 0 0 10px 10px; font-size: 12px;">
-                    <p>BookMyShow - Your ultimate movie ticket booking platform</p>
-                </div>
-            </div>
-        </body>
-    </html>
-    """
-    
-    msg = EmailMultiAlternatives(subject, text_content, settings.DEFAULT_FROM_EMAIL, [user.email])
-    msg.attach_alternative(html_content, "text/html")
-    
-    # Attach QR code
-    image = MIMEImage(qr_image_data)
-    image.add_header('Content-ID', '<qrcode_image>')
-    msg.attach(image)
-    
-    msg.send(fail_silently=False)
-
-
 @login_required
 def my_bookings(request):
-    bookings = Booking.objects.filter(user=request.user).order_by('-created_at')
+    bookings = Booking.objects.filter(user=request.user).select_related(
+        'show__movie', 'show__screen__cinema'
+    ).order_by('-created_at')
     
     context = {
         'bookings': bookings,
@@ -675,7 +572,9 @@ def my_bookings(request):
 def user_profile(request):
     profile = getattr(request.user, 'profile', None)
     total_bookings = Booking.objects.filter(user=request.user, status__in=['confirmed', 'used']).count()
-    upcoming = Booking.objects.filter(user=request.user, status='confirmed').order_by('show__date', 'show__start_time')[:5]
+    upcoming = Booking.objects.filter(user=request.user, status='confirmed').select_related(
+        'show__movie', 'show__screen__cinema'
+    ).order_by('show__date', 'show__start_time')[:5]
     wallet_balance = getattr(getattr(request.user, 'wallet', None), 'balance', None)
     context = {
         'profile': profile,
@@ -686,6 +585,10 @@ def user_profile(request):
     return render(request, 'core/user_profile.html', context)
 
 
+def _otp_digest(otp):
+    return salted_hmac('core.views.otp', otp).hexdigest()
+
+
 def register_view(request):
     """User registration with role selection (organizer/staff require approval)."""
     if request.method == 'POST':
@@ -707,19 +610,22 @@ def register_view(request):
 
             # Generate OTP
             otp = str(random.randint(100000, 999999))
-            request.session['otp'] = otp
+            # Only a keyed hash goes in the session, which may be a client-readable signed cookie
+            request.session['otp'] = _otp_digest(otp)
             request.session['user_id'] = user.id
             
             # Send OTP email
             try:
-                send_mail(
+                sent = send_mail(
                     'Verify your account - BookMyShow',
                     f'Your OTP is: {otp}',
                     settings.DEFAULT_FROM_EMAIL,
                     [user.email],
                     fail_silently=True,   # ✅ MUST be True
                 )
+                metrics.inc('bms_emails_sent_total', kind='otp', result='sent' if sent else 'failed')
             except Exception as e:
+                metrics.inc('bms_emails_sent_total', kind='otp', result='failed')
                 print("OTP email failed:", e)            
             return redirect('verify_otp')
     else:
@@ -739,7 +645,7 @@ def verify_otp(request):
             messages.error(request, 'Session expired. Please register again.')
             return redirect('register')
             
-        if entered_otp == session_otp:
+        if entered_otp and constant_time_compare(_otp_digest(entered_otp.strip()), session_otp):
             from django.contrib.auth.models import User
             user = get_object_or_404(User, id=user_id)
             user.is_active = True
@@ -778,9 +684,9 @@ def _login_portal(request, *, expected_role=None, success_url_name=None,
         user = authenticate(username=username, password=password)
 
         if user is not None:
-            role = _get_user_role(user)
-            profile = getattr(user, 'profile', None)
-            is_approved = getattr(profile, 'is_role_approved', True)
+            role, is_approved = UserProfile.role_state(user)
+            if role is None:
+                is_approved = True
 
             if expected_role and (role != expected_role or not is_approved):
                 form.add_error(
@@ -864,13 +770,11 @@ def admin_dashboard(request):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('home')
     
-    # Total revenue (include both confirmed and used bookings)
-    total_revenue = Booking.objects.filter(status__in=['confirmed', 'used']).aggregate(
-        total=Sum('total_amount')
-    )['total'] or 0
-    
-    # Total bookings (include both confirmed and used bookings)
-    total_bookings = Booking.objects.filter(status__in=['confirmed', 'used']).count()
+    # Sales figures come from the daily rollups (confirmed and used bookings),
+    # so their cost does not grow with the number of bookings
+    totals = DailySalesRollup.objects.aggregate(revenue=Sum('revenue'), bookings=Sum('bookings'))
+    total_revenue = totals['revenue'] or 0
+    total_bookings = totals['bookings'] or 0
     
     # Active seat locks
     active_seat_locks = SeatLock.get_active_locks().count()
@@ -879,18 +783,27 @@ def admin_dashboard(request):
     from django.contrib.auth.models import User
     total_users = User.objects.count()
     
-    # Most popular movies (by ticket count - include both confirmed and used bookings)
+    # Most popular movies (by tickets sold)
     popular_movies = Movie.objects.annotate(
-        ticket_count=Count('shows__bookings', filter=Q(shows__bookings__status__in=['confirmed', 'used']))
-    ).order_by('-ticket_count')[:10]
+        ticket_count=Sum('sales_rollups__tickets')
+    ).filter(ticket_count__gt=0).order_by('-ticket_count')[:10]
     
-    # Busiest cinemas (by show bookings - include both confirmed and used bookings)
+    # Busiest cinemas (by bookings)
     busiest_cinemas = Cinema.objects.annotate(
-        booking_count=Count('screens__shows__bookings', filter=Q(screens__shows__bookings__status__in=['confirmed', 'used']))
-    ).order_by('-booking_count')[:10]
+        booking_count=Sum('sales_rollups__bookings')
+    ).filter(booking_count__gt=0).order_by('-booking_count')[:10]
     
     # Recent bookings (include both confirmed and used bookings)
-    recent_bookings = Booking.objects.filter(status__in=['confirmed', 'used']).order_by('-created_at')[:20]
+    recent_bookings = Booking.objects.filter(status__in=['confirmed', 'used']).select_related(
+        'user', 'show__movie', 'show__screen__cinema'
+    ).order_by('-created_at')[:20]
+    
+    # Occupancy by weekday x start time (NumPy; imported on first use)
+    from .analytics import dashboard_heatmap
+    occupancy = get_or_compute(
+        DASHBOARDS, ('occupancy', timezone.localdate()),
+        lambda: dashboard_heatmap(Show.objects.all()), timeout=settings.DASHBOARD_CACHE_TIMEOUT,
+    )
     
     context = {
         'total_revenue': total_revenue,
@@ -900,10 +813,97 @@ def admin_dashboard(request):
         'popular_movies': popular_movies,
         'busiest_cinemas': busiest_cinemas,
         'recent_bookings': recent_bookings,
+        'occupancy': occupancy,
     }
     return render(request, 'core/admin_dashboard.html', context)
 
 
+@login_required
+@require_http_methods(["GET"])
+def revenue_timeseries_api(request):
+    """Revenue and ticket counts bucketed by hour, day or week.
+
+    Query params: bucket (hour/day/week), from/to (YYYY-MM-DD, inclusive),
+    movie and cinema ids. Platform admins see everything; organizers only
+    their own movies.
+    """
+    from datetime import datetime
+    from .timeseries import BUCKETS, revenue_series
+
+    organizer_id = None
+    if not request.user.is_staff:
+        if not is_organizer(request.user):
+            return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+        organizer_id = request.user.id
+
+    bucket = request.GET.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        return JsonResponse({'success': False, 'error': 'bucket must be hour, day or week'}, status=400)
+
+    try:
+        today = timezone.localdate()
+        date_to = date_cls.fromisoformat(request.GET['to']) if request.GET.get('to') else today
+        date_from = date_cls.fromisoformat(request.GET['from']) if request.GET.get('from') else date_to - timedelta(days=29)
+        movie_id = int(request.GET['movie']) if request.GET.get('movie') else None
+        cinema_id = int(request.GET['cinema']) if request.GET.get('cinema') else None
+        start = timezone.make_aware(datetime.combine(date_from, datetime.min.time()))
+        end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+        series = revenue_series(bucket, start, end, movie_id, cinema_id, organizer_id)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'bucket': bucket,
+        'series': series,
+        'totals': {
+            'revenue': str(sum(Decimal(point['revenue']) for point in series)),
+            'bookings': sum(point['bookings'] for point in series),
+            'tickets': sum(point['tickets'] for point in series),
+        },
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+def export_bookings_csv(request):
+    """Stream bookings as CSV for finance (platform admin only).
+
+    Query params: from/to (YYYY-MM-DD booking dates) and since_id for
+    incremental pulls (pass the largest ``id`` from the previous export, 0
+    the first time; bookings from the last EXPORT_SETTLE_SECONDS wait).
+    """
+    from django.http import HttpResponseForbidden, StreamingHttpResponse
+    from .exports import export_queryset, iter_csv, iter_rows
+
+    if not request.user.is_staff:
+        return HttpResponseForbidden('Staff only')
+
+    try:
+        date_from = date_cls.fromisoformat(request.GET['from']) if request.GET.get('from') else None
+        date_to = date_cls.fromisoformat(request.GET['to']) if request.GET.get('to') else None
+        since_id = int(request.GET['since_id']) if request.GET.get('since_id') else None
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid from, to or since_id parameter'}, status=400)
+
+    rows = iter_rows(export_queryset(date_from, date_to, since_id))
+    response = StreamingHttpResponse(iter_csv(rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="bookings-{timezone.localdate().isoformat()}.csv"'
+    return response
+
+
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """Prometheus metrics for this process (METRICS_TOKEN bearer token or staff)."""
+    from django.http import HttpResponse, HttpResponseForbidden
+
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    if not (token and constant_time_compare(authorization, f'Bearer {token}')) and not request.user.is_staff:
+        return HttpResponseForbidden('Metrics require a token or a staff login')
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 # ---- Organizer dashboard ----
 
 @login_required
@@ -911,24 +911,42 @@ def admin_dashboard(request):
 def organizer_dashboard(request):
     """Organizer dashboard with analytics and movie management."""
     # Ensure wallet exists
-    Wallet.objects.get_or_create(user=request.user)
+    wallet, _ = Wallet.objects.get_or_create(user=request.user)
     
-    # Get organizer's movies (include both confirmed and used bookings)
-    movies = Movie.objects.filter(organizer=request.user).annotate(
-        total_shows=Count('shows'),
-        total_bookings=Count('shows__bookings', filter=Q(shows__bookings__status__in=['confirmed', 'used'])),
-        revenue=Sum('shows__bookings__total_amount', filter=Q(shows__bookings__status__in=['confirmed', 'used']))
-    ).order_by('-created_at')
+    # Per-movie stats as independent correlated subqueries, so shows and
+    # bookings are never joined against each other. Sales come from the
+    # daily rollups (confirmed and used bookings).
+    show_counts = Show.objects.filter(movie=OuterRef('pk')).order_by().values('movie').annotate(
+        n=Count('id')
+    ).values('n')
+    sales = DailySalesRollup.objects.filter(movie=OuterRef('pk')).order_by().values('movie')
+    movies = list(Movie.objects.filter(organizer=request.user).annotate(
+        total_shows=Coalesce(Subquery(show_counts), 0),
+        total_bookings=Coalesce(Subquery(sales.annotate(n=Sum('bookings')).values('n')), 0),
+        revenue=Coalesce(
+            Subquery(sales.annotate(total=Sum('revenue')).values('total')),
+            Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    ).order_by('-created_at'))
     
-    # Calculate total stats
-    total_revenue = movies.aggregate(total=Sum('revenue'))['total'] or 0
-    total_tickets = movies.aggregate(total=Sum('total_bookings'))['total'] or 0
+    # Calculate total stats from the same rows
+    total_revenue = sum(movie.revenue for movie in movies)
+    total_tickets = sum(movie.total_bookings for movie in movies)
+    
+    from .analytics import dashboard_heatmap
+    occupancy = get_or_compute(
+        DASHBOARDS, ('occupancy', timezone.localdate(), request.user.id),
+        lambda: dashboard_heatmap(Show.objects.filter(movie__organizer=request.user)),
+        timeout=settings.DASHBOARD_CACHE_TIMEOUT,
+    )
     
     context = {
         'movies': movies,
         'total_revenue': total_revenue,
         'total_tickets': total_tickets,
-        'wallet_balance': request.user.wallet.balance,
+        'wallet_balance': wallet.balance,
+        'occupancy': occupancy,
     }
     return render(request, 'core/organizer_dashboard.html', context)
 
@@ -938,8 +956,9 @@ def organizer_dashboard(request):
 @login_required
 @user_passes_test(is_staff_role)
 def staff_scan_ticket(request):
-    """Very simple ticket validation page for staff (by booking_id)."""
+    """Very simple ticket validation page for staff (by ticket code or booking_id)."""
     from uuid import UUID
+    from .scanning import sync_scans
     booking = None
     error = None
 
@@ -948,26 +967,36 @@ def staff_scan_ticket(request):
         code = request.POST.get('booking_code', '').strip()
         
         try:
-            # Allow both full UUID and first 8 chars
-            if len(code) == 8:
-                from django.db.models import Q
-                booking = Booking.objects.filter(booking_id__startswith=code).first()
+            bookings = Booking.objects.select_related('user', 'show__movie', 'show__screen__cinema')
+            # Accept a scanned QR payload, the short ticket code or the full booking UUID
+            if is_ticket_payload(code):
+                ticket = verify_ticket(code)
+                booking = bookings.filter(pk=ticket['booking_id'], ticket_code=ticket['ticket_code']).first()
+            elif len(code) == TICKET_CODE_LENGTH:
+                booking = bookings.filter(ticket_code=normalize_ticket_code(code)).first()
             else:
                 _ = UUID(code)  # validate UUID format
-                booking = Booking.objects.filter(booking_id=code).first()
+                booking = bookings.filter(booking_id=code).first()
 
             if not booking:
                 error = 'No booking found for the given code.'
             else:
                 if action == 'mark_used':
-                    if booking.status == 'confirmed':
+                    # Conditional UPDATE, so two gates cannot both admit the ticket
+                    result = sync_scans([(booking.ticket_code, timezone.now())], request.user, gate='desk')[0]
+                    if result['result'] == 'accepted':
                         booking.status = 'used'
-                        booking.save()
                         messages.success(request, 'Ticket marked as USED successfully!')
-                    elif booking.status == 'used':
+                    elif result['result'] == 'conflict':
+                        booking.status = 'used'
                         messages.warning(request, 'Ticket is ALREADY USED.')
                     else:
                         messages.error(request, f'Cannot mark ticket as used. Current status: {booking.status}')
+        except InvalidTicket as e:
+            error = {
+                'expired': 'This ticket has expired.',
+                'bad_signature': 'This QR code is not a genuine ticket.',
+            }.get(e.reason, 'Invalid booking code format.')
         except Exception:
             error = 'Invalid booking code format.'
 
@@ -978,6 +1007,76 @@ def staff_scan_ticket(request):
     return render(request, 'core/staff_scan.html', context)
 
 
+@login_required
+@user_passes_test(is_staff_role)
+@require_http_methods(["POST"])
+def scan_tickets_api(request):
+    """Mark tickets used at the gate (JSON).
+
+    Body: {"code": "..."} for one ticket or {"codes": [...]} for a batch, plus
+    optional "gate" and "show_id". Each ticket is admitted by a conditional
+    UPDATE ... WHERE status='confirmed'; the affected row count decides
+    whether it was accepted or had already been used. A single code answers
+    200 (accepted), 409 (already used) or 404/400 (not found/not valid).
+    """
+    from .scanning import parse_scans, summarize_scans, sync_scans
+
+    try:
+        data = json.loads(request.body)
+        single = 'code' in data
+        codes = [data['code']] if single else data.get('codes')
+        scans = parse_scans([{'code': code} for code in codes] if isinstance(codes, list) else codes)
+        show_id = int(data['show_id']) if data.get('show_id') else None
+    except (ValueError, TypeError, AttributeError, KeyError) as e:
+        return JsonResponse({'success': False, 'error': str(e) or 'Invalid data'}, status=400)
+
+    results = sync_scans(scans, request.user, gate=str(data.get('gate', ''))[:50], show_id=show_id)
+    if single:
+        result = results[0]
+        status = {'accepted': 200, 'conflict': 409}.get(result['result'])
+        if status is None:
+            status = 404 if result['reason'] == 'not_found' else 400
+        return JsonResponse({'success': result['result'] == 'accepted', **result}, status=status)
+    return JsonResponse({'success': True, **summarize_scans(results)})
+
+
+@login_required
+@user_passes_test(is_staff_role)
+@require_http_methods(["GET"])
+def scan_manifest(request, show_id):
+    """A show's valid tickets (by booking id) and public key for offline gate scanners."""
+    from .scanning import build_manifest
+
+    show = get_object_or_404(Show, id=show_id)
+    response = JsonResponse(build_manifest(show))
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@login_required
+@user_passes_test(is_staff_role)
+@require_http_methods(["POST"])
+def scan_sync(request):
+    """Upload a batch of scans made offline.
+
+    Body: {"gate": "G1", "show_id": 12 (optional), "scans": [{"code": "...",
+    "scanned_at": ISO datetime}, ...]}. Each scan is reported as accepted,
+    conflict (ticket already used, with the first scan's gate and time) or
+    rejected.
+    """
+    from .scanning import parse_scans, summarize_scans, sync_scans
+
+    try:
+        data = json.loads(request.body)
+        scans = parse_scans(data.get('scans'))
+        show_id = int(data['show_id']) if data.get('show_id') else None
+    except (ValueError, TypeError, AttributeError) as e:
+        return JsonResponse({'success': False, 'error': str(e) or 'Invalid data'}, status=400)
+
+    results = sync_scans(scans, request.user, gate=str(data.get('gate', ''))[:50], show_id=show_id)
+    return JsonResponse({'success': True, **summarize_scans(results)})
+
+
 # ---- Organizer Movie CRUD ----
 
 @login_required